@@ -0,0 +1,14 @@
+from django.contrib.admin import ModelAdmin, register
+
+from .models import Job
+
+
+@register(Job)
+class JobAdmin(ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'run_after', 'created')
+    list_filter = ('status', 'name')
+    exclude = ('payload',)
+    readonly_fields = (
+        'name', 'status', 'attempts', 'run_after', 'locked_at', 'error',
+        'created',
+    )
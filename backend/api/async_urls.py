@@ -0,0 +1,25 @@
+from django.urls import path
+
+from . import async_views
+
+# Подключаются перед обычными адресами API только для GET под ASGI.
+urlpatterns = [
+    path('tags/', async_views.tag_list, name='tags-list'),
+    path('tags/<int:pk>/', async_views.tag_detail, name='tags-detail'),
+    path(
+        'ingredients/', async_views.ingredient_list, name='ingredients-list'
+    ),
+    path(
+        'ingredients/<int:pk>/', async_views.ingredient_detail,
+        name='ingredients-detail'
+    ),
+    path('recipes/', async_views.recipe_list, name='recipes-list'),
+    path(
+        'recipes/<int:pk>/', async_views.recipe_detail,
+        name='recipes-detail'
+    ),
+    path(
+        'users/subscriptions/', async_views.subscriptions,
+        name='users-subscriptions'
+    ),
+]
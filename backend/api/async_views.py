@@ -0,0 +1,292 @@
+"""Асинхронные версии самых частых запросов на чтение.
+
+Под ASGI запросы GET к этим адресам обрабатываются здесь, см.
+foodgram/asgi.py, остальные запросы идут в обычные представления DRF.
+Ответы совпадают с ответами синхронных представлений и используют
+тот же кэш.
+"""
+
+import hashlib
+from functools import wraps
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import InvalidPage
+from django.http import HttpResponse
+from django_filters.utils import translate_validation
+from rest_framework import exceptions, status
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+from .cache import (
+    get_version, get_versions, make_response, response_cache_key,
+)
+from .counts import get_count
+from .db_routers import use_primary
+from .filters import RecipeFilter
+from .ingredient_index import ingredient_index
+from .metrics import view_label
+from .pagination import CustomLimitOffsetPagination, CustomPagination
+from .querysets import annotate_recipe_flags, annotate_subscriptions
+from .serializers import (
+    FollowSerializer, IngredientSerializer, RecipeSerializer,
+    TagWithCountSerializer,
+)
+from .views import (
+    CustomUserViewSet, IngredientViewSet, RecipeViewSet, TagViewSet,
+)
+
+recipe_list_sync = sync_to_async(RecipeViewSet.as_view({'get': 'list'}))
+
+
+def render(data, status_code=status.HTTP_200_OK):
+    return HttpResponse(
+        JSONRenderer().render(data),
+        status=status_code,
+        content_type='application/json'
+    )
+
+
+def api_view(view_class, action):
+    """Превращает исключения DRF в ответы, как это делает APIView.
+
+    view_class и action — синхронное представление с тем же ответом,
+    по ним запрос подписывается в метриках.
+    """
+
+    def decorator(view):
+
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            try:
+                return await view(request, *args, **kwargs)
+            except exceptions.APIException as exc:
+                data = exc.detail
+                if not isinstance(data, (list, dict)):
+                    data = {'detail': data}
+                response = render(data, exc.status_code)
+                if isinstance(exc, (
+                    exceptions.NotAuthenticated,
+                    exceptions.AuthenticationFailed
+                )):
+                    response.status_code = status.HTTP_401_UNAUTHORIZED
+                    response['WWW-Authenticate'] = 'Token'
+                return response
+
+        wrapper.view_label = view_label(view_class, action)
+        return wrapper
+
+    return decorator
+
+
+async def authenticate(request):
+    """DRF-запрос с пользователем из заголовка Authorization: Token."""
+
+    drf_request = Request(request, authenticators=(TokenAuthentication(),))
+    await sync_to_async(lambda: drf_request.user)()
+    return drf_request
+
+
+async def cached(request, key, build):
+    """Ответ из кэша ответов или построенный функцией build.
+
+    Кэш общий с CachedResponseMixin, данные для него читаются из
+    основной базы.
+    """
+
+    entry = await cache.aget(key)
+    if entry is None:
+        with use_primary():
+            data = await build()
+        content = JSONRenderer().render(data)
+        entry = (
+            f'"{hashlib.sha1(content).hexdigest()}"',
+            content,
+            'application/json'
+        )
+        await cache.aset(key, entry, settings.RESPONSE_CACHE_TIMEOUT)
+    return make_response(request, *entry)
+
+
+def cache_key(request, name, versions):
+    return response_cache_key(
+        name, versions, 'json', request.path, request.GET
+    )
+
+
+async def get_object(queryset, pk):
+    obj = await queryset.filter(pk=pk).afirst()
+    if obj is None:
+        # Сообщение как у get_object_or_404 в GenericAPIView.
+        raise exceptions.NotFound(
+            f'No {queryset.model._meta.object_name} matches the given query.'
+        )
+    return obj
+
+
+async def paginate_pages(request, queryset):
+    """Страница queryset по номеру, как в CustomPagination."""
+
+    pagination = CustomPagination()
+    pagination.request = request
+    paginator = pagination.django_paginator_class(
+        queryset, pagination.get_page_size(request)
+    )
+    paginator.count = await sync_to_async(get_count)(queryset)
+    try:
+        pagination.page = paginator.page(
+            pagination.get_page_number(request, paginator)
+        )
+    except InvalidPage as exc:
+        raise exceptions.NotFound(pagination.invalid_page_message.format(
+            page_number=request.query_params.get(
+                pagination.page_query_param
+            ),
+            message=str(exc)
+        ))
+    pagination.page.object_list = [
+        obj async for obj in pagination.page.object_list
+    ]
+    return pagination, pagination.page.object_list
+
+
+async def paginate_offset(request, queryset):
+    """Срез queryset по limit и offset, как в CustomLimitOffsetPagination."""
+
+    pagination = CustomLimitOffsetPagination()
+    pagination.request = request
+    pagination.limit = pagination.get_limit(request)
+    pagination.offset = pagination.get_offset(request)
+    pagination.count = await sync_to_async(pagination.get_count)(queryset)
+    page = queryset[pagination.offset:pagination.offset + pagination.limit]
+    return pagination, [obj async for obj in page]
+
+
+@api_view(TagViewSet, 'list')
+async def tag_list(request):
+
+    async def build():
+        tags = [tag async for tag in Tag.objects.order_by('pk')]
+        return TagWithCountSerializer(tags, many=True).data
+
+    key = cache_key(request, 'tags', [await sync_to_async(get_version)('tags')])
+    return await cached(request, key, build)
+
+
+@api_view(TagViewSet, 'retrieve')
+async def tag_detail(request, pk):
+
+    async def build():
+        tag = await get_object(Tag.objects.all(), pk)
+        return TagWithCountSerializer(tag).data
+
+    key = cache_key(request, 'tags', [await sync_to_async(get_version)('tags')])
+    return await cached(request, key, build)
+
+
+@api_view(IngredientViewSet, 'list')
+async def ingredient_list(request):
+
+    async def build():
+        return await sync_to_async(ingredient_index.search)(
+            request.GET.get('name', '')
+        )
+
+    key = cache_key(
+        request, 'ingredients',
+        [await sync_to_async(get_version)('ingredients')]
+    )
+    return await cached(request, key, build)
+
+
+@api_view(IngredientViewSet, 'retrieve')
+async def ingredient_detail(request, pk):
+
+    async def build():
+        ingredient = await get_object(Ingredient.objects.all(), pk)
+        return IngredientSerializer(ingredient).data
+
+    key = cache_key(
+        request, 'ingredients',
+        [await sync_to_async(get_version)('ingredients')]
+    )
+    return await cached(request, key, build)
+
+
+@api_view(RecipeViewSet, 'list')
+async def recipe_list(request):
+    if 'cursor' in request.GET:
+        return await recipe_list_sync(request)
+    drf_request = await authenticate(request)
+    user = drf_request.user
+
+    async def build():
+        filterset = RecipeFilter(
+            request.GET,
+            annotate_recipe_flags(Recipe.objects.all(), user),
+            request=drf_request
+        )
+        # Проверка фильтров обращается к базе и индексу тегов.
+        if not await sync_to_async(filterset.is_valid)():
+            raise translate_validation(filterset.errors)
+        queryset = await sync_to_async(lambda: filterset.qs)()
+        pagination, recipes = await paginate_pages(drf_request, queryset)
+        context = {
+            'request': drf_request, 'view': SimpleNamespace(action='list')
+        }
+        return pagination.get_paginated_response(
+            RecipeSerializer(recipes, many=True, context=context).data
+        ).data
+
+    if user.is_authenticated:
+        return render(await build())
+    key = cache_key(
+        request, 'recipes', [await sync_to_async(get_version)('recipes')]
+    )
+    return await cached(request, key, build)
+
+
+@api_view(RecipeViewSet, 'retrieve')
+async def recipe_detail(request, pk):
+    drf_request = await authenticate(request)
+    user = drf_request.user
+
+    async def build():
+        recipe = await get_object(
+            annotate_recipe_flags(Recipe.objects.all(), user), pk
+        )
+        context = {
+            'request': drf_request,
+            'view': SimpleNamespace(action='retrieve')
+        }
+        return RecipeSerializer(recipe, context=context).data
+
+    if user.is_authenticated:
+        return render(await build())
+    versions = await sync_to_async(get_versions)(
+        (f'recipe_{pk}', 'recipe_references')
+    )
+    return await cached(request, cache_key(request, 'recipes', versions), build)
+
+
+@api_view(CustomUserViewSet, 'subscriptions')
+async def subscriptions(request):
+    drf_request = await authenticate(request)
+    if not drf_request.user.is_authenticated:
+        raise exceptions.NotAuthenticated()
+    queryset = annotate_subscriptions(
+        User.objects.filter(follow__user=drf_request.user), drf_request
+    )
+    pagination, authors = await paginate_offset(drf_request, queryset)
+    if not pagination.count:
+        return render(
+            'Вы ни на кого не подписаны.', status.HTTP_400_BAD_REQUEST
+        )
+    return render(pagination.get_paginated_response(FollowSerializer(
+        authors, many=True, context={'request': drf_request}
+    ).data).data)
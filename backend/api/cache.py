@@ -0,0 +1,144 @@
+import hashlib
+import uuid
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework.response import Response
+
+from .db_routers import use_primary
+
+
+def get_version(name):
+    """Текущая версия группы кэшированных данных."""
+
+    return caches['versions'].get_or_set(f'{name}_version', uuid.uuid4().hex, None)
+
+
+def get_versions(names):
+    """Текущие версии нескольких групп за одно обращение к кэшу."""
+
+    versions_cache = caches['versions']
+    keys = [f'{name}_version' for name in names]
+    versions = versions_cache.get_many(keys)
+    missing = {
+        key: uuid.uuid4().hex for key in keys if key not in versions
+    }
+    if missing:
+        versions_cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def invalidate(name):
+    """Делает недействительными все данные группы, сменив её версию."""
+
+    caches['versions'].set(f'{name}_version', uuid.uuid4().hex, None)
+
+
+def response_cache_key(name, versions, renderer_format, path, query_params):
+    """Ключ кэшированного ответа, общий для WSGI и ASGI."""
+
+    params = urlencode(sorted(
+        (key, value)
+        for key, values in query_params.lists()
+        for value in values
+    ))
+    return ':'.join((
+        'response', name, *versions, renderer_format, path, params,
+    ))
+
+
+def make_response(request, etag, content, content_type):
+    """Ответ из кэша, 304 при совпадающем If-None-Match."""
+
+    etags = parse_etags(request.headers.get('If-None-Match', ''))
+    if etag in etags or '*' in etags:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(content, content_type=content_type)
+    response['ETag'] = etag
+    patch_cache_control(response, no_cache=True)
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+
+class CachedResponseMixin:
+    """Кэширует отрендеренные ответы list и retrieve.
+
+    Ключ кэша включает версию группы cache_name, поэтому при изменении
+    данных старые ответы перестают использоваться. Ответы отдаются со
+    строгим ETag, на совпадающий If-None-Match возвращается 304.
+    Кэшируемый ответ строится по основной базе, иначе отставшие данные
+    реплики сохранились бы в кэше до следующего изменения.
+    """
+
+    cache_name = None
+    cached_actions = ('list', 'retrieve')
+
+    def should_cache(self, request):
+        return True
+
+    def get_cache_versions(self, request):
+        return (get_version(self.cache_name),)
+
+    def get_cache_key(self, request):
+        return response_cache_key(
+            self.cache_name,
+            self.get_cache_versions(request),
+            request.accepted_renderer.format,
+            request.path,
+            request.query_params,
+        )
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.cache_key = None
+        self.cached_response = None
+        if (
+            request.method == 'GET'
+            and self.action in self.cached_actions
+            and self.should_cache(request)
+        ):
+            self.cache_key = self.get_cache_key(request)
+            self.cached_response = cache.get(self.cache_key)
+
+    def handle_cached(self, handler, request, *args, **kwargs):
+        if self.cached_response is not None:
+            return make_response(request, *self.cached_response)
+        if self.cache_key is None:
+            return handler(request, *args, **kwargs)
+        with use_primary():
+            return handler(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        return self.handle_cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.handle_cached(super().retrieve, request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if (
+            isinstance(response, Response)
+            and response.status_code == 200
+            and getattr(self, 'cache_key', None)
+            and self.cached_response is None
+        ):
+            response.render()
+            etag = f'"{hashlib.sha1(response.content).hexdigest()}"'
+            content_type = response['Content-Type']
+            cache.set(
+                self.cache_key,
+                (etag, response.content, content_type),
+                settings.RESPONSE_CACHE_TIMEOUT
+            )
+            return make_response(
+                request, etag, response.content, content_type
+            )
+        return response
@@ -0,0 +1,86 @@
+import hashlib
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+
+from .cache import get_versions
+from .db_routers import use_primary
+
+
+# Модели, по которым считаются страницы API и списки в админке.
+# Версии их таблиц меняют сигналы из api/signals.py, а после массовой
+# загрузки в обход сигналов — код загрузки. Счётчики запросов к другим
+# таблицам не кэшируются.
+COUNTED_MODELS = (
+    'recipes.Recipe', 'recipes.Favorite', 'recipes.ShoppingCart',
+    'recipes.Subscribe', 'users.User', 'recipes.Ingredient',
+    'recipes.IngredientInRecipe',
+)
+
+
+def table_version_name(table):
+    return f'table_{table}'
+
+
+def get_counted_tables():
+    return {apps.get_model(label)._meta.db_table for label in COUNTED_MODELS}
+
+
+def estimate_count(queryset):
+    """Оценка числа строк таблицы по статистике планировщика PostgreSQL."""
+
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+            (queryset.model._meta.db_table,)
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < settings.COUNT_ESTIMATE_THRESHOLD:
+        return None
+    return int(row[0])
+
+
+def get_count(queryset, estimate=False):
+    """Число объектов в queryset для пагинации.
+
+    С estimate=True для запроса без фильтров по большой таблице
+    возвращается оценка планировщика. Она подходит для limit/offset,
+    но не для пагинации по номеру страницы: при заниженной оценке
+    последние страницы были бы недоступны. Точные значения кэшируются
+    по тексту SQL-запроса и версиям всех участвующих в нём таблиц,
+    версии таблиц меняются сигналами при записи. Они считаются по
+    основной базе: значение с отставшей реплики сохранилось бы в кэше
+    под новыми версиями таблиц.
+    """
+
+    query = queryset.query
+    if estimate and not query.where and not query.distinct:
+        estimate = estimate_count(queryset)
+        if estimate is not None:
+            return estimate
+    try:
+        sql, params = query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    tables = sorted({
+        alias.table_name for alias in query.alias_map.values()
+    } | {queryset.model._meta.db_table})
+    if not set(tables) <= get_counted_tables():
+        return queryset.count()
+    versions = get_versions(table_version_name(table) for table in tables)
+    with use_primary():
+        signature = hashlib.sha1(
+            repr((queryset.db, sql, params, versions)).encode()
+        ).hexdigest()
+        key = f'count:{signature}'
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, settings.COUNT_CACHE_TIMEOUT)
+    return count
@@ -0,0 +1,58 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# База для чтения в текущем запросе, None — основная.
+read_database = ContextVar('read_database', default=None)
+# Модели, которые всегда читаются из основной базы.
+PRIMARY_MODELS = {'authtoken.Token'}
+
+
+@contextmanager
+def use_database(alias):
+    """Направляет чтение внутри блока в базу alias."""
+
+    token = read_database.set(alias)
+    try:
+        yield
+    finally:
+        read_database.reset(token)
+
+
+def use_replica():
+    return use_database(random.choice(settings.REPLICA_DATABASES))
+
+
+def use_primary():
+    """Читает из основной базы, например, чтобы результат можно было
+    сохранить в общий кэш или индекс в памяти."""
+
+    return use_database(DEFAULT_DB_ALIAS)
+
+
+class ReplicaRouter:
+    """Отправляет чтение в реплику, если это разрешено для запроса.
+
+    Реплику выбирает ReplicaMiddleware для безопасных запросов к API,
+    вне запроса, при записи и для PRIMARY_MODELS используется основная
+    база.
+    """
+
+    def db_for_read(self, model, **hints):
+        # Токен, созданный или удалённый только что, может ещё
+        # не дойти до реплики.
+        if model._meta.label in PRIMARY_MODELS:
+            return DEFAULT_DB_ALIAS
+        return read_database.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -1,28 +1,20 @@
 import django_filters
-from django_filters import rest_framework
-from django_filters.rest_framework import FilterSet
 
-from recipes.models import Ingredient, Recipe, Tag
-
-
-class IngredientFilter(FilterSet):
-
-    name = rest_framework.CharFilter(lookup_expr='istartswith')
-
-    class Meta:
-        model = Ingredient
-        fields = ('name', )
+from recipes.models import Recipe
+from recipes.tag_masks import filter_by_mask
+from .querysets import search_recipes
+from .tag_map import tag_choices, tag_map
 
 
 class RecipeFilter(django_filters.FilterSet):
-    tags = django_filters.filters.ModelMultipleChoiceFilter(
-        queryset=Tag.objects.all(),
-        field_name='tags__slug',
-        to_field_name='slug')
+    tags = django_filters.filters.MultipleChoiceFilter(
+        choices=tag_choices,
+        method='tags_filter')
     is_favorited = django_filters.filters.NumberFilter(
         method='is_recipe_in_favorites_filter')
     is_in_shopping_cart = django_filters.filters.NumberFilter(
         method='is_recipe_in_shoppingcart_filter')
+    search = django_filters.filters.CharFilter(method='search_filter')
 
     def is_recipe_in_favorites_filter(self, queryset, name, value):
         if value == 1:
@@ -36,6 +28,14 @@ class RecipeFilter(django_filters.FilterSet):
             return queryset.filter(shopping_recipe__user_id=user.id)
         return queryset
 
+    def tags_filter(self, queryset, name, value):
+        return filter_by_mask(queryset, tag_map.mask(value))
+
+    def search_filter(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'tags', 'author', 'is_favorited', 'is_in_shopping_cart', 'search'
+        )
@@ -0,0 +1,73 @@
+import threading
+from bisect import bisect_left, bisect_right
+
+from django.conf import settings
+
+from recipes.models import Ingredient
+from .cache import get_version
+from .db_routers import use_primary
+from .serializers import IngredientSerializer
+
+
+class IngredientIndex:
+    """Поисковый индекс по названиям ингредиентов в памяти процесса.
+
+    Названия хранятся в отсортированном списке, поиск по началу строки
+    выполняется двоичным поиском. Если совпадений по началу не хватает,
+    добавляются совпадения по подстроке, ранжированные по позиции
+    вхождения и длине названия.
+
+    Версия индекса хранится в общем кэше, поэтому изменение ингредиента
+    в одном процессе приводит к перестроению индекса во всех остальных.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._index = ([], [])
+
+    def _build(self):
+        items = sorted(
+            IngredientSerializer(Ingredient.objects.all(), many=True).data,
+            key=lambda item: (item['name'].casefold(), item['id'])
+        )
+        self._index = ([item['name'].casefold() for item in items], items)
+
+    def _refresh(self):
+        version = get_version('ingredients')
+        if version == self._version:
+            return
+        with self._lock, use_primary():
+            if version != self._version:
+                self._build()
+                self._version = version
+
+    def search(self, query, limit=None):
+        """Возвращает не больше limit ингредиентов, подходящих под запрос.
+
+        Пустой запрос возвращает первые по алфавиту ингредиенты.
+        """
+
+        self._refresh()
+        keys, items = self._index
+        query = query.strip().casefold()
+        limit = limit or settings.INGREDIENT_SEARCH_LIMIT
+        if not query:
+            return items[:limit]
+        start = bisect_left(keys, query)
+        end = min(bisect_right(keys, query + chr(0x10FFFF)), start + limit)
+        result = items[start:end]
+        if len(result) < limit:
+            matches = sorted(
+                (key.find(query), len(key), position)
+                for position, key in enumerate(keys)
+                if query in key and not key.startswith(query)
+            )
+            result.extend(
+                items[position]
+                for _, _, position in matches[:limit - len(result)]
+            )
+        return result
+
+
+ingredient_index = IngredientIndex()
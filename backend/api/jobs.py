@@ -0,0 +1,107 @@
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Job
+
+HANDLERS = {}
+
+
+def job(name):
+    """Регистрирует функцию как обработчик задачи name."""
+
+    def decorator(func):
+        HANDLERS[name] = func
+        return func
+
+    return decorator
+
+
+def enqueue(name, **payload):
+    """Ставит задачу в очередь.
+
+    Задача создаётся в текущей транзакции и становится видна
+    обработчику только после её коммита.
+    """
+
+    return Job.objects.create(
+        name=name, payload=payload, run_after=timezone.now()
+    )
+
+
+def claim_job():
+    """Забирает из очереди одну задачу.
+
+    Задачи, которые выполняются дольше JOB_TIMEOUT, считаются
+    брошенными упавшим обработчиком и выполняются повторно.
+    """
+
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOB_TIMEOUT)
+    Job.objects.filter(
+        status=Job.RUNNING,
+        locked_at__lt=stale,
+        attempts__gte=settings.JOB_MAX_ATTEMPTS
+    ).update(status=Job.FAILED, error='Превышено время выполнения')
+    with transaction.atomic():
+        job = Job.objects.select_for_update(skip_locked=True).filter(
+            Q(status=Job.PENDING, run_after__lte=now)
+            | Q(status=Job.RUNNING, locked_at__lt=stale)
+        ).order_by('id').first()
+        if job is None:
+            return None
+        job.status = Job.RUNNING
+        job.locked_at = now
+        job.attempts += 1
+        job.save(update_fields=('status', 'locked_at', 'attempts'))
+    return job
+
+
+def run_job(job):
+    """Выполняет задачу. Успешные задачи удаляются из очереди,
+    упавшие повторяются с растущей задержкой до JOB_MAX_ATTEMPTS раз."""
+
+    try:
+        handler = HANDLERS.get(job.name)
+        if handler is None:
+            raise LookupError(f'Неизвестная задача {job.name}')
+        with transaction.atomic():
+            handler(**job.payload)
+    except Exception:
+        failed = job.attempts >= settings.JOB_MAX_ATTEMPTS
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.FAILED if failed else Job.PENDING,
+            run_after=timezone.now() + timedelta(
+                seconds=settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            ),
+            locked_at=None,
+            error=traceback.format_exc()
+        )
+        return False
+    Job.objects.filter(pk=job.pk).delete()
+    return True
+
+
+def work(stop, once=False):
+    """Выполняет задачи, пока stop() не вернёт True.
+
+    С once=True завершается, когда очередь пуста.
+    """
+
+    processed = 0
+    while not stop():
+        close_old_connections()
+        job = claim_job()
+        if job is None:
+            if once:
+                break
+            time.sleep(settings.JOB_POLL_INTERVAL)
+            continue
+        run_job(job)
+        processed += 1
+    return processed
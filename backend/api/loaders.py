@@ -0,0 +1,152 @@
+import csv
+import io
+import json
+import os
+from itertools import islice
+
+from django.db import connection, transaction
+
+from .cache import invalidate
+from .counts import table_version_name
+
+BATCH_SIZE = 5000
+READ_SIZE = 64 * 1024
+TEMP_TABLE = 'import_batch'
+
+
+def iter_json_array(file):
+    """Читает объекты из JSON-массива по одному, не загружая файл целиком."""
+
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    for chunk in iter(lambda: file.read(READ_SIZE), ''):
+        buffer += chunk
+        while True:
+            buffer = buffer.lstrip()
+            if not started:
+                if not buffer:
+                    break
+                if buffer[0] != '[':
+                    raise ValueError('Ожидался JSON-массив')
+                buffer = buffer[1:]
+                started = True
+                continue
+            if buffer[:1] in (',', ']'):
+                buffer = buffer[1:]
+                continue
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                break
+            yield item
+            buffer = buffer[end:]
+
+
+def read_rows(path, fields):
+    """Строки файла в виде кортежей значений полей fields.
+
+    Формат определяется по расширению: .csv, .json (массив объектов)
+    или .jsonl (объект в каждой строке). Заголовок CSV пропускается,
+    если он совпадает с названиями полей.
+    """
+
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, encoding='utf-8') as file:
+        if extension == '.csv':
+            for row in csv.reader(file):
+                if row and tuple(row) != tuple(fields):
+                    yield tuple(row[:len(fields)])
+        elif extension == '.json':
+            for item in iter_json_array(file):
+                yield tuple(item[field] for field in fields)
+        elif extension == '.jsonl':
+            for line in file:
+                if line.strip():
+                    item = json.loads(line)
+                    yield tuple(item[field] for field in fields)
+        else:
+            raise ValueError(f'Неподдерживаемый формат файла: {path}')
+
+
+def batched(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def copy_batch(model, fields, batch):
+    """Загружает пачку строк через COPY во временную таблицу и переносит
+    их в таблицу модели одним INSERT ... ON CONFLICT DO NOTHING."""
+
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    columns = ', '.join(
+        quote(model._meta.get_field(field).column) for field in fields
+    )
+    # Значения по умолчанию Django не хранятся в схеме базы данных.
+    defaults = [
+        field for field in model._meta.concrete_fields
+        if not field.primary_key and field.name not in fields
+        and field.has_default()
+    ]
+    default_columns = ''.join(
+        f', {quote(field.column)}' for field in defaults
+    )
+    default_values = ''.join(', %s' for _ in defaults)
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(batch)
+    buffer.seek(0)
+    with transaction.atomic(), connection.cursor() as cursor:
+        # ON COMMIT DROP не срабатывает, пока загрузка идёт внутри
+        # внешней транзакции, поэтому таблица прошлой пачки удаляется
+        # явно. Схема pg_temp не даёт задеть обычную таблицу.
+        cursor.execute(f'DROP TABLE IF EXISTS pg_temp.{TEMP_TABLE}')
+        cursor.execute(
+            f'CREATE TEMP TABLE {TEMP_TABLE} ON COMMIT DROP AS '
+            f'SELECT {columns} FROM {table} WITH NO DATA'
+        )
+        cursor.copy_expert(
+            f'COPY {TEMP_TABLE} ({columns}) FROM STDIN WITH (FORMAT csv)',
+            buffer
+        )
+        cursor.execute(
+            f'INSERT INTO {table} ({columns}{default_columns}) '
+            f'SELECT DISTINCT {columns}{default_values} FROM {TEMP_TABLE} '
+            f'ON CONFLICT DO NOTHING',
+            [field.get_db_prep_save(field.get_default(), connection)
+             for field in defaults]
+        )
+        created = cursor.rowcount
+        cursor.execute(f'DROP TABLE pg_temp.{TEMP_TABLE}')
+        return created
+
+
+def insert_batch(model, fields, batch):
+    """Загружает пачку строк через bulk_create, пропуская существующие."""
+
+    before = model.objects.count()
+    model.objects.bulk_create(
+        [model(**dict(zip(fields, row))) for row in batch],
+        ignore_conflicts=True
+    )
+    return model.objects.count() - before
+
+
+def load_rows(model, fields, rows, batch_size=BATCH_SIZE, report=None):
+    """Загружает строки пачками, повторная загрузка ничего не дублирует.
+
+    Возвращает количество прочитанных и добавленных строк.
+    """
+
+    load_batch = (
+        copy_batch if connection.vendor == 'postgresql' else insert_batch
+    )
+    processed = created = 0
+    for batch in batched(rows, batch_size):
+        processed += len(batch)
+        created += load_batch(model, fields, batch)
+        if report:
+            report(processed, created)
+    invalidate(table_version_name(model._meta.db_table))
+    return processed, created
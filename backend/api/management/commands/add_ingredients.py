@@ -1,7 +1,10 @@
-import csv
+import os
+import time
 
 from django.core.management.base import BaseCommand
 
+from api.cache import invalidate
+from api.loaders import BATCH_SIZE, load_rows, read_rows
 from foodgram.settings import CSV_FILES_DIR
 from recipes.models import Ingredient
 
@@ -9,27 +12,40 @@ from recipes.models import Ingredient
 class Command(BaseCommand):
     """Команда для загрузки ингредиентов в базу данных """
 
-    help = 'Загрузка ингредиентов в базу данных'
+    help = 'Загрузка ингредиентов в базу данных из CSV, JSON или JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=os.path.join(CSV_FILES_DIR, 'ingredients.csv'),
+            help='Путь к файлу с ингредиентами'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Количество строк в одной пачке'
+        )
 
     def handle(self, *args, **kwargs):
-        with open(
-                f'{CSV_FILES_DIR}/ingredients.csv', encoding='utf-8'
-        ) as file:
-            reader = csv.reader(file)
-            next(reader)
-            for row in reader:
-                name, measurement_unit = row[0], row[1]
-                if not Ingredient.objects.filter(
-                    name=name, measurement_unit=measurement_unit
-                ).exists():
-                    Ingredient.objects.create(
-                        name=name, measurement_unit=measurement_unit
-                    )
+        started = time.monotonic()
+
+        def report(processed, created):
             self.stdout.write(
-                self.style.SUCCESS('Ингредиенты в базу данных загружены')
+                f'Обработано {processed}, добавлено {created} '
+                f'({time.monotonic() - started:.1f} с)'
             )
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f'Добавлено {Ingredient.objects.count()} ингредиентов'
-                )
+
+        processed, created = load_rows(
+            Ingredient,
+            ('name', 'measurement_unit'),
+            read_rows(kwargs['path'], ('name', 'measurement_unit')),
+            kwargs['batch_size'],
+            report
+        )
+        invalidate('ingredients')
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Добавлено {created} ингредиентов из {processed} '
+                f'за {time.monotonic() - started:.1f} с'
             )
+        )
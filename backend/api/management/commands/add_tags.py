@@ -1,32 +1,44 @@
-import csv
+import os
+import time
 
-from django.core.management.base import BaseCommand
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
 
+from api.cache import invalidate
+from api.loaders import load_rows, read_rows
 from foodgram.settings import CSV_FILES_DIR
 from recipes.models import Tag
+from recipes.tag_masks import assign_tag_bits
 
 
 class Command(BaseCommand):
-    """Команда для загрузки ингредиентов в базу данных """
+    """Команда для загрузки тегов в базу данных """
 
-    help = 'Загрузка ингредиентов в базу данных'
+    help = 'Загрузка тегов в базу данных из CSV, JSON или JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=os.path.join(CSV_FILES_DIR, 'tags.csv'),
+            help='Путь к файлу с тегами'
+        )
 
     def handle(self, *args, **kwargs):
-        with open(
-                f'{CSV_FILES_DIR}/tags.csv', encoding='utf-8'
-        ) as file:
-            csv_reader = csv.reader(file, delimiter=',', quotechar='"')
-            new_tags = []
-            for row in csv_reader:
-                name, color, slug = row[0], row[1], row[2]
-                if not Tag.objects.filter(
-                    name=name, color=color, slug=slug
-                ).exists():
-                    new_tags.append(Tag(name=name, color=color, slug=slug))
-            Tag.objects.bulk_create(new_tags)
-            self.stdout.write(
-                self.style.SUCCESS('Теги в базу данных загружены')
-            )
-            self.stdout.write(
-                self.style.SUCCESS(f'Добавлено {len(new_tags)} тегов')
+        started = time.monotonic()
+        processed, created = load_rows(
+            Tag,
+            ('name', 'color', 'slug'),
+            read_rows(kwargs['path'], ('name', 'color', 'slug')),
+        )
+        try:
+            assign_tag_bits()
+        except ValidationError as error:
+            raise CommandError(error.messages[0])
+        invalidate('tags')
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Добавлено {created} тегов из {processed} '
+                f'за {time.monotonic() - started:.1f} с'
             )
+        )
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.recommendations import build_recommendations
+
+
+class Command(BaseCommand):
+    """Команда для расчёта рекомендаций"""
+
+    help = (
+        'Расчёт похожих рецептов и рекомендаций пользователям по '
+        'избранному и спискам покупок. По умолчанию пересчитываются '
+        'только рецепты и пользователи с новыми добавлениями.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Полный пересчёт, учитывающий и удаления'
+        )
+
+    def handle(self, *args, **kwargs):
+        started = time.monotonic()
+
+        def report(full, recipes, users):
+            mode = 'Полный' if full else 'Частичный'
+            self.stdout.write(self.style.SUCCESS(
+                f'{mode} пересчёт: рецептов {recipes}, пользователей '
+                f'{users} за {time.monotonic() - started:.1f} с'
+            ))
+
+        build_recommendations(full=kwargs['full'], report=report)
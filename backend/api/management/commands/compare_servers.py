@@ -0,0 +1,84 @@
+import io
+import os
+import subprocess
+import sys
+import time
+
+import requests
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+SERVERS = (
+    ('WSGI, синхронные воркеры', 'False'),
+    ('ASGI, воркеры uvicorn', 'True'),
+)
+
+
+class Command(BaseCommand):
+    """Команда для сравнения WSGI и ASGI под нагрузкой"""
+
+    help = (
+        'Запускает gunicorn по очереди с синхронными воркерами и с '
+        'воркерами uvicorn и прогоняет на каждом load_test с одинаковыми '
+        'параметрами. База должна быть заполнена командой generate_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8100)
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--clients', type=int, default=20)
+        parser.add_argument('--slow-clients', type=int, default=4)
+        parser.add_argument('--duration', type=float, default=20)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--prefix', default='load')
+        parser.add_argument('--password', default='loadtest-password')
+
+    def wait_ready(self, url, server):
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError('Сервер завершился при запуске')
+            try:
+                if requests.get(f'{url}/api/tags/', timeout=1).ok:
+                    return
+            except requests.RequestException:
+                pass
+            time.sleep(0.5)
+        raise CommandError('Сервер не ответил за 30 с')
+
+    def run_server(self, asgi, options):
+        url = f'http://127.0.0.1:{options["port"]}'
+        server = subprocess.Popen(
+            [
+                sys.executable, '-m', 'gunicorn',
+                '--bind', f'127.0.0.1:{options["port"]}',
+                '--workers', str(options['workers']),
+            ],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, 'GUNICORN_ASGI': asgi},
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            self.wait_ready(url, server)
+            output = io.StringIO()
+            call_command(
+                'load_test', url=url, stdout=output,
+                clients=options['clients'],
+                slow_clients=options['slow_clients'],
+                duration=options['duration'],
+                users=options['users'],
+                prefix=options['prefix'],
+                password=options['password'],
+            )
+            return output.getvalue()
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    def handle(self, *args, **options):
+        for title, asgi in SERVERS:
+            self.stdout.write(self.style.MIGRATE_HEADING(title))
+            self.stdout.write(self.run_server(asgi, options))
+        self.stdout.write(self.style.SUCCESS('Сравнение завершено'))
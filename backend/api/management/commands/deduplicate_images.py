@@ -0,0 +1,39 @@
+from django.core.files import File
+from django.core.management.base import BaseCommand
+
+from api.cache import invalidate
+from recipes.images import update_image_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """Команда для переноса картинок рецептов в хранилище по хэшу"""
+
+    help = (
+        'Переименование картинок рецептов по хэшу содержимого '
+        'с удалением одинаковых копий'
+    )
+
+    def handle(self, *args, **kwargs):
+        moved = deleted = freed = 0
+        for recipe in Recipe.objects.exclude(image='').iterator():
+            storage = recipe.image.storage
+            old_name = recipe.image.name
+            if storage.is_hashed(old_name) or not storage.exists(old_name):
+                continue
+            with storage.open(old_name, 'rb') as file:
+                new_name = storage.save(old_name, File(file, old_name))
+            Recipe.objects.filter(pk=recipe.pk).update(image=new_name)
+            recipe.image.name = new_name
+            update_image_variants(recipe)
+            moved += 1
+            if not Recipe.objects.filter(image=old_name).exists():
+                freed += storage.size(old_name)
+                storage.delete(old_name)
+                deleted += 1
+        invalidate('recipes')
+        invalidate('recipe_references')
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено картинок: {moved}, удалено файлов: {deleted}, '
+            f'освобождено {freed / 1024 / 1024:.1f} МБ'
+        ))
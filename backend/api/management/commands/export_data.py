@@ -0,0 +1,39 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.transfer import export_data
+
+
+class Command(BaseCommand):
+    """Команда для выгрузки данных в JSONL"""
+
+    help = (
+        'Выгрузка пользователей, рецептов, тегов, ингредиентов, избранного, '
+        'списков покупок и подписок в JSONL'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Путь к файлу, по умолчанию стандартный вывод'
+        )
+
+    def handle(self, *args, **kwargs):
+        started = time.monotonic()
+
+        def report(label, total):
+            self.stderr.write(
+                f'{label}: {total} ({time.monotonic() - started:.1f} с)'
+            )
+
+        if kwargs['path'] == '-':
+            export_data(sys.stdout, report)
+            return
+        with open(kwargs['path'], 'w', encoding='utf-8') as file:
+            export_data(file, report)
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные выгружены в {kwargs["path"]} '
+            f'за {time.monotonic() - started:.1f} с'
+        ))
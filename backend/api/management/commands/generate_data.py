@@ -0,0 +1,176 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.cache import invalidate
+from api.counts import table_version_name
+from api.recipe_index import INDEX_NAME
+from recipes.cart_totals import refresh_cart_totals
+from recipes.counters import rebuild_counters
+from recipes.models import (
+    Favorite, Ingredient, IngredientInRecipe, Recipe, ShoppingCart,
+    Subscribe, Tag,
+)
+from recipes.tag_masks import rebuild_tags
+from users.models import User
+
+BATCH_SIZE = 2000
+
+
+class Command(BaseCommand):
+    """Команда для генерации тестовых данных"""
+
+    help = (
+        'Генерация воспроизводимого набора пользователей, рецептов, '
+        'избранного, списков покупок и подписок для нагрузочных тестов. '
+        'Ингредиенты и теги должны быть загружены заранее.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument(
+            '--recipes', type=int, default=10,
+            help='Среднее количество рецептов на пользователя'
+        )
+        parser.add_argument(
+            '--favorites', type=int, default=20,
+            help='Среднее количество рецептов в избранном пользователя'
+        )
+        parser.add_argument(
+            '--cart', type=int, default=5,
+            help='Среднее количество рецептов в списке покупок'
+        )
+        parser.add_argument(
+            '--subscriptions', type=int, default=10,
+            help='Среднее количество подписок пользователя'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='load')
+        parser.add_argument(
+            '--password', default='loadtest-password',
+            help='Пароль всех созданных пользователей'
+        )
+
+    def log(self, message):
+        self.stdout.write(
+            f'{message} ({time.monotonic() - self.started:.1f} с)'
+        )
+
+    def create_users(self, options):
+        password = make_password(options['password'])
+        prefix = options['prefix']
+        users = [
+            User(
+                username=f'{prefix}{number}',
+                email=f'{prefix}{number}@example.com',
+                first_name=f'Имя{number}',
+                last_name=f'Фамилия{number}',
+                password=password,
+            )
+            for number in range(options['users'])
+        ]
+        User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+        self.log(f'Пользователей: {len(users)}')
+        return list(User.objects.filter(
+            username__startswith=prefix
+        ).order_by('pk').values_list('pk', flat=True))
+
+    def create_recipes(self, rng, user_ids, options):
+        ingredient_ids = list(
+            Ingredient.objects.order_by('pk').values_list('pk', flat=True)
+        )
+        tag_ids = list(Tag.objects.order_by('pk').values_list('pk', flat=True))
+        total = len(user_ids) * options['recipes']
+        today = date.today()
+        recipe_ids = []
+        for start in range(0, total, BATCH_SIZE):
+            size = min(BATCH_SIZE, total - start)
+            recipes = [
+                Recipe(
+                    author_id=rng.choice(user_ids),
+                    name=f'Рецепт {start + number}',
+                    text='Описание рецепта. ' * rng.randint(3, 30),
+                    cooking_time=rng.randint(5, 180),
+                )
+                for number in range(size)
+            ]
+            Recipe.objects.bulk_create(recipes)
+            for recipe in recipes:
+                recipe.created = today - timedelta(days=rng.randint(0, 730))
+            Recipe.objects.bulk_update(recipes, ('created',))
+            max_ingredients = min(12, len(ingredient_ids))
+            IngredientInRecipe.objects.bulk_create([
+                IngredientInRecipe(
+                    recipe=recipe, ingredient_id=ingredient_id,
+                    amount=rng.randint(1, 500)
+                )
+                for recipe in recipes
+                for ingredient_id in rng.sample(
+                    ingredient_ids, rng.randint(1, max_ingredients)
+                )
+            ])
+            Recipe.tags.through.objects.bulk_create([
+                Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag_id)
+                for recipe in recipes
+                for tag_id in rng.sample(
+                    tag_ids, rng.randint(1, min(3, len(tag_ids)))
+                )
+            ])
+            recipe_ids.extend(recipe.pk for recipe in recipes)
+            self.log(f'Рецептов: {len(recipe_ids)} из {total}')
+        return recipe_ids
+
+    def create_relations(self, rng, model, related_field, user_ids,
+                         related_ids, average):
+        objects = []
+        for user_id in user_ids:
+            count = min(rng.randint(0, average * 2), len(related_ids))
+            objects.extend(
+                model(user_id=user_id, **{f'{related_field}_id': related_id})
+                for related_id in rng.sample(related_ids, count)
+                if related_id != user_id or related_field != 'author'
+            )
+            if len(objects) >= BATCH_SIZE:
+                model.objects.bulk_create(objects, ignore_conflicts=True)
+                objects = []
+        model.objects.bulk_create(objects, ignore_conflicts=True)
+        self.log(f'{model._meta.verbose_name_plural}: готово')
+
+    def handle(self, *args, **options):
+        if not Ingredient.objects.exists() or not Tag.objects.exists():
+            raise CommandError(
+                'Сначала загрузите ингредиенты и теги: '
+                'add_ingredients и add_tags'
+            )
+        self.started = time.monotonic()
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            user_ids = self.create_users(options)
+            recipe_ids = self.create_recipes(rng, user_ids, options)
+            self.create_relations(
+                rng, Favorite, 'recipe', user_ids, recipe_ids,
+                options['favorites']
+            )
+            self.create_relations(
+                rng, ShoppingCart, 'recipe', user_ids, recipe_ids,
+                options['cart']
+            )
+            self.create_relations(
+                rng, Subscribe, 'author', user_ids, user_ids,
+                options['subscriptions']
+            )
+            rebuild_counters()
+            refresh_cart_totals()
+            rebuild_tags()
+        for name in ('tags', 'recipes', 'recipe_references', INDEX_NAME):
+            invalidate(name)
+        for model in (User, Recipe, IngredientInRecipe, Favorite,
+                      ShoppingCart, Subscribe, Recipe.tags.through):
+            invalidate(table_version_name(model._meta.db_table))
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные сгенерированы за {time.monotonic() - self.started:.1f} с'
+        ))
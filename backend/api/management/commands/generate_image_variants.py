@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from api.cache import invalidate
+from recipes.images import update_image_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """Команда для создания уменьшенных копий картинок рецептов"""
+
+    help = 'Создание уменьшенных копий WebP для картинок рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересоздать копии, даже если они уже есть'
+        )
+
+    def handle(self, *args, **kwargs):
+        updated = 0
+        for recipe in Recipe.objects.exclude(image='').iterator():
+            if kwargs['force']:
+                recipe.image_variants = {
+                    name: path
+                    for name, path in recipe.image_variants.items()
+                    if name != 'source'
+                }
+            elif recipe.image_variants.get('source') == recipe.image.name:
+                continue
+            update_image_variants(recipe)
+            updated += 1
+        invalidate('recipes')
+        invalidate('recipe_references')
+        self.stdout.write(
+            self.style.SUCCESS(f'Обработано картинок: {updated}')
+        )
@@ -0,0 +1,52 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.transfer import BATCH_SIZE, import_data
+
+
+class Command(BaseCommand):
+    """Команда для загрузки данных из JSONL"""
+
+    help = (
+        'Загрузка данных, выгруженных командой export_data. '
+        'Прерванную загрузку можно продолжить повторным запуском.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к JSONL-файлу')
+        parser.add_argument(
+            '--checkpoint',
+            help='Название контрольной точки в базе, по умолчанию '
+                 'полный путь к файлу'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Количество объектов в одной пачке'
+        )
+
+    def handle(self, *args, **kwargs):
+        started = time.monotonic()
+
+        def report(label, line, total, created, skipped):
+            self.stdout.write(
+                f'{label}: строка {line}, обработано {total}, '
+                f'загружено {created} ({time.monotonic() - started:.1f} с)'
+            )
+            if skipped:
+                self.stderr.write(self.style.WARNING(
+                    f'{label}: не загружены из-за конфликта уникальных '
+                    f'полей, id в файле: {", ".join(map(str, skipped))}'
+                ))
+
+        with open(kwargs['path'], encoding='utf-8') as file:
+            import_data(
+                file,
+                kwargs['checkpoint'] or os.path.abspath(kwargs['path']),
+                kwargs['batch_size'],
+                report
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные загружены за {time.monotonic() - started:.1f} с'
+        ))
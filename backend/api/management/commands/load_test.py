@@ -0,0 +1,203 @@
+import random
+import socket
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import requests
+from django.core.management.base import BaseCommand
+
+# (название, метод, шаблон адреса, нужна ли авторизация, вес)
+SCENARIOS = (
+    ('recipes anonymous', 'get', '/api/recipes/?page={page}', False, 30),
+    ('recipes', 'get', '/api/recipes/?page={page}&limit=12', True, 25),
+    ('recipe detail', 'get', '/api/recipes/{recipe}/', True, 15),
+    ('subscriptions', 'get',
+     '/api/users/subscriptions/?recipes_limit=3', True, 10),
+    ('download_shopping_cart', 'get',
+     '/api/recipes/download_shopping_cart/', True, 5),
+    ('favorite toggle', 'toggle', '/api/recipes/{recipe}/favorite/', True, 8),
+    ('shopping_cart toggle', 'toggle',
+     '/api/recipes/{recipe}/shopping_cart/', True, 7),
+)
+
+
+def percentile(values, percent):
+    if not values:
+        return 0
+    values = sorted(values)
+    index = max(0, min(len(values) - 1, round(percent / 100 * len(values)) - 1))
+    return values[index]
+
+
+class Command(BaseCommand):
+    """Команда для нагрузочного тестирования API"""
+
+    help = (
+        'Нагрузочный тест основных эндпоинтов API несколькими '
+        'параллельными клиентами. Число SQL-запросов берётся из заголовка '
+        'X-DB-Queries, который включается настройкой QUERY_COUNT_HEADER. '
+        'Медленные клиенты отправляют тело запроса по байту, как при '
+        'загрузке картинки по плохой сети.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--clients', type=int, default=10)
+        parser.add_argument(
+            '--duration', type=float, default=30, help='Длительность в секундах'
+        )
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--prefix', default='load')
+        parser.add_argument('--password', default='loadtest-password')
+        parser.add_argument(
+            '--pages', type=int, default=50,
+            help='Номер последней запрашиваемой страницы рецептов'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--slow-clients', type=int, default=0,
+            help='Количество медленных клиентов'
+        )
+        parser.add_argument(
+            '--slow-interval', type=float, default=1,
+            help='Пауза между байтами медленного клиента в секундах'
+        )
+
+    def login(self, options, number):
+        response = requests.post(
+            f'{options["url"]}/api/auth/token/login/',
+            json={
+                'email': f'{options["prefix"]}{number}@example.com',
+                'password': options['password'],
+            },
+            timeout=30
+        )
+        response.raise_for_status()
+        return response.json()['auth_token']
+
+    def recipe_ids(self, options):
+        response = requests.get(
+            f'{options["url"]}/api/recipes/?limit=100', timeout=30
+        )
+        response.raise_for_status()
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    def run_client(self, number, options, token, recipes, deadline):
+        rng = random.Random(options['seed'] + number)
+        session = requests.Session()
+        weights = [scenario[4] for scenario in SCENARIOS]
+        while time.monotonic() < deadline:
+            name, method, url, auth, _ = rng.choices(SCENARIOS, weights)[0]
+            url = options['url'] + url.format(
+                page=rng.randint(1, options['pages']),
+                recipe=rng.choice(recipes)
+            )
+            headers = {'Authorization': f'Token {token}'} if auth else {}
+            if method == 'toggle':
+                calls = (('post', url), ('delete', url))
+            else:
+                calls = ((method, url),)
+            for http_method, call_url in calls:
+                started = time.monotonic()
+                try:
+                    response = session.request(
+                        http_method, call_url, headers=headers, timeout=60
+                    )
+                    content = response.content
+                    error = response.status_code >= 500
+                    queries = response.headers.get('X-DB-Queries')
+                except requests.RequestException:
+                    content, error, queries = b'', True, None
+                elapsed = time.monotonic() - started
+                with self.lock:
+                    result = self.results[f'{http_method.upper()} {name}']
+                    result['latency'].append(elapsed)
+                    result['errors'] += error
+                    result['bytes'] += len(content)
+                    if queries is not None:
+                        result['queries'].append(int(queries))
+
+    def run_slow_client(self, options, token, deadline):
+        address = urlsplit(options['url'])
+        head = (
+            f'POST /api/recipes/ HTTP/1.1\r\n'
+            f'Host: {address.netloc}\r\n'
+            f'Authorization: Token {token}\r\n'
+            f'Content-Type: application/json\r\n'
+            f'Content-Length: 1000000\r\n\r\n'
+        ).encode()
+        while time.monotonic() < deadline:
+            try:
+                with socket.create_connection(
+                    (address.hostname, address.port or 80), timeout=60
+                ) as connection:
+                    connection.sendall(head)
+                    while time.monotonic() < deadline:
+                        connection.sendall(b' ')
+                        time.sleep(options['slow_interval'])
+            except OSError:
+                time.sleep(options['slow_interval'])
+
+    def handle(self, *args, **options):
+        self.lock = threading.Lock()
+        self.results = defaultdict(
+            lambda: {'latency': [], 'errors': 0, 'bytes': 0, 'queries': []}
+        )
+        tokens = [
+            self.login(options, number % options['users'])
+            for number in range(options['clients'])
+        ]
+        recipes = self.recipe_ids(options)
+        deadline = time.monotonic() + options['duration']
+        threads = [
+            threading.Thread(
+                target=self.run_client,
+                args=(number, options, tokens[number], recipes, deadline)
+            )
+            for number in range(options['clients'])
+        ] + [
+            threading.Thread(
+                target=self.run_slow_client,
+                args=(options, tokens[number % len(tokens)], deadline),
+                daemon=True
+            )
+            for number in range(options['slow_clients'])
+        ]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+        self.report(elapsed)
+
+    def report(self, elapsed):
+        header = (
+            f'{"endpoint":<34}{"requests":>9}{"rps":>8}{"errors":>7}'
+            f'{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"queries":>9}'
+            f'{"KB":>9}'
+        )
+        self.stdout.write(header)
+        total = 0
+        for name, result in sorted(self.results.items()):
+            latency = result['latency']
+            queries = result['queries']
+            total += len(latency)
+            mean_queries = (
+                f'{sum(queries) / len(queries):.1f}' if queries else '-'
+            )
+            self.stdout.write(
+                f'{name:<34}{len(latency):>9}{len(latency) / elapsed:>8.1f}'
+                f'{result["errors"]:>7}'
+                f'{percentile(latency, 50) * 1000:>9.1f}'
+                f'{percentile(latency, 95) * 1000:>9.1f}'
+                f'{percentile(latency, 99) * 1000:>9.1f}'
+                f'{mean_queries:>9}'
+                f'{result["bytes"] / len(latency) / 1024:>9.1f}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Всего {total} запросов за {elapsed:.1f} с, '
+            f'{total / elapsed:.1f} запросов в секунду'
+        ))
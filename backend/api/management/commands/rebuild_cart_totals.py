@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.cart_totals import refresh_cart_totals
+
+
+class Command(BaseCommand):
+    """Команда для пересчёта сумм ингредиентов в списках покупок"""
+
+    help = 'Пересчёт сумм ингредиентов в списках покупок всех пользователей'
+
+    def handle(self, *args, **kwargs):
+        with transaction.atomic():
+            refresh_cart_totals()
+        self.stdout.write(self.style.SUCCESS('Списки покупок пересчитаны'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.cache import invalidate
+from recipes.counters import rebuild_counters
+from recipes.tag_masks import rebuild_tags
+
+
+class Command(BaseCommand):
+    """Команда для пересчёта счётчиков рецептов и пользователей"""
+
+    help = 'Пересчёт счётчиков избранного, списков покупок, рецептов, подписчиков и тегов'
+
+    def handle(self, *args, **kwargs):
+        with transaction.atomic():
+            rebuild_counters()
+            rebuild_tags()
+        invalidate('tags')
+        self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны'))
@@ -0,0 +1,35 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from api.jobs import work
+
+
+class Command(BaseCommand):
+    """Команда для выполнения фоновых задач"""
+
+    help = (
+        'Обработчик очереди фоновых задач: картинки рецептов и другая '
+        'тяжёлая работа после записи. Можно запускать несколько '
+        'обработчиков одновременно.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить задачи из очереди и завершиться'
+        )
+
+    def handle(self, *args, **kwargs):
+        stopping = False
+
+        def stop(signum, frame):
+            nonlocal stopping
+            stopping = True
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        processed = work(lambda: stopping, once=kwargs['once'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Выполнено задач: {processed}')
+        )
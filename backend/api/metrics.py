@@ -0,0 +1,112 @@
+import ipaddress
+import os
+import secrets
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Histogram,
+    generate_latest, multiprocess,
+)
+
+LABELS = ('view', 'method')
+
+REQUEST_DURATION = Histogram(
+    'foodgram_request_duration_seconds',
+    'Время обработки запроса',
+    LABELS,
+)
+REQUEST_QUERIES = Histogram(
+    'foodgram_request_queries',
+    'Количество SQL-запросов на запрос',
+    LABELS,
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, float('inf')),
+)
+REQUEST_SQL_DURATION = Histogram(
+    'foodgram_request_sql_duration_seconds',
+    'Суммарное время SQL-запросов на запрос',
+    LABELS,
+)
+RESPONSE_BYTES = Histogram(
+    'foodgram_response_bytes',
+    'Размер тела ответа',
+    LABELS,
+    buckets=tuple(4 ** power for power in range(3, 13)) + (float('inf'),),
+)
+
+
+def view_label(view_class, action):
+    return f'{view_class.__name__}.{action}'
+
+
+def get_view_name(request):
+    """Название представления для меток, например RecipeViewSet.list.
+
+    Асинхронные представления задают его атрибутом view_label, чтобы
+    их запросы попадали в те же ряды, что и запросы к синхронным.
+
+    Для ненайденных адресов возвращается общее название, чтобы число
+    рядов метрик не зависело от запросов клиентов.
+    """
+
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'not_found'
+    label = getattr(match.func, 'view_label', None)
+    if label is not None:
+        return label
+    view_class = getattr(match.func, 'cls', None)
+    if view_class is None:
+        return match.view_name or match.func.__name__
+    actions = getattr(match.func, 'actions', None) or {}
+    action = actions.get(request.method.lower(), request.method.lower())
+    return view_label(view_class, action)
+
+
+def observe(request, duration, queries, sql_duration, size):
+    labels = (get_view_name(request), request.method)
+    REQUEST_DURATION.labels(*labels).observe(duration)
+    REQUEST_QUERIES.labels(*labels).observe(queries)
+    REQUEST_SQL_DURATION.labels(*labels).observe(sql_duration)
+    RESPONSE_BYTES.labels(*labels).observe(size)
+
+
+def metrics_allowed(request):
+    """Доступ к метрикам: с адресов и сетей из METRICS_ALLOWED_IPS
+    или с заголовком Authorization: Bearer <METRICS_TOKEN>."""
+
+    if settings.METRICS_TOKEN:
+        scheme, _, token = request.headers.get(
+            'Authorization', ''
+        ).partition(' ')
+        if scheme.lower() == 'bearer' and secrets.compare_digest(
+            token.encode(), settings.METRICS_TOKEN.encode()
+        ):
+            return True
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network, strict=False)
+        for network in settings.METRICS_ALLOWED_IPS
+    )
+
+
+def metrics_view(request):
+    """Метрики в текстовом формате Prometheus.
+
+    Под gunicorn каждый воркер пишет метрики в файлы каталога
+    PROMETHEUS_MULTIPROC_DIR, здесь они собираются вместе.
+    """
+
+    if not metrics_allowed(request):
+        return HttpResponseForbidden()
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(
+        generate_latest(registry), content_type=CONTENT_TYPE_LATEST
+    )
@@ -0,0 +1,268 @@
+import hashlib
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from asgiref.sync import (
+    iscoroutinefunction, markcoroutinefunction, sync_to_async,
+)
+from django.conf import settings
+from django.core.cache import cache
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from . import metrics
+from .db_routers import use_replica
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Счётчики текущего запроса. Переменная контекста передаётся и в потоки
+# sync_to_async, поэтому запросы считаются и под ASGI.
+active_counters = ContextVar('active_counters', default=())
+
+
+class QueryCounter:
+    """Считает SQL-запросы и их суммарное время."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+
+
+def record_query(execute, sql, params, many, context):
+    counters = active_counters.get()
+    if not counters:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        for counter in counters:
+            counter.count += 1
+            counter.duration += duration
+
+
+@receiver(connection_created)
+def install_query_counter(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def stop_counting(counter):
+    active_counters.set(tuple(
+        active for active in active_counters.get() if active is not counter
+    ))
+
+
+def count_queries(counter):
+    """Считает в counter запросы до закрытия возвращаемого ExitStack."""
+
+    active_counters.set((*active_counters.get(), counter))
+    stack = ExitStack()
+    stack.callback(stop_counting, counter)
+    return stack
+
+
+class AsyncCapableMiddleware:
+    """Основа для middleware, работающего под WSGI и под ASGI.
+
+    Под ASGI синхронный middleware переводит всю цепочку в один поток,
+    и асинхронные представления теряют смысл. Наследники реализуют
+    call для WSGI и acall для ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.acall(request)
+        return self.call(request)
+
+
+class QueryCountMiddleware(AsyncCapableMiddleware):
+    """Добавляет к ответу заголовок X-DB-Queries с числом SQL-запросов.
+
+    Включается настройкой QUERY_COUNT_HEADER, используется командой
+    load_test.
+    """
+
+    def call(self, request):
+        if not settings.QUERY_COUNT_HEADER:
+            return self.get_response(request)
+        counter = QueryCounter()
+        with count_queries(counter):
+            response = self.get_response(request)
+        response['X-DB-Queries'] = counter.count
+        return response
+
+    async def acall(self, request):
+        if not settings.QUERY_COUNT_HEADER:
+            return await self.get_response(request)
+        counter = QueryCounter()
+        with count_queries(counter):
+            response = await self.get_response(request)
+        response['X-DB-Queries'] = counter.count
+        return response
+
+
+class MetricsMiddleware(AsyncCapableMiddleware):
+    """Собирает метрики Prometheus по каждому представлению.
+
+    Для потоковых ответов метрики записываются после отправки
+    последней части, так как запросы к базе выполняются и во время
+    генерации тела ответа.
+    """
+
+    def start(self, request):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        stack = count_queries(counter)
+
+        def finish(size):
+            stack.close()
+            metrics.observe(
+                request, time.perf_counter() - started,
+                counter.count, counter.duration, size
+            )
+
+        return stack, finish
+
+    def observe(self, response, finish):
+        if not response.streaming:
+            finish(len(response.content))
+        elif response.is_async:
+            response.streaming_content = self.astream(
+                response.streaming_content, finish
+            )
+        else:
+            response.streaming_content = self.stream(
+                response.streaming_content, finish
+            )
+        return response
+
+    def call(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        stack, finish = self.start(request)
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            stack.close()
+            raise
+        return self.observe(response, finish)
+
+    async def acall(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+        stack, finish = self.start(request)
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            stack.close()
+            raise
+        return self.observe(response, finish)
+
+    def stream(self, content, finish):
+        size = 0
+        try:
+            for chunk in content:
+                size += len(chunk)
+                yield chunk
+        finally:
+            finish(size)
+
+    async def astream(self, content, finish):
+        size = 0
+        try:
+            async for chunk in content:
+                size += len(chunk)
+                yield chunk
+        finally:
+            finish(size)
+
+
+class ReplicaMiddleware(AsyncCapableMiddleware):
+    """Выполняет безопасные запросы к API на репликах.
+
+    После успешного изменяющего запроса клиент на REPLICA_PIN_SECONDS
+    закрепляется за основной базой, чтобы не увидеть отставшую
+    реплику. Закрепление хранится в cookie и, для клиентов без cookie,
+    в кэше по токену: из заголовка Authorization или, при входе,
+    из ответа с новым токеном.
+    """
+
+    cookie_name = 'use_primary'
+
+    def get_pin_key(self, token):
+        if not token:
+            return None
+        digest = hashlib.sha256(token.encode()).hexdigest()
+        return f'replica_pin:{digest}'
+
+    def get_request_token(self, request):
+        # Заголовок вида «Token <ключ>».
+        authorization = request.headers.get('Authorization', '').split()
+        return authorization[-1] if authorization else None
+
+    def get_response_token(self, response):
+        data = getattr(response, 'data', None)
+        if isinstance(data, dict):
+            return data.get('auth_token')
+        return None
+
+    def is_pinned(self, request):
+        if self.cookie_name in request.COOKIES:
+            return True
+        key = self.get_pin_key(self.get_request_token(request))
+        return key is not None and cache.get(key) is not None
+
+    def pin(self, request, response):
+        timeout = settings.REPLICA_PIN_SECONDS
+        for token in {
+            self.get_request_token(request),
+            self.get_response_token(response),
+        }:
+            key = self.get_pin_key(token)
+            if key is not None:
+                cache.set(key, True, timeout)
+        response.set_cookie(
+            self.cookie_name, '1', max_age=timeout,
+            httponly=True, samesite='Lax'
+        )
+
+    def can_use_replica(self, request):
+        return (
+            settings.REPLICA_DATABASES
+            and request.path.startswith('/api/')
+            and not self.is_pinned(request)
+        )
+
+    def call(self, request):
+        if request.method not in SAFE_METHODS:
+            response = self.get_response(request)
+            if response.status_code < 400:
+                self.pin(request, response)
+            return response
+        if not self.can_use_replica(request):
+            return self.get_response(request)
+        with use_replica():
+            return self.get_response(request)
+
+    async def acall(self, request):
+        if request.method not in SAFE_METHODS:
+            response = await self.get_response(request)
+            if response.status_code < 400:
+                await sync_to_async(self.pin)(request, response)
+            return response
+        if not await sync_to_async(self.can_use_replica)(request):
+            return await self.get_response(request)
+        with use_replica():
+            return await self.get_response(request)
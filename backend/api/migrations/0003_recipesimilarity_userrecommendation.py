@@ -0,0 +1,41 @@
+# Generated by Django 4.2.11 on 2026-10-18 19:28
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_user_counters'),
+        ('recipes', '0012_recipe_search'),
+        ('api', '0002_recipechange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSimilarity',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='similarity', serialize=False, to='recipes.recipe', verbose_name='Рецепт')),
+                ('recipe_ids', models.JSONField(default=list, verbose_name='id похожих рецептов')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Дата расчёта')),
+            ],
+            options={
+                'verbose_name': 'Похожие рецепты',
+                'verbose_name_plural': 'Похожие рецепты',
+            },
+        ),
+        migrations.CreateModel(
+            name='UserRecommendation',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recommendation', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('recipe_ids', models.JSONField(default=list, verbose_name='id рекомендованных рецептов')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Дата расчёта')),
+            ],
+            options={
+                'verbose_name': 'Рекомендации пользователю',
+                'verbose_name_plural': 'Рекомендации пользователям',
+            },
+        ),
+    ]
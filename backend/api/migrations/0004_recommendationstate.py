@@ -0,0 +1,25 @@
+# Generated by Django 4.2.11 on 2026-10-18 20:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_recipesimilarity_userrecommendation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecommendationState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_ids', models.JSONField(default=list, verbose_name='Последние id взаимодействий')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Дата расчёта')),
+            ],
+            options={
+                'verbose_name': 'Состояние рекомендаций',
+                'verbose_name_plural': 'Состояние рекомендаций',
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.11 on 2026-10-18 20:13
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_user_counters'),
+        ('api', '0004_recommendationstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListFile',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='shopping_list_file', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('file', models.FileField(upload_to='shopping_lists/', verbose_name='Файл')),
+                ('digest', models.CharField(max_length=64, verbose_name='Отпечаток списка')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Дата сборки')),
+            ],
+            options={
+                'verbose_name': 'Список покупок в PDF',
+                'verbose_name_plural': 'Списки покупок в PDF',
+            },
+        ),
+    ]
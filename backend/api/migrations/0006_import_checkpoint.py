@@ -0,0 +1,45 @@
+# Generated by Django 4.2.11 on 2026-10-18 20:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_shoppinglistfile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Название')),
+                ('line', models.PositiveIntegerField(default=0, verbose_name='Обработано строк')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Дата изменения')),
+            ],
+            options={
+                'verbose_name': 'Контрольная точка импорта',
+                'verbose_name_plural': 'Контрольные точки импорта',
+            },
+        ),
+        migrations.CreateModel(
+            name='ImportedId',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label', models.CharField(max_length=50, verbose_name='Модель')),
+                ('old_id', models.BigIntegerField(verbose_name='id в выгрузке')),
+                ('new_id', models.BigIntegerField(verbose_name='id в базе')),
+                ('checkpoint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ids', to='api.importcheckpoint', verbose_name='Контрольная точка')),
+            ],
+            options={
+                'verbose_name': 'Загруженный объект',
+                'verbose_name_plural': 'Загруженные объекты',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='importedid',
+            constraint=models.UniqueConstraint(fields=('checkpoint', 'label', 'old_id'), name='unique_imported_id'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.11 on 2026-10-18 20:43
+
+from django.db import migrations, models
+
+
+def reset_state(apps, schema_editor):
+    # У сохранённых списков нет близости, следующий запуск
+    # build_recommendations будет полным.
+    apps.get_model('api', 'RecommendationState').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_import_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipesimilarity',
+            name='scores',
+            field=models.JSONField(default=list, verbose_name='Косинусная близость'),
+        ),
+        migrations.RunPython(reset_state, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,237 @@
+from django.db import models
+
+
+class Job(models.Model):
+    """Фоновая задача, которую выполняет команда run_worker."""
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField(verbose_name='Задача', max_length=100)
+    payload = models.JSONField(verbose_name='Параметры', default=dict)
+    status = models.CharField(
+        verbose_name='Статус',
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Количество попыток',
+        default=0
+    )
+    run_after = models.DateTimeField(verbose_name='Запустить после')
+    locked_at = models.DateTimeField(
+        verbose_name='Время начала выполнения',
+        null=True,
+        blank=True
+    )
+    error = models.TextField(verbose_name='Ошибка', blank=True)
+    created = models.DateTimeField(
+        verbose_name='Дата создания',
+        auto_now_add=True
+    )
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        ordering = ('id',)
+        indexes = (
+            models.Index(
+                fields=('status', 'run_after'),
+                name='job_status_run_after_idx',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
+
+
+class RecipeChange(models.Model):
+    """Журнал изменений состава рецептов.
+
+    По нему индексы в памяти процессов обновляются постепенно,
+    без полного перестроения.
+    """
+
+    recipe_id = models.BigIntegerField(verbose_name='id рецепта')
+
+    class Meta:
+        verbose_name = 'Изменение рецепта'
+        verbose_name_plural = 'Изменения рецептов'
+        ordering = ('id',)
+
+    def __str__(self):
+        return f'{self.recipe_id} #{self.pk}'
+
+
+class RecipeSimilarity(models.Model):
+    """Похожие рецепты, рассчитанные командой build_recommendations."""
+
+    recipe = models.OneToOneField(
+        'recipes.Recipe',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='similarity',
+        verbose_name='Рецепт'
+    )
+    recipe_ids = models.JSONField(
+        verbose_name='id похожих рецептов',
+        default=list
+    )
+    scores = models.JSONField(
+        verbose_name='Косинусная близость',
+        default=list
+    )
+    updated = models.DateTimeField(
+        verbose_name='Дата расчёта',
+        auto_now=True
+    )
+
+    class Meta:
+        verbose_name = 'Похожие рецепты'
+        verbose_name_plural = 'Похожие рецепты'
+
+    def __str__(self):
+        return str(self.recipe_id)
+
+
+class UserRecommendation(models.Model):
+    """Рекомендации пользователю, рассчитанные командой
+    build_recommendations."""
+
+    user = models.OneToOneField(
+        'users.User',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='recommendation',
+        verbose_name='Пользователь'
+    )
+    recipe_ids = models.JSONField(
+        verbose_name='id рекомендованных рецептов',
+        default=list
+    )
+    updated = models.DateTimeField(
+        verbose_name='Дата расчёта',
+        auto_now=True
+    )
+
+    class Meta:
+        verbose_name = 'Рекомендации пользователю'
+        verbose_name_plural = 'Рекомендации пользователям'
+
+    def __str__(self):
+        return str(self.user_id)
+
+
+class RecommendationState(models.Model):
+    """Последние учтённые id взаимодействий для постепенного пересчёта
+    рекомендаций. В таблице одна строка."""
+
+    last_ids = models.JSONField(
+        verbose_name='Последние id взаимодействий',
+        default=list
+    )
+    updated = models.DateTimeField(
+        verbose_name='Дата расчёта',
+        auto_now=True
+    )
+
+    class Meta:
+        verbose_name = 'Состояние рекомендаций'
+        verbose_name_plural = 'Состояние рекомендаций'
+
+    def __str__(self):
+        return str(self.last_ids)
+
+
+class ShoppingListFile(models.Model):
+    """Список покупок пользователя в PDF, собранный фоновой задачей.
+
+    digest — отпечаток списка, по которому собран файл. Пока он
+    совпадает с отпечатком текущего списка, файл отдаётся без
+    повторной сборки.
+    """
+
+    user = models.OneToOneField(
+        'users.User',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='shopping_list_file',
+        verbose_name='Пользователь'
+    )
+    file = models.FileField(verbose_name='Файл', upload_to='shopping_lists/')
+    digest = models.CharField(verbose_name='Отпечаток списка', max_length=64)
+    updated = models.DateTimeField(
+        verbose_name='Дата сборки',
+        auto_now=True
+    )
+
+    class Meta:
+        verbose_name = 'Список покупок в PDF'
+        verbose_name_plural = 'Списки покупок в PDF'
+
+    def __str__(self):
+        return str(self.user_id)
+
+
+class ImportCheckpoint(models.Model):
+    """Контрольная точка команды import_data.
+
+    Хранится в той же базе, что и данные, и меняется в одной
+    транзакции с загруженной пачкой, поэтому прерванный импорт
+    продолжается ровно с первой незагруженной строки.
+    """
+
+    name = models.CharField(
+        verbose_name='Название',
+        max_length=255,
+        unique=True
+    )
+    line = models.PositiveIntegerField(
+        verbose_name='Обработано строк',
+        default=0
+    )
+    updated = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True
+    )
+
+    class Meta:
+        verbose_name = 'Контрольная точка импорта'
+        verbose_name_plural = 'Контрольные точки импорта'
+
+    def __str__(self):
+        return self.name
+
+
+class ImportedId(models.Model):
+    """Соответствие id объекта в выгрузке и в базе после импорта."""
+
+    checkpoint = models.ForeignKey(
+        ImportCheckpoint,
+        on_delete=models.CASCADE,
+        related_name='ids',
+        verbose_name='Контрольная точка'
+    )
+    label = models.CharField(verbose_name='Модель', max_length=50)
+    old_id = models.BigIntegerField(verbose_name='id в выгрузке')
+    new_id = models.BigIntegerField(verbose_name='id в базе')
+
+    class Meta:
+        verbose_name = 'Загруженный объект'
+        verbose_name_plural = 'Загруженные объекты'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('checkpoint', 'label', 'old_id'),
+                name='unique_imported_id',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.label} {self.old_id} → {self.new_id}'
@@ -1,7 +1,110 @@
-from rest_framework.pagination import PageNumberPagination
+from datetime import date
+
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+from django.utils.encoding import force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    BasePagination, LimitOffsetPagination, PageNumberPagination,
+)
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .counts import get_count
+
+
+class CachedCountPaginator(Paginator):
+
+    @cached_property
+    def count(self):
+        return get_count(self.object_list)
 
 
 class CustomPagination(PageNumberPagination):
 
+    django_paginator_class = CachedCountPaginator
     page_size_query_param = 'limit'
     page_size = 6
+
+
+class IngredientMatchPagination(CustomPagination):
+    """Постраничный вывод списка, уже собранного в памяти."""
+
+    django_paginator_class = Paginator
+
+
+class CustomLimitOffsetPagination(LimitOffsetPagination):
+
+    def get_count(self, queryset):
+        return get_count(queryset, estimate=True)
+
+
+class RecipeCursorPagination(BasePagination):
+    """Пагинация рецептов по ключу (created, id).
+
+    Следующая страница выбирается условием по последнему рецепту
+    предыдущей, поэтому глубокие страницы не медленнее первой, а при
+    добавлении новых рецептов строки не повторяются и не пропускаются.
+    COUNT(*) не выполняется.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    page_size = 6
+    max_page_size = 100
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def encode_cursor(self, recipe):
+        position = f'{recipe.created.isoformat()}|{recipe.id}'
+        return urlsafe_base64_encode(position.encode())
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            created, pk = force_str(urlsafe_base64_decode(cursor)).split('|')
+            return date.fromisoformat(created), int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by('-created', '-id')
+        position = self.decode_cursor(request)
+        if position is not None:
+            created, pk = position
+            # Условие без OR: created <= даты курсора выбирается
+            # по индексу (-created, -id), а из рецептов с той же датой
+            # отбрасываются уже показанные.
+            queryset = queryset.filter(created__lte=created).exclude(
+                created=created, id__gte=pk
+            )
+        page = list(queryset[:page_size + 1])
+        self.next_recipe = page[page_size - 1] if len(page) > page_size else None
+        return page[:page_size]
+
+    def get_next_link(self):
+        if self.next_recipe is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.next_recipe)
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': None,
+            'results': data,
+        })
@@ -0,0 +1,124 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import (
+    BooleanField, Exists, F, FloatField, OuterRef, Prefetch, Q, Value,
+)
+from django.db.models.expressions import RawSQL
+
+from recipes.models import (
+    Favorite, IngredientInRecipe, Recipe, ShoppingCart, Subscribe,
+)
+from recipes.search import FTS_TABLE, SEARCH_CONFIG
+from users.models import User
+
+
+def annotate_is_subscribed(queryset, user):
+    """Добавляет к пользователям флаг подписки текущего пользователя."""
+
+    if not user.is_authenticated:
+        return queryset.annotate(
+            is_subscribed=Value(False, output_field=BooleanField())
+        )
+    return queryset.annotate(
+        is_subscribed=Exists(
+            Subscribe.objects.filter(user=user, author=OuterRef('pk'))
+        )
+    )
+
+
+def annotate_recipe_flags(queryset, user):
+    """Добавляет к рецептам флаги избранного и списка покупок.
+
+    Авторы и ингредиенты подгружаются отдельными запросами, поэтому
+    число запросов не зависит от количества рецептов на странице.
+    """
+
+    queryset = queryset.prefetch_related(
+        Prefetch(
+            'author',
+            queryset=annotate_is_subscribed(User.objects.all(), user)
+        ),
+        Prefetch(
+            'ingredient_list',
+            queryset=IngredientInRecipe.objects.select_related('ingredient')
+        ),
+        'tags',
+    )
+    if not user.is_authenticated:
+        return queryset.annotate(
+            is_favorited=Value(False, output_field=BooleanField()),
+            is_in_shopping_cart=Value(False, output_field=BooleanField()),
+        )
+    return queryset.annotate(
+        is_favorited=Exists(
+            Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+        ),
+        is_in_shopping_cart=Exists(
+            ShoppingCart.objects.filter(user=user, recipe=OuterRef('pk'))
+        ),
+    )
+
+
+def get_recipes_limit(request):
+    """Возвращает значение параметра recipes_limit или None."""
+
+    try:
+        return max(int(request.query_params['recipes_limit']), 0)
+    except (KeyError, ValueError):
+        return None
+
+
+def annotate_subscriptions(queryset, request):
+    """Готовит авторов для FollowSerializer.
+
+    Первые recipes_limit рецептов всех авторов страницы выбираются одним
+    запросом с оконной функцией.
+    """
+
+    recipes = Recipe.objects.all()
+    recipes_limit = get_recipes_limit(request)
+    if recipes_limit is not None:
+        recipes = recipes[:recipes_limit]
+    return annotate_is_subscribed(queryset, request.user).prefetch_related(
+        Prefetch('recipes', queryset=recipes, to_attr='limited_recipes')
+    )
+
+
+def search_recipes(queryset, query):
+    """Полнотекстовый поиск по названию и описанию рецепта.
+
+    Результаты упорядочены по релевантности, совпадения в названии
+    весят больше. В PostgreSQL используется индекс GIN по tsvector,
+    в SQLite — таблица FTS5, в остальных базах — поиск подстроки.
+    """
+
+    ordering = ('-search_rank', *Recipe._meta.ordering)
+    if connection.vendor == 'postgresql':
+        search_query = SearchQuery(
+            query, config=SEARCH_CONFIG, search_type='websearch'
+        )
+        return queryset.filter(search_vector=search_query).annotate(
+            search_rank=SearchRank(F('search_vector'), search_query)
+        ).order_by(*ordering)
+    if connection.vendor == 'sqlite':
+        words = re.findall(r'\w+', query)
+        if not words:
+            return queryset.none()
+        match = ' '.join(f'"{word}"' for word in words)
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            (match,)
+        )).annotate(search_rank=RawSQL(
+            f'SELECT -bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE}.rowid = recipes_recipe.id '
+            f'AND {FTS_TABLE} MATCH %s',
+            (match,),
+            output_field=FloatField()
+        )).order_by(*ordering)
+    return queryset.filter(
+        Q(name__icontains=query) | Q(text__icontains=query)
+    ).annotate(
+        search_rank=Value(0.0, output_field=FloatField())
+    ).order_by(*ordering)
@@ -0,0 +1,172 @@
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from itertools import chain
+
+from django.conf import settings
+
+from recipes.models import IngredientInRecipe
+from recipes.transactions import on_commit_once
+from .cache import get_versions, invalidate
+from .db_routers import use_primary
+from .models import RecipeChange
+
+INDEX_NAME = 'recipe_ingredient_index'
+CHANGES_NAME = 'recipe_changes'
+# Записи журнала коммитятся не строго по порядку id, поэтому
+# последние записи перечитываются повторно.
+CHANGES_LOOKBACK = 100
+
+
+def save_recipe_changes(recipe_ids):
+    changes = RecipeChange.objects.bulk_create(
+        RecipeChange(recipe_id=recipe_id) for recipe_id in sorted(recipe_ids)
+    )
+    last_pk = max(change.pk for change in changes)
+    if last_pk // 1000 != (last_pk - len(changes)) // 1000:
+        RecipeChange.objects.filter(
+            pk__lte=last_pk - settings.RECIPE_INDEX_CHANGES_KEEP
+        ).delete()
+    invalidate(CHANGES_NAME)
+
+
+def record_recipe_change(recipe_id):
+    """Записывает изменение состава рецепта в журнал.
+
+    Записи добавляются после коммита транзакции, по одной на рецепт,
+    сколько бы строк рецепта в ней ни изменилось. Старые записи
+    периодически удаляются. Процесс, который отстал больше чем
+    на RECIPE_INDEX_CHANGES_KEEP записей, перестроит индекс целиком.
+    """
+
+    on_commit_once(save_recipe_changes, recipe_ids=[recipe_id])
+
+
+class RecipeIngredientIndex:
+    """Обратный индекс «ингредиент → рецепты» в памяти процесса.
+
+    Для каждого ингредиента хранится отсортированный массив id
+    рецептов, для каждого рецепта — id его ингредиентов. Изменения
+    рецептов применяются по журналу RecipeChange. Индекс
+    перестраивается целиком только после массовой загрузки данных,
+    которая меняет версию recipe_ingredient_index.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = (None, None)
+        self._last_change = 0
+        self._postings = {}
+        self._recipes = {}
+
+    def _load(self, queryset):
+        recipes = defaultdict(list)
+        for recipe_id, ingredient_id in queryset.values_list(
+            'recipe_id', 'ingredient_id'
+        ).iterator(chunk_size=10000):
+            recipes[recipe_id].append(ingredient_id)
+        return recipes
+
+    def _build(self):
+        self._last_change = RecipeChange.objects.order_by(
+            '-pk'
+        ).values_list('pk', flat=True).first() or 0
+        recipes = self._load(IngredientInRecipe.objects.all())
+        postings = defaultdict(list)
+        for recipe_id, ingredient_ids in recipes.items():
+            for ingredient_id in ingredient_ids:
+                postings[ingredient_id].append(recipe_id)
+        self._postings = {
+            ingredient_id: array('q', sorted(recipe_ids))
+            for ingredient_id, recipe_ids in postings.items()
+        }
+        self._recipes = {
+            recipe_id: tuple(ingredient_ids)
+            for recipe_id, ingredient_ids in recipes.items()
+        }
+
+    def _remove(self, recipe_id):
+        for ingredient_id in self._recipes.pop(recipe_id, ()):
+            recipe_ids = self._postings[ingredient_id]
+            position = bisect_left(recipe_ids, recipe_id)
+            if (
+                position < len(recipe_ids)
+                and recipe_ids[position] == recipe_id
+            ):
+                del recipe_ids[position]
+
+    def _add(self, recipe_id, ingredient_ids):
+        self._recipes[recipe_id] = tuple(ingredient_ids)
+        for ingredient_id in ingredient_ids:
+            recipe_ids = self._postings.setdefault(ingredient_id, array('q'))
+            recipe_ids.insert(bisect_left(recipe_ids, recipe_id), recipe_id)
+
+    def _apply_changes(self):
+        """Применяет новые записи журнала.
+
+        Возвращает False, если нужные записи уже удалены и индекс
+        надо перестроить.
+        """
+
+        changes = list(RecipeChange.objects.filter(
+            pk__gt=self._last_change - CHANGES_LOOKBACK
+        ).values_list('pk', 'recipe_id'))
+        if not changes:
+            return True
+        last_change = changes[-1][0]
+        if (
+            last_change - self._last_change
+            > settings.RECIPE_INDEX_CHANGES_KEEP - CHANGES_LOOKBACK
+        ):
+            return False
+        recipe_ids = {recipe_id for _, recipe_id in changes}
+        recipes = self._load(
+            IngredientInRecipe.objects.filter(recipe_id__in=recipe_ids)
+        )
+        for recipe_id in recipe_ids:
+            self._remove(recipe_id)
+            if recipe_id in recipes:
+                self._add(recipe_id, recipes[recipe_id])
+        self._last_change = max(last_change, self._last_change)
+        return True
+
+    def _refresh(self):
+        versions = tuple(get_versions((INDEX_NAME, CHANGES_NAME)))
+        if versions == self._versions:
+            return
+        with self._lock, use_primary():
+            if versions == self._versions:
+                return
+            if versions[0] != self._versions[0] or not (
+                self._apply_changes()
+            ):
+                self._build()
+            self._versions = versions
+
+    def match(self, ingredient_ids, max_missing=None):
+        """Рецепты, в которых есть хотя бы один из ингредиентов.
+
+        Возвращает список кортежей (id рецепта, есть ингредиентов,
+        не хватает ингредиентов), отсортированный по числу недостающих
+        ингредиентов, затем по числу совпавших.
+        """
+
+        self._refresh()
+        postings = self._postings
+        matched = Counter(chain.from_iterable(
+            postings.get(ingredient_id, ())
+            for ingredient_id in set(ingredient_ids)
+        ))
+        recipes = self._recipes
+        result = [
+            (recipe_id, count, len(recipes[recipe_id]) - count)
+            for recipe_id, count in matched.items()
+        ]
+        if max_missing is not None:
+            result = [item for item in result if item[2] <= max_missing]
+        result.sort(key=lambda item: (item[2], -item[1], -item[0]))
+        return result
+
+
+recipe_ingredient_index = RecipeIngredientIndex()
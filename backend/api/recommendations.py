@@ -0,0 +1,235 @@
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from scipy import sparse
+
+from recipes.models import Favorite, ShoppingCart
+from .models import (
+    RecipeSimilarity, RecommendationState, UserRecommendation
+)
+
+# Модель взаимодействия и её вес в матрице пользователь × рецепт.
+INTERACTIONS = ((Favorite, 1.0), (ShoppingCart, 0.5))
+STATE_PK = 1
+BLOCK_SIZE = 1000
+BATCH_SIZE = 1000
+
+
+def load_interactions():
+    """Разреженная матрица пользователь × рецепт и id строк и столбцов."""
+
+    parts = [
+        (np.array(
+            list(model.objects.values_list('user_id', 'recipe_id')),
+            dtype=np.int64
+        ).reshape(-1, 2), weight)
+        for model, weight in INTERACTIONS
+    ]
+    pairs = np.concatenate([rows for rows, _ in parts])
+    weights = np.concatenate([
+        np.full(len(rows), weight) for rows, weight in parts
+    ])
+    user_ids, user_index = np.unique(pairs[:, 0], return_inverse=True)
+    recipe_ids, recipe_index = np.unique(pairs[:, 1], return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (weights, (user_index, recipe_index)),
+        shape=(len(user_ids), len(recipe_ids))
+    )
+    return matrix, user_ids, recipe_ids
+
+
+def top_similar(matrix, columns, limit):
+    """Для каждого столбца из columns — до limit самых похожих столбцов
+    по косинусной близости. Возвращает пары (столбец, массив столбцов)."""
+
+    if not len(columns):
+        return
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0))).ravel()
+    norms[norms == 0] = 1
+    normalized = (matrix @ sparse.diags(1 / norms)).tocsc()
+    transposed = normalized.T.tocsr()
+    for start in range(0, len(columns), BLOCK_SIZE):
+        block = columns[start:start + BLOCK_SIZE]
+        scores = (transposed @ normalized[:, block]).tocsc()
+        for position, column in enumerate(block):
+            begin, end = scores.indptr[position], scores.indptr[position + 1]
+            indices = scores.indices[begin:end]
+            data = scores.data[begin:end]
+            mask = indices != column
+            indices, data = indices[mask], data[mask]
+            if len(data) > limit:
+                top = np.argpartition(-data, limit)[:limit]
+                indices, data = indices[top], data[top]
+            order = np.argsort(-data, kind='stable')
+            yield column, indices[order], data[order]
+
+
+def recommend(matrix, similarity, rows, limit):
+    """Рекомендации для строк rows: сумма близости рецептов к тем,
+    с которыми пользователь уже взаимодействовал."""
+
+    for start in range(0, len(rows), BLOCK_SIZE):
+        block = rows[start:start + BLOCK_SIZE]
+        interactions = matrix[block]
+        scores = (interactions @ similarity).tocsr()
+        for position, row in enumerate(block):
+            begin, end = scores.indptr[position], scores.indptr[position + 1]
+            indices = scores.indices[begin:end]
+            data = scores.data[begin:end]
+            seen = interactions.indices[
+                interactions.indptr[position]:interactions.indptr[position + 1]
+            ]
+            mask = ~np.isin(indices, seen)
+            indices, data = indices[mask], data[mask]
+            if len(data) > limit:
+                top = np.argpartition(-data, limit)[:limit]
+                indices, data = indices[top], data[top]
+            yield row, indices[np.argsort(-data, kind='stable')]
+
+
+def load_similarity(recipe_ids):
+    """Сохранённые похожие рецепты в виде матрицы рецепт × рецепт."""
+
+    positions = {recipe_id: index for index, recipe_id in enumerate(
+        recipe_ids.tolist()
+    )}
+    rows, columns, data = [], [], []
+    saved = RecipeSimilarity.objects.values_list(
+        'recipe_id', 'recipe_ids', 'scores'
+    ).iterator(chunk_size=BATCH_SIZE)
+    for recipe_id, similar_ids, scores in saved:
+        if recipe_id not in positions:
+            continue
+        for pk, score in zip(similar_ids, scores):
+            if pk in positions:
+                rows.append(positions[recipe_id])
+                columns.append(positions[pk])
+                data.append(score)
+    size = len(recipe_ids)
+    return sparse.csr_matrix((data, (rows, columns)), shape=(size, size))
+
+
+def save_rows(model, field, objects, update_fields):
+    for start in range(0, len(objects), BATCH_SIZE):
+        model.objects.bulk_create(
+            objects[start:start + BATCH_SIZE],
+            update_conflicts=True,
+            unique_fields=(field,),
+            update_fields=update_fields
+        )
+
+
+def get_state():
+    return tuple(
+        model.objects.order_by('-pk').values_list('pk', flat=True).first()
+        or 0
+        for model, _ in INTERACTIONS
+    )
+
+
+def load_state():
+    """Состояние прошлого запуска или None, если запусков не было."""
+
+    state = RecommendationState.objects.filter(pk=STATE_PK).first()
+    if state is None or len(state.last_ids) != len(INTERACTIONS):
+        return None
+    return tuple(state.last_ids)
+
+
+def changed_since(state):
+    """Пользователи и рецепты с новыми взаимодействиями после state."""
+
+    users, recipes = set(), set()
+    for (model, _), last_pk in zip(INTERACTIONS, state):
+        for user_id, recipe_id in model.objects.filter(
+            pk__gt=last_pk
+        ).values_list('user_id', 'recipe_id'):
+            users.add(user_id)
+            recipes.add(recipe_id)
+    return users, recipes
+
+
+def with_neighbours(matrix, columns):
+    """Столбцы columns и все столбцы, у которых есть общие с ними строки.
+
+    Близость симметрична: новое взаимодействие с рецептом меняет его
+    близость ко всем рецептам тех же пользователей, и их списки похожих
+    тоже нужно пересчитать.
+    """
+
+    if not len(columns):
+        return columns
+    rows = np.unique(matrix[:, columns].nonzero()[0])
+    return np.union1d(columns, matrix[rows].indices)
+
+
+def build_recommendations(full=False, report=None):
+    """Пересчитывает похожие рецепты и рекомендации пользователям.
+
+    Без full пересчитываются только рецепты и пользователи с новыми
+    добавлениями в избранное и список покупок после прошлого запуска,
+    а также рецепты, близость которых к изменённым от этого поменялась.
+    Удаления учитываются только при полном пересчёте. Состояние
+    сохраняется в базе в одной транзакции с результатами.
+    """
+
+    new_state = get_state()
+    previous_state = load_state()
+    full = full or previous_state is None
+    matrix, user_ids, recipe_ids = load_interactions()
+    if not len(recipe_ids):
+        recipe_columns = user_rows = np.arange(0)
+    elif full:
+        recipe_columns = np.arange(len(recipe_ids))
+        user_rows = np.arange(len(user_ids))
+    else:
+        changed_users, changed_recipes = changed_since(previous_state)
+        recipe_columns = with_neighbours(matrix, np.flatnonzero(np.isin(
+            recipe_ids, list(changed_recipes)
+        )))
+        user_rows = np.flatnonzero(np.isin(user_ids, list(changed_users)))
+
+    similarity = (
+        sparse.lil_matrix((len(recipe_ids), len(recipe_ids)))
+        if full else load_similarity(recipe_ids).tolil()
+    )
+    similar_objects = []
+    for column, indices, scores in top_similar(
+        matrix, recipe_columns, settings.RECOMMENDATIONS_SIMILAR_LIMIT
+    ):
+        order = np.argsort(indices)
+        similarity.rows[column] = indices[order].tolist()
+        similarity.data[column] = scores[order].tolist()
+        similar_objects.append(RecipeSimilarity(
+            recipe_id=int(recipe_ids[column]),
+            recipe_ids=recipe_ids[indices].tolist(),
+            scores=scores.tolist()
+        ))
+    similarity = similarity.tocsr()
+    user_objects = [
+        UserRecommendation(
+            user_id=int(user_ids[row]),
+            recipe_ids=recipe_ids[indices].tolist()
+        )
+        for row, indices in recommend(
+            matrix, similarity, user_rows,
+            settings.RECOMMENDATIONS_USER_LIMIT
+        )
+    ]
+    with transaction.atomic():
+        if full:
+            RecipeSimilarity.objects.all().delete()
+            UserRecommendation.objects.all().delete()
+        save_rows(
+            RecipeSimilarity, 'recipe', similar_objects,
+            ('recipe_ids', 'scores', 'updated')
+        )
+        save_rows(
+            UserRecommendation, 'user', user_objects,
+            ('recipe_ids', 'updated')
+        )
+        RecommendationState.objects.update_or_create(
+            pk=STATE_PK, defaults={'last_ids': list(new_state)}
+        )
+    if report:
+        report(full, len(similar_objects), len(user_objects))
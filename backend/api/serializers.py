@@ -1,5 +1,4 @@
-import base64
-from django.core.files.base import ContentFile
+from django.db import transaction
 from rest_framework import serializers, status
 from rest_framework.serializers import ModelSerializer
 from rest_framework.exceptions import ValidationError
@@ -10,7 +9,15 @@ from recipes.models import (
     Subscribe, Favorite, ShoppingCart,
 )
 
+from recipes.cart_totals import change_recipe_totals
+from recipes.images import VARIANT_NAMES
 from users.models import User
+from .jobs import enqueue
+from .models import Job
+from .querysets import (
+    annotate_recipe_flags, annotate_subscriptions, get_recipes_limit,
+)
+from .signals import invalidate_table
 
 
 class UserSerializer(UserCreateSerializer):
@@ -28,6 +35,8 @@ class UserSerializer(UserCreateSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context.get('request').user
         if user.is_authenticated:
             return Subscribe.objects.filter(user=user, author=obj).exists()
@@ -49,17 +58,66 @@ class CreateUserSerializer(UserSerializer):
 
 
 class Base64ImageField(serializers.ImageField):
+    """Картинка, закодированная в base64.
+
+    Строка возвращается как есть: декодирование и проверку картинки
+    выполняет фоновая задача process_recipe_image.
+    """
 
     def to_internal_value(self, data):
 
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='photo.' + ext)
+            if ';base64,' not in data:
+                self.fail('invalid_image')
+            return data
 
         return super().to_internal_value(data)
 
 
+class ImageVariantField(serializers.Field):
+    """Ссылка на уменьшенную копию картинки рецепта.
+
+    Для списка рецептов можно указать отдельный вариант list_variant.
+    Пока копии не созданы, отдаётся исходная картинка.
+    """
+
+    def __init__(self, variant='full', list_variant=None, **kwargs):
+        self.variant = variant
+        self.list_variant = list_variant
+        kwargs.update(source='*', read_only=True)
+        super().__init__(**kwargs)
+
+    def get_url(self, recipe, variant):
+        name = recipe.image_variants.get(variant)
+        if name:
+            url = recipe.image.storage.url(name)
+        elif recipe.image:
+            url = recipe.image.url
+        else:
+            return None
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+    def to_representation(self, recipe):
+        variant = self.variant
+        view = self.context.get('view')
+        if self.list_variant and getattr(view, 'action', None) == 'list':
+            variant = self.list_variant
+        return self.get_url(recipe, variant)
+
+
+class ImageVariantsField(ImageVariantField):
+    """Ссылки на все уменьшенные копии картинки рецепта."""
+
+    def to_representation(self, recipe):
+        return {
+            variant: self.get_url(recipe, variant)
+            for variant in VARIANT_NAMES
+        }
+
+
 class TagSerializer(ModelSerializer):
 
     class Meta:
@@ -68,6 +126,14 @@ class TagSerializer(ModelSerializer):
         fields = ('id', 'name', 'color', 'slug')
 
 
+class TagWithCountSerializer(TagSerializer):
+    """Тег с количеством рецептов для списка тегов."""
+
+    class Meta(TagSerializer.Meta):
+
+        fields = TagSerializer.Meta.fields + ('recipes_count',)
+
+
 class IngredientSerializer(ModelSerializer):
 
     class Meta:
@@ -97,17 +163,22 @@ class RecipeSerializer(serializers.ModelSerializer):
         source='ingredient_list', many=True)
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    image = ImageVariantField(list_variant='card')
+    image_variants = ImageVariantsField()
 
     class Meta:
 
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients',
                   'is_favorited', 'is_in_shopping_cart', 'name',
-                  'image', 'text', 'cooking_time'
+                  'image', 'image_variants', 'image_status', 'text',
+                  'cooking_time'
                   )
 
     def get_is_favorited(self, obj):
 
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
@@ -115,6 +186,8 @@ class RecipeSerializer(serializers.ModelSerializer):
 
     def get_is_in_shopping_cart(self, obj):
 
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
@@ -123,6 +196,19 @@ class RecipeSerializer(serializers.ModelSerializer):
         ).exists()
 
 
+class RecipeMatchSerializer(RecipeSerializer):
+
+    image = ImageVariantField('card')
+    matched_count = serializers.IntegerField(read_only=True)
+    missing_count = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+
+        fields = RecipeSerializer.Meta.fields + (
+            'matched_count', 'missing_count'
+        )
+
+
 class CreateIngredientsInRecipeSerializer(serializers.ModelSerializer):
 
     id = serializers.IntegerField()
@@ -160,33 +246,36 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
 
+        request = self.context.get('request')
+        instance = annotate_recipe_flags(
+            Recipe.objects.filter(pk=instance.pk), request.user
+        ).get()
         serializer = RecipeSerializer(
             instance,
             context={
-                'request': self.context.get('request')
+                'request': request
             }
         )
         return serializer.data
 
     def validate_ingredients(self, data):
-        list_ingredient = []
-        for ingredient in data:
-            ingredient_id = ingredient.get('id')
-            if ingredient_id in list_ingredient:
-                raise serializers.ValidationError(
-                    'Ингредиенты должны быть уникальными!'
-                )
-            list_ingredient.append(ingredient_id)
-            try:
-                Ingredient.objects.get(pk=ingredient_id)
-            except Ingredient.DoesNotExist:
-                raise serializers.ValidationError(
-                    f'Ингредиент с id={ingredient_id} не существует!'
-                )
         if not data:
             raise serializers.ValidationError(
                 'Список ингредиентов не может быть пустым!'
             )
+        ingredient_ids = [ingredient.get('id') for ingredient in data]
+        if len(ingredient_ids) != len(set(ingredient_ids)):
+            raise serializers.ValidationError(
+                'Ингредиенты должны быть уникальными!'
+            )
+        existing_ids = set(Ingredient.objects.filter(
+            pk__in=ingredient_ids
+        ).values_list('pk', flat=True))
+        for ingredient_id in ingredient_ids:
+            if ingredient_id not in existing_ids:
+                raise serializers.ValidationError(
+                    f'Ингредиент с id={ingredient_id} не существует!'
+                )
         return data
 
     def validate_tags(self, data):
@@ -203,43 +292,107 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
 
     def create_ingredients(self, ingredients, recipe):
 
-        ingredient_ids = [element['id'] for element in ingredients]
-        existing_ingredients = Ingredient.objects.filter(pk__in=ingredient_ids)
-        ingredient_map = {
-            ingredient.id: ingredient for ingredient in existing_ingredients
-        }
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(
+                ingredient_id=element['id'],
+                recipe=recipe,
+                amount=element['amount']
+            )
+            for element in ingredients
+        )
+        invalidate_table(IngredientInRecipe._meta.db_table)
 
-        ingredients_to_create = []
-        for element in ingredients:
-            ingredient_id = element['id']
-            amount = element['amount']
-            if ingredient_id in ingredient_map:
-                ingredient = ingredient_map[ingredient_id]
-                ingredients_to_create.append(
-                    IngredientInRecipe(
-                        ingredient=ingredient,
-                        recipe=recipe,
-                        amount=amount
-                    )
-                )
+    def update_ingredients(self, ingredients, recipe):
+        """Применяет к ингредиентам рецепта только изменения:
+        добавляет новые, меняет количество и удаляет лишние.
+
+        Все изменения переносятся в списки покупок одним вызовом:
+        bulk_create и bulk_update не посылают сигналов, а удаление
+        помечено, чтобы его не вычитали обработчики recipes/signals.py.
+        """
 
-        IngredientInRecipe.objects.bulk_create(ingredients_to_create)
+        amounts = {element['id']: element['amount'] for element in ingredients}
+        existing = {
+            item.ingredient_id: item
+            for item in IngredientInRecipe.objects.filter(recipe=recipe)
+        }
+        removed = [
+            item.pk for ingredient_id, item in existing.items()
+            if ingredient_id not in amounts
+        ]
+        changed = []
+        deltas = {
+            ingredient_id: -item.amount
+            for ingredient_id, item in existing.items()
+            if ingredient_id not in amounts
+        }
+        for ingredient_id, item in existing.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and amount != item.amount:
+                deltas[ingredient_id] = amount - item.amount
+                item.amount = amount
+                changed.append(item)
+        added = [
+            element for element in ingredients
+            if element['id'] not in existing
+        ]
+        for element in added:
+            deltas[element['id']] = element['amount']
+        if removed:
+            removed_items = IngredientInRecipe.objects.filter(pk__in=removed)
+            removed_items.cart_totals = True
+            removed_items.delete()
+        if changed:
+            IngredientInRecipe.objects.bulk_update(changed, ('amount',))
+            invalidate_table(IngredientInRecipe._meta.db_table)
+        if added:
+            self.create_ingredients(added, recipe)
+        change_recipe_totals(recipe.pk, deltas)
 
     def create_tags(self, tags, recipe):
 
         recipe.tags.set(tags)
 
+    @staticmethod
+    def pop_image_data(validated_data):
+        """Убирает из данных картинку в base64 и помечает рецепт как
+        ожидающий обработки картинки."""
+
+        image = validated_data.get('image')
+        if isinstance(image, str):
+            del validated_data['image']
+            validated_data['image_status'] = Recipe.IMAGE_PROCESSING
+            return image
+        if image is not None:
+            validated_data['image_status'] = Recipe.IMAGE_READY
+        return None
+
+    @staticmethod
+    def process_image(recipe, image):
+        Job.objects.filter(
+            name='process_recipe_image',
+            status=Job.PENDING,
+            payload__recipe_id=recipe.pk
+        ).delete()
+        enqueue('process_recipe_image', recipe_id=recipe.pk, image=image)
+
+    @transaction.atomic
     def create(self, validated_data):
 
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
 
+        image = self.pop_image_data(validated_data)
+
         user = self.context.get('request').user
         recipe = Recipe.objects.create(**validated_data, author=user)
         self.create_ingredients(ingredients, recipe)
         self.create_tags(tags, recipe)
+        if image:
+            self.process_image(recipe, image)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients_data = validated_data.pop('ingredients', None)
         tags_data = validated_data.pop('tags', None)
@@ -256,25 +409,23 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
                 `tags`!'''
             )
 
-        IngredientInRecipe.objects.filter(recipe=instance).delete()
-
-        for ingredient_data in ingredients_data:
-            ingredient_id = ingredient_data.get('id')
-            amount = ingredient_data.get('amount')
-            ingredient = Ingredient.objects.get(pk=ingredient_id)
-            IngredientInRecipe.objects.create(
-                ingredient=ingredient, recipe=instance, amount=amount
-            )
-
-        return super().update(instance, validated_data)
+        image = self.pop_image_data(validated_data)
+        self.update_ingredients(ingredients_data, instance)
+        self.create_tags(tags_data, instance)
+        instance = super().update(instance, validated_data)
+        if image:
+            self.process_image(instance, image)
+        return instance
 
 
 class AdditionalForRecipeSerializer(serializers.ModelSerializer):
+    image = ImageVariantField('card')
+    image_variants = ImageVariantsField()
 
     class Meta:
 
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
 
 
 class FollowSerializer(UserSerializer):
@@ -294,25 +445,28 @@ class FollowSerializer(UserSerializer):
 
     def get_recipes(self, obj):
 
-        request = self.context.get('request')
-        recipes = obj.recipes.all()
-        recipes_limit = request.query_params.get('recipes_limit')
-        if recipes_limit:
-            recipes = recipes[:int(recipes_limit)]
+        if hasattr(obj, 'limited_recipes'):
+            recipes = obj.limited_recipes
+        else:
+            recipes = obj.recipes.all()
+            recipes_limit = get_recipes_limit(self.context.get('request'))
+            if recipes_limit is not None:
+                recipes = recipes[:recipes_limit]
         return AdditionalForRecipeSerializer(recipes, many=True).data
 
     @staticmethod
     def get_recipes_count(obj):
-        return obj.recipes.count()
+        return obj.recipes_count
 
 
 class AddFavoritesSerializer(serializers.ModelSerializer):
-    image = Base64ImageField()
+    image = ImageVariantField('card')
+    image_variants = ImageVariantsField()
 
     class Meta:
 
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
 
 
 class SubscribeSerializer(serializers.ModelSerializer):
@@ -335,7 +489,10 @@ class SubscribeSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         request = self.context.get('request')
+        author = annotate_subscriptions(
+            User.objects.filter(pk=instance.author_id), request
+        ).get()
         return FollowSerializer(
-            instance.author,
+            author,
             context={'request': request}
         ).data
@@ -0,0 +1,205 @@
+import csv
+import hashlib
+import json
+import os
+import tempfile
+import uuid
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import F
+from django.http import FileResponse, StreamingHttpResponse
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from rest_framework import status
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.response import Response
+
+from recipes.models import ShoppingListItem
+from .db_routers import use_primary
+from .jobs import enqueue
+from .models import Job, ShoppingListFile
+
+CHUNK_SIZE = 2000
+FILENAME = 'shopping_list'
+PDF_JOB = 'render_shopping_list_pdf'
+PDF_RETRY_AFTER = 2
+
+
+class ShoppingListNegotiation(DefaultContentNegotiation):
+    """Не даёт DRF трактовать ?format= как выбор рендерера.
+
+    Параметр format у списка покупок выбирает формат файла.
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        renderer = renderers[0]
+        return renderer, renderer.media_type
+
+
+class Echo:
+    """Буфер, который сразу отдаёт записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def get_shopping_list(user):
+    """Итератор по суммам ингредиентов из списка покупок пользователя.
+
+    Строки читаются порциями через серверный курсор и отсортированы
+    по названию ингредиента.
+    """
+
+    return ShoppingListItem.objects.filter(user=user).values(
+        'ingredient__name',
+        'ingredient__measurement_unit',
+        sum=F('amount')
+    ).order_by(
+        'ingredient__name', 'ingredient__measurement_unit'
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+
+def shopping_list_digest(user):
+    """Отпечаток списка покупок: меняется при любом изменении сумм."""
+
+    digest = hashlib.sha256()
+    for line in ingredients_to_txt(get_shopping_list(user)):
+        digest.update(line.encode())
+    return digest.hexdigest()
+
+
+def ingredients_to_txt(ingredients):
+    for ingredient in ingredients:
+        yield (
+            f"{ingredient['ingredient__name']}  - "
+            f"{ingredient['sum']}"
+            f"({ingredient['ingredient__measurement_unit']})\n"
+        )
+
+
+def ingredients_to_csv(ingredients):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'measurement_unit', 'amount'))
+    for ingredient in ingredients:
+        yield writer.writerow((
+            ingredient['ingredient__name'],
+            ingredient['ingredient__measurement_unit'],
+            ingredient['sum'],
+        ))
+
+
+def ingredients_to_json(ingredients):
+    separator = '['
+    for ingredient in ingredients:
+        yield separator + json.dumps({
+            'name': ingredient['ingredient__name'],
+            'measurement_unit': ingredient['ingredient__measurement_unit'],
+            'amount': ingredient['sum'],
+        }, ensure_ascii=False)
+        separator = ',\n'
+    yield '[]' if separator == '[' else ']'
+
+
+def ingredients_to_pdf(ingredients, file):
+    """Пишет список покупок в PDF постранично в файл."""
+
+    font_name = 'Helvetica'
+    if os.path.exists(settings.SHOPPING_LIST_PDF_FONT):
+        font_name = 'ShoppingListFont'
+        pdfmetrics.registerFont(
+            TTFont(font_name, settings.SHOPPING_LIST_PDF_FONT)
+        )
+    font_size = 12
+    margin = 50
+    _, height = A4
+    pdf = canvas.Canvas(file, pagesize=A4)
+    pdf.setFont(font_name, font_size)
+    y = height - margin
+    for line in ingredients_to_txt(ingredients):
+        if y < margin:
+            pdf.showPage()
+            pdf.setFont(font_name, font_size)
+            y = height - margin
+        pdf.drawString(margin, y, line.rstrip('\n'))
+        y -= font_size * 1.5
+    pdf.save()
+
+
+STREAMING_FORMATS = {
+    'txt': (ingredients_to_txt, 'text/plain; charset=utf-8'),
+    'csv': (ingredients_to_csv, 'text/csv; charset=utf-8'),
+    'json': (ingredients_to_json, 'application/json; charset=utf-8'),
+}
+EXPORT_FORMATS = (*STREAMING_FORMATS, 'pdf')
+
+
+def render_shopping_list_pdf(user):
+    """Собирает PDF со списком покупок и сохраняет его в хранилище.
+
+    Отпечаток считается до чтения списка: если список изменится
+    во время сборки, файл будет собран заново при следующем запросе.
+    """
+
+    digest = shopping_list_digest(user)
+    previous = ShoppingListFile.objects.filter(user=user).first()
+    export = previous or ShoppingListFile(user=user)
+    old_name = previous.file.name if previous else None
+    with tempfile.TemporaryFile() as file:
+        ingredients_to_pdf(get_shopping_list(user), file)
+        file.seek(0)
+        export.file.save(f'{uuid.uuid4().hex}.pdf', File(file), save=False)
+    export.digest = digest
+    export.save()
+    if old_name:
+        storage = export.file.storage
+        transaction.on_commit(lambda: storage.delete(old_name))
+
+
+def shopping_list_pdf_response(user):
+    """Готовый PDF или 202, пока фоновая задача его собирает.
+
+    Сборка PDF занимает воркер надолго, поэтому выполняется
+    обработчиком очереди, а клиент повторяет запрос через
+    Retry-After секунд. Список и очередь читаются из основной базы:
+    по отставшей реплике файл собирался бы повторно.
+    """
+
+    with use_primary():
+        export = ShoppingListFile.objects.filter(user=user).first()
+        if export and export.digest == shopping_list_digest(user):
+            return FileResponse(
+                export.file.open('rb'),
+                as_attachment=True,
+                filename=f'{FILENAME}.pdf',
+                content_type='application/pdf'
+            )
+        if not Job.objects.filter(
+            name=PDF_JOB,
+            payload__user_id=user.pk,
+            status__in=(Job.PENDING, Job.RUNNING)
+        ).exists():
+            enqueue(PDF_JOB, user_id=user.pk)
+    return Response(
+        {'status': 'pending'},
+        status=status.HTTP_202_ACCEPTED,
+        headers={'Retry-After': str(PDF_RETRY_AFTER)}
+    )
+
+
+def shopping_list_response(user, export_format):
+    """Отдаёт список покупок пользователя файлом в формате export_format."""
+
+    if export_format == 'pdf':
+        return shopping_list_pdf_response(user)
+    writer, content_type = STREAMING_FORMATS[export_format]
+    response = StreamingHttpResponse(
+        writer(get_shopping_list(user)), content_type=content_type
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{FILENAME}.{export_format}"'
+    )
+    return response
@@ -0,0 +1,104 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+from recipes.transactions import on_commit_once
+from users.models import User
+from .cache import invalidate
+from .counts import COUNTED_MODELS, table_version_name
+from .jobs import enqueue
+from .recipe_index import record_recipe_change
+
+
+def invalidate_groups(names):
+    for name in names:
+        invalidate(name)
+
+
+def invalidate_on_commit(*names):
+    """Меняет версии групп кэша после коммита текущей транзакции.
+
+    Иначе параллельный запрос успел бы закэшировать старые данные под
+    новой версией, а индексы в памяти перестроились бы по данным до
+    коммита. Каждая группа сбрасывается один раз за транзакцию.
+    """
+
+    on_commit_once(invalidate_groups, names=names)
+
+
+def invalidate_recipe(recipe_id):
+    """Сбрасывает кэш списка рецептов и страницы рецепта после коммита."""
+
+    invalidate_on_commit('recipes', f'recipe_{recipe_id}')
+
+
+def invalidate_recipe_references():
+    """Сбрасывает кэш всех рецептов, в которые вложен изменённый объект."""
+
+    invalidate_on_commit('recipes', 'recipe_references')
+
+
+def invalidate_table(table):
+    invalidate_on_commit(table_version_name(table))
+
+
+def table_changed(sender, **kwargs):
+    invalidate_table(sender._meta.db_table)
+
+
+# Только для таблиц кэшированных счётчиков: обработчик у всех моделей
+# отключил бы быстрое каскадное удаление во всём проекте.
+for label in COUNTED_MODELS:
+    post_save.connect(table_changed, sender=label)
+    post_delete.connect(table_changed, sender=label)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(**kwargs):
+    invalidate_on_commit('ingredients')
+    invalidate_recipe_references()
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(**kwargs):
+    invalidate_on_commit('tags')
+    invalidate_recipe_references()
+
+
+@receiver((post_save, post_delete), sender=User)
+def user_changed(update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    invalidate_recipe_references()
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_changed(instance, **kwargs):
+    invalidate_recipe(instance.pk)
+    record_recipe_change(instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_changed(instance, **kwargs):
+    source = instance.image.name or None
+    if (
+        instance.image_status != Recipe.IMAGE_PROCESSING
+        and instance.image_variants.get('source') != source
+    ):
+        enqueue('generate_image_variants', recipe_id=instance.pk)
+
+
+@receiver((post_save, post_delete), sender=IngredientInRecipe)
+def recipe_ingredient_changed(instance, **kwargs):
+    invalidate_recipe(instance.recipe_id)
+    record_recipe_change(instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(instance, action, reverse, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate_recipe(instance.pk)
+    else:
+        invalidate_recipe_references()
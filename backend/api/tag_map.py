@@ -0,0 +1,51 @@
+import threading
+
+from recipes.models import Tag
+from recipes.tag_masks import tag_bit
+from .cache import get_version
+from .db_routers import use_primary
+
+
+class TagMap:
+    """Соответствие слагов тегов битам маски в памяти процесса.
+
+    Перестраивается, когда меняется версия группы кэша tags, поэтому
+    фильтр по тегам не обращается к таблице тегов.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._bits = {}
+
+    def _refresh(self):
+        version = get_version('tags')
+        if version == self._version:
+            return
+        with self._lock, use_primary():
+            if version != self._version:
+                self._bits = dict(Tag.objects.filter(
+                    bit__isnull=False
+                ).values_list('slug', 'bit'))
+                self._version = version
+
+    def slugs(self):
+        self._refresh()
+        return list(self._bits)
+
+    def mask(self, slugs):
+        """Битовая маска тегов с указанными слагами."""
+
+        self._refresh()
+        mask = 0
+        for slug in slugs:
+            if slug in self._bits:
+                mask |= tag_bit(self._bits[slug])
+        return mask
+
+
+tag_map = TagMap()
+
+
+def tag_choices():
+    return [(slug, slug) for slug in tag_map.slugs()]
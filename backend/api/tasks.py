@@ -0,0 +1,43 @@
+from recipes.images import decode_image, update_image_variants
+from recipes.models import Recipe
+from users.models import User
+from .jobs import job
+from .shopping_list import PDF_JOB, render_shopping_list_pdf
+from .signals import invalidate_recipe
+
+
+@job('process_recipe_image')
+def process_recipe_image(recipe_id, image):
+    """Декодирует загруженную картинку рецепта, сохраняет её
+    и создаёт уменьшенные копии."""
+
+    recipe = Recipe.objects.select_for_update().filter(pk=recipe_id).first()
+    if recipe is None:
+        return
+    try:
+        content = decode_image(image)
+    except ValueError:
+        recipe.image_status = Recipe.IMAGE_FAILED
+        recipe.save(update_fields=('image_status',))
+        return
+    recipe.image.save(content.name, content, save=False)
+    update_image_variants(recipe)
+    recipe.image_status = Recipe.IMAGE_READY
+    recipe.save(update_fields=('image', 'image_status'))
+
+
+@job('generate_image_variants')
+def generate_image_variants(recipe_id):
+    recipe = Recipe.objects.filter(pk=recipe_id).first()
+    if recipe is None:
+        return
+    update_image_variants(recipe)
+    invalidate_recipe(recipe_id)
+
+
+@job(PDF_JOB)
+def render_shopping_list(user_id):
+    user = User.objects.filter(pk=user_id).first()
+    if user is None:
+        return
+    render_shopping_list_pdf(user)
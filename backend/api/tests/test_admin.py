@@ -0,0 +1,89 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Favorite, ShoppingCart, Subscribe
+from .utils import (
+    CacheClearMixin, create_ingredient, create_recipe, create_tag,
+    create_user,
+)
+
+CHANGELISTS = (
+    'recipes/recipe', 'recipes/ingredient', 'recipes/ingredientinrecipe',
+    'recipes/favorite', 'recipes/shoppingcart', 'recipes/subscribe',
+    'users/user',
+)
+
+
+class ChangeListTests(CacheClearMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin = create_user(
+                'admin', is_staff=True, is_superuser=True
+            )
+            self.tags = [create_tag('lunch'), create_tag('dinner')]
+            self.ingredient = create_ingredient('Соль')
+            self.add_rows(2)
+            # Вход обновляет last_login, это тоже запись в таблицу
+            # пользователей со счётчиком.
+            self.client.force_login(self.admin)
+
+    def add_rows(self, number):
+        start = Favorite.objects.count()
+        for index in range(start, start + number):
+            user = create_user(f'user{index}')
+            recipe = create_recipe(
+                user, name=f'Рецепт {index}', tags=self.tags,
+                ingredients=[
+                    (self.ingredient, 1),
+                    (create_ingredient(f'Ингредиент {index}'), 1),
+                ]
+            )
+            Favorite.objects.create(user=self.admin, recipe=recipe)
+            ShoppingCart.objects.create(user=self.admin, recipe=recipe)
+            Subscribe.objects.create(user=self.admin, author=user)
+
+    def get_changelists(self, **params):
+        counts = {}
+        for changelist in CHANGELISTS:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(
+                    f'/admin/{changelist}/', params
+                )
+            self.assertEqual(response.status_code, 200, changelist)
+            counts[changelist] = len(queries)
+        return counts
+
+    def test_query_count_does_not_depend_on_rows(self):
+        few = self.get_changelists()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_rows(8)
+        self.assertEqual(self.get_changelists(), few)
+
+    def test_counts_are_cached(self):
+        self.get_changelists()
+        for changelist in CHANGELISTS:
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(f'/admin/{changelist}/')
+            self.assertFalse(
+                [
+                    query['sql'] for query in queries
+                    if 'COUNT(' in query['sql'].upper()
+                ],
+                changelist
+            )
+
+    def test_input_filters(self):
+        response = self.client.get(
+            '/admin/recipes/favorite/', {'user': self.admin.username}
+        )
+        self.assertEqual(
+            len(response.context['cl'].result_list),
+            Favorite.objects.filter(user=self.admin).count()
+        )
+        response = self.client.get(
+            '/admin/recipes/favorite/', {'user': 'nobody'}
+        )
+        self.assertEqual(len(response.context['cl'].result_list), 0)
@@ -0,0 +1,100 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from prometheus_client import REGISTRY
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from recipes.models import Favorite, Subscribe
+from .utils import (
+    CacheClearMixin, create_ingredient, create_recipe, create_tag,
+    create_user,
+)
+
+ASYNC_URLCONF = 'foodgram.asgi_urls'
+
+
+class AsyncViewsTests(CacheClearMixin, APITestCase):
+    """Асинхронные представления отвечают так же, как синхронные."""
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            author, self.reader = create_user('author'), create_user('reader')
+            self.tag = create_tag('lunch')
+            self.ingredient = create_ingredient('Соль')
+            self.recipes = [
+                create_recipe(
+                    author, name=f'Рецепт {index}', tags=[self.tag],
+                    ingredients=[(self.ingredient, index + 1)]
+                )
+                for index in range(8)
+            ]
+            Favorite.objects.create(user=self.reader, recipe=self.recipes[0])
+            Subscribe.objects.create(user=self.reader, author=author)
+        self.token = Token.objects.create(user=self.reader)
+
+    def sync_get(self, url, authenticated):
+        cache.clear()
+        headers = {}
+        if authenticated:
+            headers['HTTP_AUTHORIZATION'] = f'Token {self.token.key}'
+        return self.client.get(url, **headers)
+
+    async def async_get(self, url, authenticated, headers=None):
+        headers = dict(headers or {})
+        if authenticated:
+            headers['Authorization'] = f'Token {self.token.key}'
+        with self.settings(ROOT_URLCONF=ASYNC_URLCONF):
+            return await self.async_client.get(url, headers=headers)
+
+    async def test_same_responses(self):
+        recipe = self.recipes[0]
+        cases = (
+            ('/api/tags/', False),
+            (f'/api/tags/{self.tag.pk}/', False),
+            ('/api/ingredients/?name=со', False),
+            (f'/api/ingredients/{self.ingredient.pk}/', False),
+            ('/api/recipes/', False),
+            ('/api/recipes/?page=2&limit=3', True),
+            (f'/api/recipes/?tags={self.tag.slug}&is_favorited=1', True),
+            (f'/api/recipes/{recipe.pk}/', False),
+            (f'/api/recipes/{recipe.pk}/', True),
+            ('/api/recipes/0/', False),
+            ('/api/recipes/?page=100', False),
+            ('/api/users/subscriptions/?recipes_limit=2', True),
+            ('/api/users/subscriptions/', False),
+        )
+        for url, authenticated in cases:
+            with self.subTest(url=url, authenticated=authenticated):
+                expected = await sync_to_async(self.sync_get)(url, authenticated)
+                await cache.aclear()
+                response = await self.async_get(url, authenticated)
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response.json(), expected.json())
+
+    async def test_cache_is_shared(self):
+        expected = await sync_to_async(self.sync_get)('/api/recipes/', False)
+        response = await self.async_get(
+            '/api/recipes/', False, {'If-None-Match': expected['ETag']}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    async def test_metrics_use_sync_view_names(self):
+        def requests(view):
+            return REGISTRY.get_sample_value(
+                'foodgram_request_duration_seconds_count',
+                {'view': view, 'method': 'GET'}
+            ) or 0
+
+        cases = (
+            ('/api/tags/', 'TagViewSet.list'),
+            (f'/api/recipes/{self.recipes[0].pk}/', 'RecipeViewSet.retrieve'),
+            ('/api/users/subscriptions/', 'CustomUserViewSet.subscriptions'),
+        )
+        for url, view in cases:
+            with self.subTest(url=url):
+                before = requests(view)
+                await sync_to_async(self.sync_get)(url, True)
+                self.assertEqual(requests(view), before + 1)
+                await self.async_get(url, True)
+                self.assertEqual(requests(view), before + 2)
@@ -0,0 +1,164 @@
+from threading import Thread
+from unittest import skipUnless
+
+from django.db import connection, transaction
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from recipes.cart_totals import refresh_cart_totals
+from recipes.models import (
+    IngredientInRecipe, ShoppingCart, ShoppingListItem,
+)
+from .utils import (
+    CacheClearMixin, create_ingredient, create_recipe, create_tag,
+    create_user,
+)
+
+
+class CartTotalsTests(CacheClearMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Обработчики после коммита вне captureOnCommitCallbacks
+        # в тестах не вызываются.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author = create_user('author')
+            self.buyer = create_user('buyer')
+            self.tag = create_tag('breakfast')
+            self.egg = create_ingredient('Яйцо', 'шт')
+            self.milk = create_ingredient('Молоко', 'мл')
+            self.omelette = create_recipe(
+                self.author, name='Омлет', tags=[self.tag],
+                ingredients=[(self.egg, 2), (self.milk, 100)]
+            )
+            self.pancakes = create_recipe(
+                self.author, name='Блины', tags=[self.tag],
+                ingredients=[(self.egg, 1), (self.milk, 300)]
+            )
+
+    def totals(self, user):
+        return dict(ShoppingListItem.objects.filter(
+            user=user
+        ).values_list('ingredient__name', 'amount'))
+
+    def test_cart_changes(self):
+        self.client.force_authenticate(self.buyer)
+        self.client.post(f'/api/recipes/{self.omelette.pk}/shopping_cart/')
+        self.client.post(f'/api/recipes/{self.pancakes.pk}/shopping_cart/')
+        self.assertEqual(self.totals(self.buyer), {'Яйцо': 3, 'Молоко': 400})
+
+        self.client.delete(f'/api/recipes/{self.pancakes.pk}/shopping_cart/')
+        self.assertEqual(self.totals(self.buyer), {'Яйцо': 2, 'Молоко': 100})
+
+    def test_recipe_update_changes_totals(self):
+        other = create_user('other')
+        flour = create_ingredient('Мука', 'г')
+        ShoppingCart.objects.create(user=self.buyer, recipe=self.omelette)
+        ShoppingCart.objects.create(user=self.buyer, recipe=self.pancakes)
+        ShoppingCart.objects.create(user=other, recipe=self.omelette)
+        self.client.force_authenticate(self.author)
+        response = self.client.patch(
+            f'/api/recipes/{self.omelette.pk}/',
+            {
+                'name': 'Омлет',
+                'text': 'Описание',
+                'cooking_time': 10,
+                'tags': [self.tag.pk],
+                'ingredients': [
+                    {'id': self.egg.pk, 'amount': 3},
+                    {'id': flour.pk, 'amount': 50},
+                ],
+            },
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.totals(self.buyer), {'Яйцо': 4, 'Молоко': 300, 'Мука': 50}
+        )
+        self.assertEqual(self.totals(other), {'Яйцо': 3, 'Мука': 50})
+
+    def test_admin_changes(self):
+        ShoppingCart.objects.create(user=self.buyer, recipe=self.omelette)
+        item = IngredientInRecipe.objects.get(
+            recipe=self.omelette, ingredient=self.egg
+        )
+        item.amount = 5
+        item.save()
+        self.assertEqual(self.totals(self.buyer), {'Яйцо': 5, 'Молоко': 100})
+        item.ingredient = create_ingredient('Мука', 'г')
+        item.amount = 1
+        item.save()
+        self.assertEqual(self.totals(self.buyer), {'Мука': 1, 'Молоко': 100})
+        item.delete()
+        self.assertEqual(self.totals(self.buyer), {'Молоко': 100})
+
+    def test_rebuild_matches_changes(self):
+        ShoppingCart.objects.create(user=self.buyer, recipe=self.omelette)
+        ShoppingCart.objects.create(user=self.buyer, recipe=self.pancakes)
+        self.pancakes.delete()
+        expected = self.totals(self.buyer)
+        refresh_cart_totals()
+        self.assertEqual(self.totals(self.buyer), expected)
+        self.assertEqual(expected, {'Яйцо': 2, 'Молоко': 100})
+
+    def test_recipe_delete_does_not_refresh_per_ingredient(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ingredients = [
+                create_ingredient(f'Ингредиент {number}')
+                for number in range(43)
+            ]
+            recipe = create_recipe(
+                self.author, ingredients=[(item, 1) for item in ingredients]
+            )
+            ShoppingCart.objects.create(user=self.buyer, recipe=recipe)
+        self.assertEqual(len(self.totals(self.buyer)), 43)
+
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                recipe.delete()
+        self.assertEqual(self.totals(self.buyer), {})
+        self.assertLessEqual(len(queries), 20)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Нужны блокировки строк')
+class ConcurrentCartTotalsTests(TransactionTestCase):
+
+    def test_parallel_cart_changes_of_one_user(self):
+        author, buyer = create_user('author'), create_user('buyer')
+        ingredients = [
+            create_ingredient(f'Ингредиент {number}') for number in range(5)
+        ]
+        recipes = [
+            create_recipe(author, ingredients=[
+                (ingredient, number + 1) for ingredient in ingredients
+            ])
+            for number in range(4)
+        ]
+        errors = []
+
+        def toggle(recipe):
+            try:
+                for _ in range(10):
+                    with transaction.atomic():
+                        ShoppingCart.objects.create(user=buyer, recipe=recipe)
+                    ShoppingCart.objects.get(user=buyer, recipe=recipe).delete()
+                with transaction.atomic():
+                    ShoppingCart.objects.create(user=buyer, recipe=recipe)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [Thread(target=toggle, args=(recipe,)) for recipe in recipes]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(
+            set(ShoppingListItem.objects.filter(
+                user=buyer
+            ).values_list('amount', flat=True)),
+            {1 + 2 + 3 + 4}
+        )
@@ -0,0 +1,51 @@
+from io import StringIO
+
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+
+from recipes.models import Favorite, Recipe
+from users.models import User
+from .utils import RecipeFixtureMixin
+
+URL = '/api/recipes/'
+
+
+class CounterTests(RecipeFixtureMixin, APITestCase):
+
+    def counters(self):
+        recipe = Recipe.objects.get(pk=self.recipes[0].pk)
+        author = User.objects.get(pk=self.author.pk)
+        return (
+            recipe.favorites_count, recipe.shopping_cart_count,
+            author.recipes_count, author.followers_count,
+        )
+
+    def test_counters_follow_writes(self):
+        recipe = self.recipes[0]
+        self.client.force_authenticate(self.reader)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'{URL}{recipe.pk}/favorite/')
+            self.client.post(f'{URL}{recipe.pk}/shopping_cart/')
+            self.client.post(f'/api/users/{self.author.pk}/subscribe/')
+        self.assertEqual(self.counters(), (1, 1, 3, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'{URL}{recipe.pk}/favorite/')
+            self.client.delete(f'{URL}{recipe.pk}/shopping_cart/')
+            self.client.delete(f'/api/users/{self.author.pk}/subscribe/')
+            self.recipes[2].delete()
+        self.assertEqual(self.counters(), (0, 0, 2, 0))
+
+    def test_save_does_not_overwrite_counters(self):
+        stale = Recipe.objects.get(pk=self.recipes[0].pk)
+        Favorite.objects.create(user=self.reader, recipe=stale)
+        stale.name = 'Новое название'
+        stale.save()
+        self.assertEqual(self.counters()[0], 1)
+
+    def test_rebuild_counters(self):
+        Favorite.objects.create(user=self.reader, recipe=self.recipes[0])
+        Recipe.objects.update(favorites_count=10)
+        User.objects.update(recipes_count=0)
+        call_command('rebuild_counters', stdout=StringIO())
+        self.assertEqual(self.counters(), (1, 0, 3, 0))
@@ -0,0 +1,66 @@
+from unittest import mock
+
+from django.db.models.deletion import Collector
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from api.cache import get_version
+from api.counts import table_version_name
+from recipes.models import Favorite, Subscribe
+from .utils import CacheClearMixin, create_recipe, create_user
+
+
+class CountCacheTests(CacheClearMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user = create_user('user')
+            self.recipes = [
+                create_recipe(self.user, name=f'Рецепт {number}')
+                for number in range(3)
+            ]
+        self.client.force_authenticate(self.user)
+
+    def test_cached_count_follows_writes(self):
+        url = '/api/recipes/?is_favorited=1'
+        self.assertEqual(self.client.get(url).data['count'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorite.objects.create(user=self.user, recipe=self.recipes[0])
+        self.assertEqual(self.client.get(url).data['count'], 1)
+
+    def test_page_numbers_use_exact_count(self):
+        # Заниженная оценка скрыла бы последнюю страницу.
+        with mock.patch('api.counts.estimate_count', return_value=1):
+            response = self.client.get('/api/recipes/', {'limit': 1})
+            last_page = self.client.get(
+                '/api/recipes/', {'limit': 1, 'page': 3}
+            )
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(last_page.status_code, 200)
+        self.assertEqual(len(last_page.data['results']), 1)
+
+    def test_limit_offset_uses_estimate(self):
+        with mock.patch('api.counts.estimate_count', return_value=1000):
+            response = self.client.get('/api/users/', {'limit': 1})
+        self.assertEqual(response.data['count'], 1000)
+
+
+class TableVersionTests(CacheClearMixin, APITestCase):
+
+    def test_counted_models_bump_table_versions(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            user, author = create_user('user'), create_user('author')
+        name = table_version_name(Subscribe._meta.db_table)
+        version = get_version(name)
+        with self.captureOnCommitCallbacks(execute=True):
+            Subscribe.objects.create(user=user, author=author)
+        self.assertNotEqual(get_version(name), version)
+
+    def test_other_models_are_fast_deleted(self):
+        # Обработчик у всех моделей загружал бы удаляемые строки.
+        user = create_user('user')
+        Token.objects.create(user=user)
+        self.assertTrue(Collector(using='default').can_fast_delete(
+            Token.objects.filter(user=user)
+        ))
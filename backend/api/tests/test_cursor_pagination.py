@@ -0,0 +1,51 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from recipes.models import Recipe
+from .utils import RecipeFixtureMixin
+
+URL = '/api/recipes/'
+
+
+class CursorPaginationTests(RecipeFixtureMixin, APITestCase):
+
+    recipes_number = 7
+
+    def test_walks_all_recipes_once(self):
+        ids = []
+        response = self.client.get(URL, {'cursor': '', 'limit': 3})
+        while True:
+            data = response.json()
+            self.assertNotIn('count', data)
+            ids.extend(recipe['id'] for recipe in data['results'])
+            if data['next'] is None:
+                break
+            response = self.client.get(data['next'])
+        self.assertEqual(
+            ids, list(Recipe.objects.values_list('pk', flat=True))
+        )
+
+    def test_new_recipes_do_not_shift_pages(self):
+        data = self.client.get(URL, {'cursor': '', 'limit': 3}).json()
+        seen = [recipe['id'] for recipe in data['results']]
+        self.add_recipes(2)
+        data = self.client.get(data['next']).json()
+        self.assertFalse(
+            set(seen) & {recipe['id'] for recipe in data['results']}
+        )
+
+    def test_cursor_condition_has_no_or(self):
+        data = self.client.get(URL, {'cursor': '', 'limit': 3}).json()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(data['next'])
+        page_query = [
+            query['sql'] for query in queries
+            if 'LIMIT 4' in query['sql']
+        ]
+        self.assertEqual(len(page_query), 1)
+        self.assertNotIn(' OR ', page_query[0])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(URL, {'cursor': 'bad'})
+        self.assertEqual(response.status_code, 404)
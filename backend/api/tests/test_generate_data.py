@@ -0,0 +1,68 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db.models import F
+from django.test import TestCase
+
+from recipes.counters import rebuild_counters
+from recipes.models import Favorite, Recipe, ShoppingListItem, Subscribe
+from users.models import User
+from .utils import CacheClearMixin, create_ingredient, create_tag
+
+OPTIONS = {
+    'users': 10, 'recipes': 3, 'favorites': 4, 'cart': 2,
+    'subscriptions': 3, 'seed': 1,
+}
+
+
+def state():
+    return (
+        list(Recipe.objects.order_by('pk').values_list(
+            'author__username', 'name', 'created', 'favorites_count',
+            'tag_mask'
+        )),
+        sorted(Favorite.objects.values_list(
+            'user__username', 'recipe__name'
+        )),
+        sorted(Subscribe.objects.values_list(
+            'user__username', 'author__username'
+        )),
+        list(User.objects.order_by('pk').values_list(
+            'username', 'recipes_count', 'followers_count'
+        )),
+    )
+
+
+class GenerateDataTests(CacheClearMixin, TestCase):
+
+    def test_requires_reference_data(self):
+        with self.assertRaises(CommandError):
+            call_command('generate_data', stdout=StringIO(), **OPTIONS)
+
+    def test_dataset(self):
+        for slug in ('breakfast', 'lunch', 'dinner'):
+            create_tag(slug)
+        for name in ('Соль', 'Сахар', 'Яйцо', 'Молоко'):
+            create_ingredient(name)
+        call_command('generate_data', stdout=StringIO(), **OPTIONS)
+        self.assertEqual(User.objects.count(), 10)
+        self.assertEqual(Recipe.objects.count(), 30)
+        self.assertFalse(Recipe.objects.filter(tag_mask=0).exists())
+        self.assertFalse(Subscribe.objects.filter(
+            user_id=F('author_id')
+        ).exists())
+        self.assertTrue(ShoppingListItem.objects.exists())
+
+        # Счётчики согласованы с таблицами.
+        generated = state()
+        rebuild_counters()
+        self.assertEqual(state(), generated)
+
+        # С тем же seed и другим префиксом получается тот же набор.
+        call_command(
+            'generate_data', prefix='again', stdout=StringIO(), **OPTIONS
+        )
+        recipes = Recipe.objects.order_by('pk').values_list(
+            'name', 'created', 'cooking_time'
+        )
+        self.assertEqual(list(recipes[:30]), list(recipes[30:]))
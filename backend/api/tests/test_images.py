@@ -0,0 +1,124 @@
+import base64
+import io
+import os
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from api.models import Job
+from recipes.images import VARIANT_NAMES
+from recipes.models import Recipe
+from recipes.storage import image_storage
+from .utils import (
+    CacheClearMixin, create_ingredient, create_tag, create_user, run_jobs,
+)
+
+
+def image_data(color='red', size=(640, 320)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/png;base64,{encoded}'
+
+
+class RecipeImageTests(CacheClearMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author = create_user('author')
+            self.tag = create_tag('lunch')
+            self.ingredient = create_ingredient('Соль')
+        self.client.force_authenticate(self.author)
+
+    def create_recipe(self, image, name='Суп'):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/recipes/', {
+                'name': name, 'text': 'Описание', 'cooking_time': 5,
+                'tags': [self.tag.pk], 'image': image,
+                'ingredients': [{'id': self.ingredient.pk, 'amount': 1}],
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return Recipe.objects.get(name=name)
+
+    def process(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return run_jobs()
+
+    def test_variants(self):
+        recipe = self.create_recipe(image_data())
+        self.assertEqual(recipe.image_status, Recipe.IMAGE_PROCESSING)
+        self.assertFalse(recipe.image)
+        self.assertEqual(Job.objects.count(), 1)
+
+        self.assertEqual(self.process(), 1)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image_status, Recipe.IMAGE_READY)
+        self.assertTrue(recipe.image.storage.is_hashed(recipe.image.name))
+        self.assertEqual(recipe.image_variants['source'], recipe.image.name)
+        storage = recipe.image.storage
+        with storage.open(recipe.image_variants['thumbnail']) as file:
+            thumbnail = Image.open(file)
+            self.assertEqual(thumbnail.format, 'WEBP')
+            self.assertEqual(thumbnail.size, (160, 160))
+        with storage.open(recipe.image_variants['card']) as file:
+            self.assertEqual(Image.open(file).size, (480, 240))
+
+        response = self.client.get(f'/api/recipes/{recipe.pk}/')
+        self.assertEqual(
+            set(response.data['image_variants']), set(VARIANT_NAMES)
+        )
+        self.assertTrue(response.data['image'].endswith(
+            recipe.image_variants['full']
+        ))
+
+    def test_same_image_is_stored_once(self):
+        first = self.create_recipe(image_data(), name='Суп')
+        second = self.create_recipe(image_data(), name='Борщ')
+        third = self.create_recipe(image_data('blue'), name='Щи')
+        self.process()
+        for recipe in (first, second, third):
+            recipe.refresh_from_db()
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(first.image_variants, second.image_variants)
+        self.assertNotEqual(first.image.name, third.image.name)
+
+    def test_shared_variants_survive_image_change(self):
+        first = self.create_recipe(image_data(), name='Суп')
+        second = self.create_recipe(image_data(), name='Борщ')
+        self.process()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/recipes/{first.pk}/', {
+                'tags': [self.tag.pk], 'image': image_data('green'),
+                'ingredients': [{'id': self.ingredient.pk, 'amount': 1}],
+            }, format='json')
+        self.process()
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertNotEqual(first.image.name, second.image.name)
+        storage = second.image.storage
+        for name in VARIANT_NAMES:
+            self.assertTrue(storage.exists(second.image_variants[name]))
+
+    def test_invalid_image(self):
+        recipe = self.create_recipe('data:image/png;base64,bm90IGFuIGltYWdl')
+        self.process()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image_status, Recipe.IMAGE_FAILED)
+
+    def test_concurrent_save_keeps_existing_file(self):
+        name = image_storage.save('recipes/images/a.png', ContentFile(b'1'))
+        path = image_storage.path(name)
+        inode = os.stat(path).st_ino
+        # Другой процесс сохранил такой же файл после проверки exists().
+        with mock.patch.object(image_storage, 'exists', return_value=False):
+            again = image_storage.save(
+                'recipes/images/b.png', ContentFile(b'1')
+            )
+        self.assertEqual(again, name)
+        self.assertEqual(os.stat(path).st_ino, inode)
+        self.assertEqual(os.listdir(os.path.dirname(path)), [
+            os.path.basename(name)
+        ])
@@ -0,0 +1,44 @@
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from api.cache import get_version
+from api.ingredient_index import ingredient_index
+from .utils import CacheClearMixin, create_ingredient
+
+
+class IngredientSearchTests(CacheClearMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            for name in ('Сахар', 'Сахарная пудра', 'Соль', 'Тростниковый сахар'):
+                create_ingredient(name)
+
+    def names(self, **params):
+        response = self.client.get('/api/ingredients/', params)
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.json()]
+
+    def test_prefix_matches_go_first(self):
+        self.assertEqual(
+            self.names(name='сах'),
+            ['Сахар', 'Сахарная пудра', 'Тростниковый сахар']
+        )
+
+    @override_settings(INGREDIENT_SEARCH_LIMIT=2)
+    def test_empty_name_is_limited(self):
+        self.assertEqual(self.names(), ['Сахар', 'Сахарная пудра'])
+        self.assertEqual(self.names(name=''), ['Сахар', 'Сахарная пудра'])
+
+    def test_version_changes_after_commit(self):
+        self.names(name='перец')
+        version = get_version('ingredients')
+        with self.captureOnCommitCallbacks() as callbacks:
+            create_ingredient('Перец')
+            # До коммита индекс и кэш ответов не перестраиваются.
+            self.assertEqual(get_version('ingredients'), version)
+            self.assertEqual(ingredient_index.search('перец'), [])
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_version('ingredients'), version)
+        self.assertEqual(self.names(name='перец'), ['Перец'])
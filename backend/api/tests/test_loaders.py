@@ -0,0 +1,81 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase
+
+from api.loaders import copy_batch, load_rows, read_rows
+from recipes.models import Ingredient, Tag
+
+ROWS = [
+    ('Сахар', 'г'), ('Соль', 'г'), ('Молоко', 'мл'),
+    ('Сахар', 'г'), ('Яйцо', 'шт'),
+]
+
+
+class LoadRowsTests(TestCase):
+
+    def test_reloading_creates_nothing(self):
+        self.assertEqual(
+            load_rows(Ingredient, ('name', 'measurement_unit'), ROWS, 2),
+            (5, 4)
+        )
+        self.assertEqual(
+            load_rows(Ingredient, ('name', 'measurement_unit'), ROWS, 2),
+            (5, 0)
+        )
+        self.assertEqual(Ingredient.objects.count(), 4)
+
+    def test_formats(self):
+        contents = {
+            '.csv': 'name,measurement_unit\nСахар,г\n',
+            '.json': '[{"name": "Сахар", "measurement_unit": "г"}]',
+            '.jsonl': '{"name": "Сахар", "measurement_unit": "г"}\n',
+        }
+        for extension, content in contents.items():
+            with self.subTest(extension=extension):
+                with tempfile.NamedTemporaryFile(
+                    'w', suffix=extension, encoding='utf-8', delete=False
+                ) as file:
+                    file.write(content)
+                self.addCleanup(os.remove, file.name)
+                self.assertEqual(
+                    list(read_rows(file.name, ('name', 'measurement_unit'))),
+                    [('Сахар', 'г')]
+                )
+
+    def test_add_tags_assigns_bits(self):
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.csv', encoding='utf-8', delete=False
+        ) as file:
+            file.write('Завтрак,#E26C2D,breakfast\nОбед,#49B64E,lunch\n')
+        self.addCleanup(os.remove, file.name)
+        output = StringIO()
+        call_command('add_tags', file.name, stdout=output)
+        self.assertEqual(
+            sorted(Tag.objects.values_list('bit', flat=True)), [0, 1]
+        )
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertIn('Добавлено 2 тегов из 2', lines[0])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'COPY есть только в PostgreSQL')
+class CopyBatchTests(TestCase):
+
+    def test_batches_inside_outer_transaction(self):
+        # TestCase уже держит транзакцию, ещё одна — для наглядности.
+        with transaction.atomic():
+            created = [
+                copy_batch(Ingredient, ('name', 'measurement_unit'), batch)
+                for batch in (ROWS[:2], ROWS[2:4], ROWS[4:])
+            ]
+            copy_batch(Tag, ('name', 'color', 'slug'), [
+                ('Завтрак', '#E26C2D', 'breakfast'),
+            ])
+        self.assertEqual(created, [2, 1, 1])
+        self.assertEqual(Ingredient.objects.count(), 4)
+        self.assertEqual(Tag.objects.get().slug, 'breakfast')
@@ -0,0 +1,70 @@
+from django.test import TestCase, override_settings
+from prometheus_client import REGISTRY
+
+from .utils import CacheClearMixin, create_tag
+
+
+@override_settings(
+    METRICS_ALLOWED_IPS=['127.0.0.1', '10.1.0.0/16'], METRICS_TOKEN='secret'
+)
+class MetricsAccessTests(TestCase):
+
+    def get(self, address, **headers):
+        return self.client.get('/metrics', REMOTE_ADDR=address, **headers)
+
+    def test_allowed_addresses(self):
+        for address in ('127.0.0.1', '10.1.2.3'):
+            with self.subTest(address=address):
+                response = self.get(address)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn(
+                    b'foodgram_request_duration_seconds', response.content
+                )
+
+    def test_other_addresses_forbidden(self):
+        for address in ('10.2.0.1', '192.168.0.1', 'unknown'):
+            with self.subTest(address=address):
+                self.assertEqual(self.get(address).status_code, 403)
+
+    def test_token(self):
+        self.assertEqual(
+            self.get(
+                '192.168.0.1', HTTP_AUTHORIZATION='Bearer secret'
+            ).status_code,
+            200
+        )
+        self.assertEqual(
+            self.get(
+                '192.168.0.1', HTTP_AUTHORIZATION='Bearer wrong'
+            ).status_code,
+            403
+        )
+
+    @override_settings(METRICS_TOKEN='')
+    def test_empty_token_is_disabled(self):
+        self.assertEqual(
+            self.get('192.168.0.1', HTTP_AUTHORIZATION='Bearer ').status_code,
+            403
+        )
+
+
+class RequestMetricsTests(CacheClearMixin, TestCase):
+
+    def sample(self, name):
+        return REGISTRY.get_sample_value(name, {
+            'view': 'TagViewSet.list', 'method': 'GET',
+        }) or 0
+
+    def test_request_is_observed(self):
+        create_tag('lunch')
+        requests = self.sample('foodgram_request_duration_seconds_count')
+        queries = self.sample('foodgram_request_queries_sum')
+        self.client.get('/api/tags/')
+        self.assertEqual(
+            self.sample('foodgram_request_duration_seconds_count'),
+            requests + 1
+        )
+        self.assertGreater(
+            self.sample('foodgram_request_queries_sum'), queries
+        )
+        self.assertGreater(self.sample('foodgram_response_bytes_sum'), 0)
@@ -0,0 +1,38 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from recipes.models import Favorite, ShoppingCart
+from .utils import RecipeFixtureMixin
+
+URL = '/api/recipes/'
+
+
+class RecipeFlagsTests(RecipeFixtureMixin, APITestCase):
+
+    def test_flags(self):
+        first, second, _ = self.recipes
+        Favorite.objects.create(user=self.reader, recipe=first)
+        ShoppingCart.objects.create(user=self.reader, recipe=second)
+        self.client.force_authenticate(self.reader)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/users/{self.author.pk}/subscribe/')
+        results = {
+            recipe['id']: recipe
+            for recipe in self.client.get(URL).data['results']
+        }
+        self.assertTrue(results[first.pk]['is_favorited'])
+        self.assertFalse(results[first.pk]['is_in_shopping_cart'])
+        self.assertTrue(results[second.pk]['is_in_shopping_cart'])
+        self.assertFalse(results[second.pk]['is_favorited'])
+        self.assertTrue(results[first.pk]['author']['is_subscribed'])
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        self.client.force_authenticate(self.reader)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(URL, {'limit': 3})
+        self.add_recipes(6)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(URL, {'limit': 9})
+        self.assertEqual(len(response.data['results']), 9)
+        self.assertEqual(len(small), len(large))
@@ -0,0 +1,78 @@
+from rest_framework.test import APITestCase
+
+from api.models import RecipeChange
+from api.recipe_index import recipe_ingredient_index, save_recipe_changes
+from recipes.models import IngredientInRecipe
+from .utils import (
+    CacheClearMixin, create_ingredient, create_recipe, create_user,
+)
+
+
+class RecipeChangeJournalTests(CacheClearMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user('author')
+        self.ingredients = [
+            create_ingredient(f'Ингредиент {number}') for number in range(5)
+        ]
+
+    def test_one_change_per_recipe_and_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = create_recipe(self.author, ingredients=[
+                (ingredient, 10) for ingredient in self.ingredients
+            ])
+        self.assertEqual(
+            list(RecipeChange.objects.values_list('recipe_id', flat=True)),
+            [recipe.pk]
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.delete()
+        self.assertEqual(RecipeChange.objects.count(), 2)
+
+    def test_changes_are_recorded_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            create_recipe(self.author, ingredients=[
+                (ingredient, 1) for ingredient in self.ingredients
+            ])
+        batches = [
+            callback for callback in callbacks
+            if getattr(callback, 'handler', None) is save_recipe_changes
+        ]
+        self.assertEqual(len(batches), 1)
+        self.assertFalse(RecipeChange.objects.exists())
+
+
+class CookWithWhatIHaveTests(CacheClearMixin, APITestCase):
+
+    def test_index_follows_recipe_changes(self):
+        author = create_user('author')
+        egg, milk, flour = (
+            create_ingredient(name) for name in ('Яйцо', 'Молоко', 'Мука')
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            omelette = create_recipe(
+                author, name='Омлет', ingredients=[(egg, 2), (milk, 100)]
+            )
+            pancakes = create_recipe(
+                author, name='Блины',
+                ingredients=[(egg, 1), (milk, 200), (flour, 150)]
+            )
+        self.assertEqual(
+            recipe_ingredient_index.match([egg.pk, milk.pk]),
+            [(omelette.pk, 2, 0), (pancakes.pk, 2, 1)]
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            IngredientInRecipe.objects.get(
+                recipe=pancakes, ingredient=flour
+            ).delete()
+        response = self.client.get(
+            '/api/recipes/by_ingredients/',
+            {'ingredients': f'{egg.pk},{milk.pk}', 'max_missing': 0}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [recipe['name'] for recipe in response.data['results']],
+            ['Блины', 'Омлет']
+        )
@@ -0,0 +1,92 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from recipes.models import IngredientInRecipe, ShoppingCart
+from .utils import (
+    CacheClearMixin, create_ingredient, create_recipe, create_tag,
+    create_user,
+)
+
+
+class RecipeUpdateTests(CacheClearMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author = create_user('author')
+            self.tag = create_tag('dinner')
+            self.ingredients = [
+                create_ingredient(f'Ингредиент {number}')
+                for number in range(60)
+            ]
+        self.client.force_authenticate(self.author)
+
+    def create_recipe(self, size, carts):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = create_recipe(
+                self.author, tags=[self.tag], ingredients=[
+                    (ingredient, 1) for ingredient in self.ingredients[:size]
+                ]
+            )
+            for number in range(carts):
+                ShoppingCart.objects.create(
+                    user=create_user(f'buyer{recipe.pk}_{number}'),
+                    recipe=recipe
+                )
+        return recipe
+
+    def patch(self, recipe, ingredients):
+        return self.client.patch(
+            f'/api/recipes/{recipe.pk}/',
+            {
+                'name': recipe.name,
+                'text': recipe.text,
+                'cooking_time': recipe.cooking_time,
+                'tags': [self.tag.pk],
+                'ingredients': ingredients,
+            },
+            format='json'
+        )
+
+    def count_patch_queries(self, size, carts):
+        """Запросы PATCH, который удаляет три ингредиента, три добавляет
+        и меняет количество у половины остальных."""
+
+        recipe = self.create_recipe(size, carts)
+        ingredients = [
+            {'id': ingredient.pk, 'amount': 1 + number % 2}
+            for number, ingredient in enumerate(
+                self.ingredients[3:size + 3]
+            )
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.patch(recipe, ingredients)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            dict(IngredientInRecipe.objects.filter(
+                recipe=recipe
+            ).values_list('ingredient_id', 'amount')),
+            {item['id']: item['amount'] for item in ingredients}
+        )
+        return len(queries)
+
+    def test_patch_queries_do_not_grow_with_ingredients_or_carts(self):
+        small = self.count_patch_queries(size=5, carts=1)
+        large = self.count_patch_queries(size=43, carts=1)
+        many_carts = self.count_patch_queries(size=43, carts=10)
+        self.assertEqual(small, large)
+        # SQLite ограничивает число параметров в запросе, и строки
+        # десяти списков вставляются двумя INSERT.
+        self.assertLessEqual(many_carts, large + 1)
+        self.assertLessEqual(large, 27)
+
+    def test_unknown_ingredient_is_rejected(self):
+        recipe = self.create_recipe(size=2, carts=0)
+        response = self.patch(recipe, [{'id': 10 ** 6, 'amount': 1}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data['ingredients'],
+            [f'Ингредиент с id={10 ** 6} не существует!']
+        )
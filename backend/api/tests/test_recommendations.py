@@ -0,0 +1,73 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from api.models import RecipeSimilarity, UserRecommendation
+from api.recommendations import build_recommendations
+from recipes.models import Favorite
+from .utils import create_recipe, create_user
+
+
+class BuildRecommendationsTests(TestCase):
+
+    def setUp(self):
+        author = create_user('author')
+        self.users = [create_user(f'user{index}') for index in range(3)]
+        self.recipes = [
+            create_recipe(author, name=f'Рецепт {index}')
+            for index in range(4)
+        ]
+        first, second, third, _ = self.recipes
+        for user in self.users[:2]:
+            Favorite.objects.create(user=user, recipe=first)
+            Favorite.objects.create(user=user, recipe=second)
+        Favorite.objects.create(user=self.users[2], recipe=first)
+
+    def build(self):
+        runs = []
+        build_recommendations(
+            report=lambda full, recipes, users: runs.append(
+                (full, recipes, users)
+            )
+        )
+        return runs[0]
+
+    def test_recommendations(self):
+        self.assertEqual(self.build(), (True, 2, 3))
+        first, second, _, _ = self.recipes
+        self.assertEqual(
+            RecipeSimilarity.objects.get(recipe=first).recipe_ids,
+            [second.pk]
+        )
+        self.assertEqual(
+            UserRecommendation.objects.get(user=self.users[2]).recipe_ids,
+            [second.pk]
+        )
+
+    def test_incremental_run_survives_cache_clear(self):
+        self.build()
+        cache.clear()
+        Favorite.objects.create(user=self.users[2], recipe=self.recipes[3])
+        full, recipes, users = self.build()
+        self.assertFalse(full)
+        # Новый рецепт и первый рецепт, у которого с ним общий
+        # пользователь.
+        self.assertEqual((recipes, users), (2, 1))
+        self.assertEqual(self.build(), (False, 0, 0))
+
+    def test_incremental_run_matches_full_build(self):
+        def similarity():
+            return {
+                recipe_id: (recipe_ids, [round(score, 6) for score in scores])
+                for recipe_id, recipe_ids, scores in
+                RecipeSimilarity.objects.values_list(
+                    'recipe_id', 'recipe_ids', 'scores'
+                )
+            }
+
+        self.build()
+        Favorite.objects.create(user=self.users[2], recipe=self.recipes[3])
+        Favorite.objects.create(user=self.users[0], recipe=self.recipes[2])
+        self.assertFalse(self.build()[0])
+        incremental = similarity()
+        build_recommendations(full=True)
+        self.assertEqual(incremental, similarity())
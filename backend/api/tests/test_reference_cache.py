@@ -0,0 +1,21 @@
+from rest_framework.test import APITestCase
+
+from .utils import CacheClearMixin, create_ingredient, create_tag
+
+
+class ReferenceCacheTests(CacheClearMixin, APITestCase):
+
+    def test_tags_and_ingredients_etag(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            create_tag('lunch')
+            create_ingredient('Соль')
+        for url in ('/api/tags/', '/api/ingredients/'):
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            create_tag('dinner')
+        response = self.client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
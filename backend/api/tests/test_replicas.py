@@ -0,0 +1,116 @@
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.db_routers import ReplicaRouter, use_replica
+from api.middleware import ReplicaMiddleware
+from recipes.models import Recipe
+from .utils import CacheClearMixin, create_recipe, create_user
+
+REPLICA = 'replica0'
+
+
+@override_settings(REPLICA_DATABASES=[REPLICA])
+class ReplicaRoutingTests(CacheClearMixin, TransactionTestCase):
+    """replica0 в тестовых настройках — зеркало основной базы, поэтому
+    видно, в какое соединение ушёл запрос, а данные в них одни."""
+
+    databases = {DEFAULT_DB_ALIAS, REPLICA}
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_user('user')
+        self.token = Token.objects.create(user=self.user)
+        self.recipe = create_recipe(create_user('author'))
+
+    def make_client(self, token=None):
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Token {(token or self.token).key}'
+        )
+        return client
+
+    def request(self, method, path, client):
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as primary:
+            with CaptureQueriesContext(connections[REPLICA]) as replica:
+                response = getattr(client, method)(path)
+        return response, len(primary), len(replica)
+
+    def test_router(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Recipe))
+        with use_replica():
+            self.assertEqual(router.db_for_read(Recipe), REPLICA)
+            self.assertEqual(router.db_for_read(Token), DEFAULT_DB_ALIAS)
+            self.assertEqual(router.db_for_write(Recipe), DEFAULT_DB_ALIAS)
+        self.assertTrue(router.allow_migrate(DEFAULT_DB_ALIAS, 'recipes'))
+        self.assertFalse(router.allow_migrate(REPLICA, 'recipes'))
+
+    def test_safe_read_goes_to_replica(self):
+        response, primary, replica = self.request(
+            'get', '/api/recipes/', self.make_client()
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['id'], self.recipe.pk)
+        self.assertGreater(replica, 0)
+        # На основной базе только проверка токена и подсчёт для общего
+        # кэша счётчиков.
+        self.assertEqual(primary, 2)
+
+    def test_write_goes_to_primary_and_pins_client(self):
+        client = self.make_client()
+        response, primary, replica = self.request(
+            'post', f'/api/recipes/{self.recipe.pk}/favorite/', client
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(replica, 0)
+        self.assertGreater(primary, 0)
+        self.assertIn(ReplicaMiddleware.cookie_name, response.cookies)
+
+        # Закреплён по cookie.
+        response, primary, replica = self.request(
+            'get', '/api/recipes/', client
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(replica, 0)
+
+    def test_pin_by_authorization_without_cookie(self):
+        self.request(
+            'post', f'/api/recipes/{self.recipe.pk}/favorite/',
+            self.make_client()
+        )
+        # Новый клиент без cookie, но с тем же токеном.
+        _, _, replica = self.request(
+            'get', '/api/recipes/', self.make_client()
+        )
+        self.assertEqual(replica, 0)
+
+        other = Token.objects.create(user=create_user('other'))
+        _, _, replica = self.request(
+            'get', '/api/recipes/', self.make_client(other)
+        )
+        self.assertGreater(replica, 0)
+
+    def test_login_pins_new_token(self):
+        response = APIClient().post('/api/auth/token/login/', {
+            'email': self.user.email, 'password': 'test-password'
+        })
+        self.assertEqual(response.status_code, 200)
+        # Новый клиент без cookie с только что выданным токеном.
+        token = Token.objects.get(key=response.data['auth_token'])
+        _, _, replica = self.request(
+            'get', '/api/recipes/', self.make_client(token)
+        )
+        self.assertEqual(replica, 0)
+
+    def test_failed_write_does_not_pin(self):
+        client = self.make_client()
+        response, _, _ = self.request(
+            'post', '/api/recipes/0/favorite/', client
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn(ReplicaMiddleware.cookie_name, response.cookies)
+        _, _, replica = self.request('get', '/api/recipes/', client)
+        self.assertGreater(replica, 0)
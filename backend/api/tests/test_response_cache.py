@@ -0,0 +1,50 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from api.cache import get_version
+
+from .utils import RecipeFixtureMixin
+
+URL = '/api/recipes/'
+
+
+class AnonymousCacheTests(RecipeFixtureMixin, APITestCase):
+
+    def test_cached_list_and_detail(self):
+        for url in (URL, f'{URL}{self.recipes[0].pk}/'):
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                with self.assertNumQueries(0):
+                    second = self.client.get(url)
+                self.assertEqual(first.content, second.content)
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=first['ETag']
+                )
+                self.assertEqual(response.status_code, 304)
+
+    def test_cache_follows_changes(self):
+        recipe = self.recipes[0]
+        self.client.get(f'{URL}{recipe.pk}/')
+        self.client.force_authenticate(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'{URL}{recipe.pk}/', {
+                'name': 'Новое название', 'text': 'Описание',
+                'cooking_time': 5, 'tags': [self.tag.pk],
+                'ingredients': [{'id': self.ingredient.pk, 'amount': 1}],
+            }, format='json')
+        self.client.force_authenticate(None)
+        self.assertEqual(
+            self.client.get(f'{URL}{recipe.pk}/').json()['name'],
+            'Новое название'
+        )
+
+    def test_authenticated_responses_are_not_cached(self):
+        self.client.get(URL)
+        self.client.force_authenticate(self.reader)
+        response = self.client.get(URL)
+        self.assertNotIn('ETag', response)
+
+    def test_versions_survive_culling(self):
+        version = get_version('recipes')
+        cache.set_many({f'key{i}': i for i in range(cache._max_entries * 2)})
+        self.assertEqual(get_version('recipes'), version)
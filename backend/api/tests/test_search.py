@@ -0,0 +1,50 @@
+from unittest import skipUnless
+
+from django.db import connection
+from rest_framework.test import APITestCase
+
+from recipes.search import FTS_TABLE
+from .utils import CacheClearMixin, create_recipe, create_user
+
+
+class RecipeSearchTests(CacheClearMixin, APITestCase):
+    """Поиск работает на базе, созданной всеми миграциями."""
+
+    def search(self, query):
+        response = self.client.get('/api/recipes/', {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['name'] for recipe in response.json()['results']]
+
+    def test_finds_new_recipes_by_name_and_text(self):
+        author = create_user('author')
+        create_recipe(author, name='Борщ', text='Свёкла и капуста')
+        create_recipe(author, name='Омлет', text='Яйца и молоко')
+
+        self.assertEqual(self.search('борщ'), ['Борщ'])
+        self.assertEqual(self.search('капуста'), ['Борщ'])
+
+    def test_follows_updates_and_deletes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            author = create_user('author')
+            recipe = create_recipe(author, name='Омлет', text='Яйца')
+        recipe.name = 'Яичница'
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.save()
+        self.assertEqual(self.search('яичница'), ['Яичница'])
+        self.assertEqual(self.search('омлет'), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.delete()
+        self.assertEqual(self.search('яичница'), [])
+
+    @skipUnless(connection.vendor == 'sqlite', 'Триггеры FTS5 только в SQLite')
+    def test_sqlite_triggers_survive_table_rebuilds(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master "
+                "WHERE type = 'trigger' AND tbl_name = 'recipes_recipe'"
+            )
+            triggers = {row[0] for row in cursor.fetchall()}
+        self.assertEqual(triggers, {
+            f'{FTS_TABLE}_insert', f'{FTS_TABLE}_delete', f'{FTS_TABLE}_update',
+        })
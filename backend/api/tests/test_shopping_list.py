@@ -0,0 +1,90 @@
+import json
+
+from rest_framework.test import APITestCase
+
+from api.models import Job, ShoppingListFile
+from .utils import (
+    CacheClearMixin, create_ingredient, create_recipe, create_user, run_jobs,
+)
+
+URL = '/api/recipes/download_shopping_cart/'
+
+
+class ShoppingListDownloadTests(CacheClearMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            author = create_user('author')
+            self.buyer = create_user('buyer')
+            egg = create_ingredient('Яйцо', 'шт')
+            milk = create_ingredient('Молоко', 'мл')
+            self.omelette = create_recipe(
+                author, name='Омлет', ingredients=[(egg, 2), (milk, 100)]
+            )
+            self.pancakes = create_recipe(
+                author, name='Блины', ingredients=[(egg, 1), (milk, 300)]
+            )
+        self.client.force_authenticate(self.buyer)
+        self.add_to_cart(self.omelette)
+
+    def add_to_cart(self, recipe):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/recipes/{recipe.pk}/shopping_cart/')
+
+    def download(self, export_format):
+        return self.client.get(URL, {'format': export_format})
+
+    def read(self, export_format):
+        response = self.download(export_format)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_streaming_formats(self):
+        self.add_to_cart(self.pancakes)
+        self.assertEqual(
+            self.read('txt'), 'Молоко  - 400(мл)\nЯйцо  - 3(шт)\n'
+        )
+        self.assertIn(
+            'shopping_list.txt', self.download('txt')['Content-Disposition']
+        )
+        self.assertEqual(self.read('csv').splitlines(), [
+            'name,measurement_unit,amount', 'Молоко,мл,400', 'Яйцо,шт,3',
+        ])
+        self.assertEqual(json.loads(self.read('json')), [
+            {'name': 'Молоко', 'measurement_unit': 'мл', 'amount': 400},
+            {'name': 'Яйцо', 'measurement_unit': 'шт', 'amount': 3},
+        ])
+        response = self.download('xlsx')
+        self.assertEqual(response.status_code, 400)
+
+    def test_pdf_is_rendered_by_job(self):
+        response = self.download('pdf')
+        self.assertEqual(response.status_code, 202)
+        self.assertIn('Retry-After', response)
+        self.download('pdf')
+        self.assertEqual(Job.objects.count(), 1)
+
+        self.assertEqual(run_jobs(), 1)
+        response = self.download('pdf')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(response.streaming_content).startswith(
+            b'%PDF'
+        ))
+        self.assertFalse(Job.objects.exists())
+
+    def test_pdf_is_rebuilt_after_cart_change(self):
+        self.download('pdf')
+        run_jobs()
+        old_name = ShoppingListFile.objects.get(user=self.buyer).file.name
+
+        self.add_to_cart(self.pancakes)
+        response = self.download('pdf')
+        self.assertEqual(response.status_code, 202)
+        with self.captureOnCommitCallbacks(execute=True):
+            run_jobs()
+        export = ShoppingListFile.objects.get(user=self.buyer)
+        self.assertNotEqual(export.file.name, old_name)
+        self.assertFalse(export.file.storage.exists(old_name))
+        self.assertEqual(self.download('pdf').status_code, 200)
@@ -0,0 +1,50 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from recipes.models import Subscribe
+from .utils import CacheClearMixin, create_recipe, create_user
+
+URL = '/api/users/subscriptions/'
+
+
+class SubscriptionsTests(CacheClearMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reader = create_user('reader')
+            self.authors = [self.add_author(index) for index in range(2)]
+        self.client.force_authenticate(self.reader)
+
+    def add_author(self, index, recipes=3):
+        author = create_user(f'author{index}')
+        for number in range(recipes):
+            create_recipe(author, name=f'Рецепт {index}.{number}')
+        Subscribe.objects.create(user=self.reader, author=author)
+        return author
+
+    def test_recipes_limit(self):
+        response = self.client.get(URL, {'recipes_limit': 2})
+        self.assertEqual(response.data['count'], 2)
+        for author in response.data['results']:
+            self.assertTrue(author['is_subscribed'])
+            self.assertEqual(author['recipes_count'], 3)
+            self.assertEqual(len(author['recipes']), 2)
+        response = self.client.get(URL)
+        self.assertEqual(len(response.data['results'][0]['recipes']), 3)
+
+    def test_query_count_does_not_depend_on_authors(self):
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(URL, {'recipes_limit': 2})
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in range(2, 6):
+                self.add_author(index)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(URL, {'recipes_limit': 2})
+        self.assertEqual(len(response.data['results']), 6)
+        self.assertEqual(len(few), len(many))
+
+    def test_no_subscriptions(self):
+        Subscribe.objects.all().delete()
+        self.assertEqual(self.client.get(URL).status_code, 400)
@@ -0,0 +1,58 @@
+from django.core.exceptions import ValidationError
+from rest_framework.test import APITestCase
+
+from api.cache import get_version
+from api.tag_map import tag_map
+from recipes.models import Tag
+from recipes.tag_masks import MAX_TAGS, TOO_MANY_TAGS
+from .utils import CacheClearMixin, create_recipe, create_tag, create_user
+
+
+class TagMapTests(CacheClearMixin, APITestCase):
+
+    def test_tag_map_reloads_after_commit(self):
+        tag_map.slugs()
+        version = get_version('tags')
+        with self.captureOnCommitCallbacks() as callbacks:
+            create_tag('lunch')
+            self.assertEqual(get_version('tags'), version)
+            self.assertNotIn('lunch', tag_map.slugs())
+        for callback in callbacks:
+            callback()
+        self.assertIn('lunch', tag_map.slugs())
+
+    def test_filter_by_new_tag(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            author = create_user('author')
+            lunch, dinner = create_tag('lunch'), create_tag('dinner')
+            create_recipe(author, name='Суп', tags=[lunch])
+            create_recipe(author, name='Рагу', tags=[dinner])
+            create_recipe(author, name='Салат', tags=[lunch, dinner])
+        response = self.client.get('/api/recipes/', {'tags': 'lunch'})
+        self.assertEqual(
+            sorted(recipe['name'] for recipe in response.json()['results']),
+            ['Салат', 'Суп']
+        )
+
+
+class TagLimitTests(CacheClearMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        for index in range(MAX_TAGS):
+            create_tag(f'tag{index}')
+
+    def test_clean_reports_full_mask(self):
+        tag = Tag(name='Лишний', color='#000001', slug='extra')
+        with self.assertRaisesMessage(ValidationError, TOO_MANY_TAGS):
+            tag.full_clean()
+
+    def test_admin_shows_error(self):
+        admin = create_user('admin', is_staff=True, is_superuser=True)
+        self.client.force_login(admin)
+        response = self.client.post('/admin/recipes/tag/add/', {
+            'name': 'Лишний', 'color': '#000001', 'slug': 'extra',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, TOO_MANY_TAGS)
+        self.assertEqual(Tag.objects.count(), MAX_TAGS)
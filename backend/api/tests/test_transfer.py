@@ -0,0 +1,172 @@
+import io
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase
+
+from api.transfer import Checkpoint, export_data, import_data
+from recipes.models import (
+    Favorite, Ingredient, Recipe, ShoppingCart, ShoppingListItem, Subscribe,
+    Tag,
+)
+from users.models import User
+from .utils import (
+    CacheClearMixin, create_ingredient, create_recipe, create_tag,
+    create_user,
+)
+
+
+def snapshot():
+    """Данные базы без id, которые при импорте меняются."""
+
+    return {
+        'recipes': sorted(
+            (
+                recipe.author.email, recipe.name, str(recipe.created),
+                recipe.favorites_count, recipe.shopping_cart_count,
+                tuple(sorted(tag.slug for tag in recipe.tags.all())),
+                tuple(sorted(
+                    (item.ingredient.name, item.amount)
+                    for item in recipe.ingredient_list.all()
+                )),
+            )
+            for recipe in Recipe.objects.select_related('author')
+        ),
+        'favorites': sorted(Favorite.objects.values_list(
+            'user__email', 'recipe__name'
+        )),
+        'cart': sorted(ShoppingCart.objects.values_list(
+            'user__email', 'recipe__name'
+        )),
+        'subscriptions': sorted(Subscribe.objects.values_list(
+            'user__email', 'author__email'
+        )),
+        'totals': sorted(ShoppingListItem.objects.values_list(
+            'user__email', 'ingredient__name', 'amount'
+        )),
+        'users': sorted(User.objects.values_list(
+            'email', 'recipes_count', 'followers_count'
+        )),
+        'tags': sorted(Tag.objects.values_list('slug', 'recipes_count')),
+    }
+
+
+class TransferTests(CacheClearMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            author, reader = create_user('author'), create_user('reader')
+            lunch, dinner = create_tag('lunch'), create_tag('dinner')
+            salt, egg = create_ingredient('Соль'), create_ingredient('Яйцо')
+            soup = create_recipe(
+                author, name='Суп', tags=[lunch],
+                ingredients=[(salt, 5), (egg, 1)]
+            )
+            salad = create_recipe(
+                reader, name='Салат', tags=[lunch, dinner],
+                ingredients=[(egg, 2)]
+            )
+            Favorite.objects.create(user=reader, recipe=soup)
+            ShoppingCart.objects.create(user=reader, recipe=soup)
+            ShoppingCart.objects.create(user=reader, recipe=salad)
+            Subscribe.objects.create(user=reader, author=author)
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'data.jsonl')
+
+    def tearDown(self):
+        for name in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, name))
+        os.rmdir(self.directory)
+        super().tearDown()
+
+    def export(self):
+        call_command(
+            'export_data', self.path, stdout=StringIO(), stderr=StringIO()
+        )
+
+    def clear(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.all().delete()
+            Tag.objects.all().delete()
+            Ingredient.objects.all().delete()
+
+    def import_(self):
+        call_command('import_data', self.path, stdout=StringIO())
+
+    def test_round_trip(self):
+        expected = snapshot()
+        self.export()
+        self.clear()
+        self.assertFalse(Recipe.objects.exists())
+        self.import_()
+        self.assertEqual(snapshot(), expected)
+
+    def test_interrupted_import_resumes(self):
+        expected = snapshot()
+        self.export()
+        self.clear()
+        with open(self.path, encoding='utf-8') as file:
+            lines = file.readlines()
+        # Первые строки загружены, потом импорт прервался.
+        import_data(io.StringIO(''.join(lines[:5])), 'checkpoint', 2)
+        with open(self.path, encoding='utf-8') as file:
+            import_data(file, 'checkpoint', 2)
+        self.assertEqual(snapshot(), expected)
+
+    def test_batch_is_rolled_back_with_checkpoint(self):
+        expected = snapshot()
+        self.export()
+        self.clear()
+        save = Checkpoint.save
+
+        def save_or_fail(checkpoint, label, pairs, line):
+            if label == 'recipe':
+                raise DatabaseError
+            save(checkpoint, label, pairs, line)
+
+        with mock.patch.object(Checkpoint, 'save', save_or_fail):
+            with self.assertRaises(DatabaseError):
+                with open(self.path, encoding='utf-8') as file:
+                    import_data(file, 'checkpoint', 2)
+        self.assertFalse(Recipe.objects.exists())
+        with open(self.path, encoding='utf-8') as file:
+            import_data(file, 'checkpoint', 2)
+        self.assertEqual(snapshot(), expected)
+
+    def test_username_conflicts_are_reported(self):
+        self.export()
+        self.clear()
+        User.objects.create_user(username='author', email='other@example.com')
+        reports = []
+        with open(self.path, encoding='utf-8') as file:
+            import_data(
+                file, 'checkpoint',
+                report=lambda label, *args: reports.append((label, *args))
+            )
+        skipped = {label: ids for label, *_, ids in reports if ids}
+        self.assertEqual(list(skipped), ['user'])
+        self.assertEqual(len(skipped['user']), 1)
+        self.assertEqual(
+            list(Recipe.objects.values_list('name', flat=True)), ['Салат']
+        )
+
+        stderr = StringIO()
+        call_command(
+            'import_data', self.path, checkpoint='again', stdout=StringIO(),
+            stderr=stderr
+        )
+        self.assertIn('user: не загружены', stderr.getvalue())
+
+    def test_existing_reference_data_is_reused(self):
+        output = io.StringIO()
+        export_data(output)
+        Recipe.objects.all().delete()
+        tags = Tag.objects.count()
+        import_data(io.StringIO(output.getvalue()), 'checkpoint')
+        self.assertEqual(Tag.objects.count(), tags)
+        self.assertEqual(Recipe.objects.count(), 2)
@@ -0,0 +1,98 @@
+import hashlib
+
+from django.core.cache import caches
+
+from api.jobs import claim_job, run_job
+from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+from users.models import User
+
+
+def create_user(username, **kwargs):
+    return User.objects.create_user(
+        username=username,
+        email=f'{username}@example.com',
+        first_name=username,
+        last_name=username,
+        password='test-password',
+        **kwargs
+    )
+
+
+def create_tag(slug):
+    color = '#' + hashlib.md5(slug.encode()).hexdigest()[:6]
+    return Tag.objects.create(name=slug, color=color, slug=slug)
+
+
+def create_ingredient(name, measurement_unit='г'):
+    return Ingredient.objects.create(
+        name=name, measurement_unit=measurement_unit
+    )
+
+
+def create_recipe(author, name='Рецепт', text='Описание', tags=(),
+                  ingredients=()):
+    """Рецепт с тегами и ингредиентами — парами (ингредиент, количество)."""
+
+    recipe = Recipe.objects.create(
+        author=author, name=name, text=text, cooking_time=10
+    )
+    recipe.tags.set(tags)
+    for ingredient, amount in ingredients:
+        IngredientInRecipe.objects.create(
+            recipe=recipe, ingredient=ingredient, amount=amount
+        )
+    return recipe
+
+
+def run_jobs():
+    """Выполняет очередь как work(), но без close_old_connections,
+    которая закрыла бы соединение внутри транзакции теста."""
+
+    processed = 0
+    while (job := claim_job()) is not None:
+        run_job(job)
+        processed += 1
+    return processed
+
+
+class CacheClearMixin:
+    """Очищает общий кэш и версии групп перед каждым тестом.
+
+    Обработчики on_commit_once объединяются в один вызов на транзакцию,
+    а TestCase её не коммитит. Записи, после которых тест проверяет
+    кэш или производные данные, нужно делать внутри
+    captureOnCommitCallbacks(execute=True), включая записи в setUp.
+    """
+
+    def setUp(self):
+        super().setUp()
+        for alias_cache in caches.all():
+            alias_cache.clear()
+
+
+class RecipeFixtureMixin(CacheClearMixin):
+
+    recipes_number = 3
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author = create_user('author')
+            self.reader = create_user('reader')
+            self.tag = create_tag('lunch')
+            self.ingredient = create_ingredient('Соль')
+            self.recipes = [
+                create_recipe(
+                    self.author, name=f'Рецепт {index}', tags=[self.tag],
+                    ingredients=[(self.ingredient, index + 1)]
+                )
+                for index in range(self.recipes_number)
+            ]
+
+    def add_recipes(self, number):
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in range(number):
+                create_recipe(
+                    create_user(f'extra{index}'), name=f'Ещё {index}',
+                    tags=[self.tag], ingredients=[(self.ingredient, 1)]
+                )
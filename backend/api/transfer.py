@@ -0,0 +1,240 @@
+import json
+
+from django.contrib.postgres.search import SearchVectorField
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from recipes.cart_totals import refresh_cart_totals
+from recipes.counters import rebuild_counters
+from recipes.models import (
+    Favorite, Ingredient, IngredientInRecipe, Recipe, ShoppingCart,
+    Subscribe, Tag,
+)
+from recipes.tag_masks import rebuild_tags
+from users.models import User
+from .cache import invalidate
+from .counts import table_version_name
+from .models import ImportCheckpoint, ImportedId
+from .recipe_index import INDEX_NAME
+
+CHUNK_SIZE = 2000
+BATCH_SIZE = 1000
+
+# (метка, модель, естественный ключ, {поле внешнего ключа: метка})
+SPECS = (
+    ('tag', Tag, ('slug',), {}),
+    ('ingredient', Ingredient, ('name', 'measurement_unit'), {}),
+    ('user', User, ('email',), {}),
+    ('recipe', Recipe, None, {'author_id': 'user'}),
+    ('recipe_tag', Recipe.tags.through, None,
+     {'recipe_id': 'recipe', 'tag_id': 'tag'}),
+    ('ingredient_in_recipe', IngredientInRecipe, None,
+     {'recipe_id': 'recipe', 'ingredient_id': 'ingredient'}),
+    ('favorite', Favorite, None, {'user_id': 'user', 'recipe_id': 'recipe'}),
+    ('shopping_cart', ShoppingCart, None,
+     {'user_id': 'user', 'recipe_id': 'recipe'}),
+    ('subscribe', Subscribe, None, {'user_id': 'user', 'author_id': 'user'}),
+)
+SPECS_BY_LABEL = {spec[0]: spec for spec in SPECS}
+MAPPED_LABELS = {
+    label for spec in SPECS for label in spec[3].values()
+}
+# Биты тегов назначаются заново при импорте, см. rebuild_tags.
+SKIPPED_FIELDS = {Tag._meta.get_field('bit')}
+
+
+def get_fields(model):
+    # Поисковый индекс заполняется триггером в базе данных.
+    return [
+        field for field in model._meta.concrete_fields
+        if not field.primary_key
+        and not isinstance(field, SearchVectorField)
+        and field not in SKIPPED_FIELDS
+    ]
+
+
+def export_data(file, report=None):
+    """Пишет все данные в file построчно в формате JSONL.
+
+    Таблицы читаются порциями через серверный курсор в порядке,
+    при котором связанные объекты идут раньше ссылающихся на них.
+    """
+
+    for label, model, _, _ in SPECS:
+        attnames = [field.attname for field in get_fields(model)]
+        total = 0
+        rows = model.objects.order_by('pk').values(
+            'pk', *attnames
+        ).iterator(chunk_size=CHUNK_SIZE)
+        for row in rows:
+            pk = row.pop('pk')
+            file.write(json.dumps(
+                {'model': label, 'id': pk, 'fields': row},
+                cls=DjangoJSONEncoder,
+                ensure_ascii=False
+            ) + '\n')
+            total += 1
+        if report:
+            report(label, total)
+
+
+class Checkpoint:
+    """Соответствие старых и новых id и номер обработанной строки.
+
+    Хранится в базе (ImportCheckpoint и ImportedId) и сохраняется
+    в транзакции пачки: пачка и контрольная точка либо записаны
+    вместе, либо не записаны вовсе, и повторный запуск не загружает
+    пачку второй раз.
+    """
+
+    def __init__(self, name):
+        self.checkpoint, _ = ImportCheckpoint.objects.get_or_create(
+            name=name
+        )
+        self.line = self.checkpoint.line
+
+    def get_ids(self, label, old_ids):
+        old_ids = list(set(old_ids))
+        result = {}
+        for start in range(0, len(old_ids), BATCH_SIZE):
+            result.update(self.checkpoint.ids.filter(
+                label=label, old_id__in=old_ids[start:start + BATCH_SIZE]
+            ).values_list('old_id', 'new_id'))
+        return result
+
+    def save(self, label, pairs, line):
+        ImportedId.objects.bulk_create(
+            ImportedId(
+                checkpoint=self.checkpoint, label=label,
+                old_id=old_id, new_id=new_id
+            )
+            for old_id, new_id in pairs
+        )
+        self.checkpoint.line = line
+        self.checkpoint.save(update_fields=('line', 'updated'))
+        self.line = line
+
+
+def remap(checkpoint, relations, items):
+    """Заменяет старые id во внешних ключах на новые.
+
+    Строки, ссылающиеся на объекты, которых нет в соответствии,
+    отбрасываются.
+    """
+
+    maps = {
+        attname: checkpoint.get_ids(
+            label, (item['fields'][attname] for item in items)
+        )
+        for attname, label in relations.items()
+    }
+    result = []
+    for item in items:
+        fields = item['fields']
+        try:
+            for attname, ids in maps.items():
+                fields[attname] = ids[fields[attname]]
+        except KeyError:
+            continue
+        result.append(item)
+    return result
+
+
+def import_batch(spec, items, checkpoint):
+    """Загружает пачку объектов одной модели.
+
+    Возвращает пары (старый id, новый id), количество загруженных
+    объектов и id объектов, которые не загружены из-за конфликта
+    уникальных полей, например пользователей с занятым username.
+    """
+
+    label, model, natural_key, relations = spec
+    items = remap(checkpoint, relations, items)
+    if not items:
+        return [], 0, []
+    auto_fields = [
+        field.attname for field in get_fields(model)
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    objs = [model(**item['fields']) for item in items]
+    if natural_key:
+        model.objects.bulk_create(objs, ignore_conflicts=True)
+        existing = model.objects.filter(**{
+            f'{field}__in': {item['fields'][field] for item in items}
+            for field in natural_key
+        }).values_list('pk', *natural_key)
+        new_ids = {tuple(key): pk for pk, *key in existing}
+        pairs, skipped = [], []
+        for item in items:
+            key = tuple(item['fields'][field] for field in natural_key)
+            if key in new_ids:
+                pairs.append((item['id'], new_ids[key]))
+            else:
+                skipped.append(item['id'])
+        return pairs, len(pairs), skipped
+    if label not in MAPPED_LABELS:
+        model.objects.bulk_create(objs, ignore_conflicts=True)
+        return [], len(objs), []
+    model.objects.bulk_create(objs)
+    if auto_fields:
+        # bulk_create подставляет текущую дату в поля auto_now_add.
+        for obj, item in zip(objs, items):
+            for attname in auto_fields:
+                setattr(obj, attname, item['fields'][attname])
+        model.objects.bulk_update(objs, auto_fields)
+    pairs = [(item['id'], obj.pk) for item, obj in zip(items, objs)]
+    return pairs, len(objs), []
+
+
+def read_batches(file, start_line, batch_size):
+    """Группирует строки файла в пачки объектов одной модели."""
+
+    batch, label, line = [], None, 0
+    for line, text in enumerate(file, 1):
+        if line <= start_line or not text.strip():
+            continue
+        item = json.loads(text)
+        if batch and (item['model'] != label or len(batch) >= batch_size):
+            yield label, batch, line - 1
+            batch = []
+        label = item['model']
+        batch.append(item)
+    if batch:
+        yield label, batch, line
+
+
+def import_data(file, checkpoint_name, batch_size=BATCH_SIZE, report=None):
+    """Загружает данные из JSONL-файла пачками через bulk_create.
+
+    Каждая пачка загружается в отдельной транзакции вместе
+    с контрольной точкой checkpoint_name. При повторном запуске
+    импорт продолжается с первой необработанной строки.
+
+    report(label, line, total, created, skipped) вызывается после
+    каждой пачки, skipped — id объектов, не загруженных из-за конфликта
+    уникальных полей. Строки, которые ссылаются на них, тоже
+    не загружаются.
+    """
+
+    checkpoint = Checkpoint(checkpoint_name)
+    for label, items, line in read_batches(
+        file, checkpoint.line, batch_size
+    ):
+        spec = SPECS_BY_LABEL[label]
+        with transaction.atomic():
+            pairs, created, skipped = import_batch(
+                spec, items, checkpoint
+            )
+            checkpoint.save(label, pairs, line)
+        if report:
+            report(label, line, len(items), created, skipped)
+    with transaction.atomic():
+        rebuild_counters()
+        refresh_cart_totals()
+        rebuild_tags()
+    for name in ('tags', 'ingredients', 'recipes', 'recipe_references',
+                 INDEX_NAME):
+        invalidate(name)
+    for _, model, _, _ in SPECS:
+        invalidate(table_version_name(model._meta.db_table))
@@ -1,12 +1,10 @@
-from django.db.models import Sum, Exists, OuterRef
-from django.http import HttpResponse
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.permissions import (
     AllowAny, IsAuthenticatedOrReadOnly, IsAuthenticated
 )
@@ -15,35 +13,58 @@ from rest_framework.viewsets import ModelViewSet
 
 from recipes.models import (
     Ingredient, Tag, Recipe, Favorite, ShoppingCart, Subscribe,
-    IngredientInRecipe,
 )
 from users.models import User
-from .filters import IngredientFilter, RecipeFilter
-from .pagination import CustomPagination
+from .models import RecipeSimilarity, UserRecommendation
+from .cache import CachedResponseMixin, get_version
+from .filters import RecipeFilter
+from .ingredient_index import ingredient_index
+from .pagination import (
+    CustomLimitOffsetPagination, CustomPagination, IngredientMatchPagination,
+    RecipeCursorPagination,
+)
 from .permissions import IsAuthorOrReadOnly
+from .querysets import (
+    annotate_is_subscribed, annotate_recipe_flags, annotate_subscriptions,
+)
+from .recipe_index import recipe_ingredient_index
+from .shopping_list import (
+    EXPORT_FORMATS, ShoppingListNegotiation, shopping_list_response,
+)
 from .serializers import (
-    TagSerializer,
+    TagWithCountSerializer,
     IngredientSerializer,
-    RecipeSerializer, UserSerializer, CreateRecipeSerializer,
-    FollowSerializer, AddFavoritesSerializer, SubscribeSerializer
+    RecipeSerializer, RecipeMatchSerializer, UserSerializer,
+    CreateRecipeSerializer,
+    FollowSerializer, AddFavoritesSerializer, SubscribeSerializer,
+    AdditionalForRecipeSerializer,
 )
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
 
-    queryset = Tag.objects.all()
-    serializer_class = TagSerializer
+    queryset = Tag.objects.order_by('pk')
+    serializer_class = TagWithCountSerializer
+    authentication_classes = ()
     permission_classes = (AllowAny,)
+    cache_name = 'tags'
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
 
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
+    authentication_classes = ()
     permission_classes = (AllowAny,)
-    filter_backends = (DjangoFilterBackend,)
-    filterset_class = IngredientFilter
-    search_fields = ('^name',)
+    cache_name = 'ingredients'
+
+    def list(self, request, *args, **kwargs):
+        return self.handle_cached(self.search, request)
+
+    def search(self, request):
+        return Response(
+            ingredient_index.search(request.query_params.get('name', ''))
+        )
 
 
 class CustomUserViewSet(UserViewSet):
@@ -51,7 +72,18 @@ class CustomUserViewSet(UserViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = (IsAuthenticatedOrReadOnly,)
-    pagination_class = LimitOffsetPagination
+    pagination_class = CustomLimitOffsetPagination
+
+    def get_queryset(self):
+        return annotate_is_subscribed(
+            super().get_queryset(), self.request.user
+        )
+
+    def get_instance(self):
+        # На самого себя подписаться нельзя, запрос к базе не нужен.
+        user = super().get_instance()
+        user.is_subscribed = False
+        return user
 
     def get_permissions(self):
         if self.action == 'me':
@@ -66,9 +98,11 @@ class CustomUserViewSet(UserViewSet):
         url_name='subscriptions',
     )
     def subscriptions(self, request):
-        queryset = User.objects.filter(follow__user=self.request.user)
-        if queryset:
-            pages = self.paginate_queryset(queryset)
+        queryset = annotate_subscriptions(
+            User.objects.filter(follow__user=self.request.user), request
+        )
+        pages = self.paginate_queryset(queryset)
+        if self.paginator.count:
             serializer = FollowSerializer(pages, many=True,
                                           context={'request': request})
             return self.get_paginated_response(serializer.data)
@@ -93,7 +127,8 @@ class CustomUserViewSet(UserViewSet):
                 context={'request': request}
             )
             serializer.is_valid(raise_exception=True)
-            serializer.save()
+            with transaction.atomic():
+                serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         if request.method == 'DELETE':
@@ -109,33 +144,39 @@ class CustomUserViewSet(UserViewSet):
             )
 
 
-class RecipeViewSet(ModelViewSet):
+class RecipeViewSet(CachedResponseMixin, ModelViewSet):
 
     queryset = Recipe.objects.all()
     pagination_class = CustomPagination
     permission_classes = (IsAuthorOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
-
-    def get_queryset(self):
-        queryset = Recipe.objects.select_related(
-            'author').prefetch_related('tags', 'ingredient_list')
-        user = (
-            self.request.user if self.request.user.is_authenticated else None
-        )
-        if user:
-            queryset = queryset.annotate(
-                is_favorite=Exists(
-                    Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
-                ),
-                is_in_cart=Exists(
-                    ShoppingCart.objects.filter(
-                        user=user, recipe=OuterRef('pk')
-                    )
-                )
+    cache_name = 'recipes'
+
+    @property
+    def paginator(self):
+        # Пагинация по курсору включается параметром ?cursor=.
+        if not hasattr(self, '_paginator'):
+            if 'cursor' in self.request.query_params:
+                self._paginator = RecipeCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def should_cache(self, request):
+        # Флаги избранного и списка покупок у каждого пользователя свои.
+        return not request.user.is_authenticated
+
+    def get_cache_versions(self, request):
+        if self.action == 'retrieve':
+            return (
+                get_version(f'recipe_{self.kwargs[self.lookup_field]}'),
+                get_version('recipe_references'),
             )
+        return super().get_cache_versions(request)
 
-        return queryset
+    def get_queryset(self):
+        return annotate_recipe_flags(Recipe.objects.all(), self.request.user)
 
     def get_serializer_class(self):
 
@@ -160,10 +201,10 @@ class RecipeViewSet(ModelViewSet):
                 return Response(status=status.HTTP_404_NOT_FOUND)
             try:
                 obj = model_class.objects.get(user=user, recipe=recipe)
-                obj.delete()
-                return Response(status=status.HTTP_204_NO_CONTENT)
             except model_class.DoesNotExist:
                 return Response(status=status.HTTP_400_BAD_REQUEST)
+            obj.delete()
+            return Response(status=status.HTTP_204_NO_CONTENT)
 
         elif request.method == 'POST':
 
@@ -172,8 +213,11 @@ class RecipeViewSet(ModelViewSet):
             recipe = Recipe.objects.get(id=pk)
             if model_class.objects.filter(user=user, recipe=recipe).exists():
                 return Response(status=status.HTTP_400_BAD_REQUEST)
-            model_class.objects.create(user=user, recipe=recipe)
-            serializer = AddFavoritesSerializer(recipe)
+            with transaction.atomic():
+                model_class.objects.create(user=user, recipe=recipe)
+            serializer = AddFavoritesSerializer(
+                recipe, context={'request': request}
+            )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @action(
@@ -196,32 +240,124 @@ class RecipeViewSet(ModelViewSet):
     def shopping_cart(self, request, pk):
         return self.handle_recipe_action(request, pk, ShoppingCart)
 
-    @staticmethod
-    def ingredients_to_txt(ingredients):
-
-        shopping_list = ''
-        for ingredient in ingredients:
-            shopping_list += (
-                f"{ingredient['ingredient__name']}  - "
-                f"{ingredient['sum']}"
-                f"({ingredient['ingredient__measurement_unit']})\n"
-            )
-        return shopping_list
-
     @action(
         detail=False,
         methods=('get',),
         permission_classes=(IsAuthenticated,),
         url_path='download_shopping_cart',
         url_name='download_shopping_cart',
+        content_negotiation_class=ShoppingListNegotiation,
     )
     def download_shopping_cart(self, request):
 
-        ingredients = IngredientInRecipe.objects.filter(
-            recipe__shopping_recipe__user=request.user
-        ).values(
-            'ingredient__name',
-            'ingredient__measurement_unit'
-        ).annotate(sum=Sum('amount'))
-        shopping_list = self.ingredients_to_txt(ingredients)
-        return HttpResponse(shopping_list, content_type='text/plain')
+        export_format = request.query_params.get('format', 'txt')
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                f'Доступные форматы: {", ".join(EXPORT_FORMATS)}',
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return shopping_list_response(request.user, export_format)
+
+    @action(
+        detail=False,
+        methods=('get',),
+        permission_classes=(AllowAny,),
+        url_path='by_ingredients',
+        url_name='by_ingredients'
+    )
+    def by_ingredients(self, request):
+        """Рецепты из имеющихся ингредиентов.
+
+        Ингредиенты передаются параметром ?ingredients=1,2,3, рецепты
+        упорядочены по числу недостающих ингредиентов. Параметр
+        max_missing ограничивает это число.
+        """
+
+        try:
+            ingredient_ids = [
+                int(value)
+                for values in request.query_params.getlist('ingredients')
+                for value in values.split(',') if value
+            ]
+            max_missing = request.query_params.get('max_missing')
+            max_missing = None if max_missing is None else int(max_missing)
+        except ValueError:
+            return Response(
+                'id ингредиентов и max_missing должны быть числами',
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not ingredient_ids:
+            return Response(
+                'Укажите id ингредиентов в параметре ingredients',
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        matches = recipe_ingredient_index.match(ingredient_ids, max_missing)
+        paginator = IngredientMatchPagination()
+        page = paginator.paginate_queryset(matches, request, view=self)
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, _, _ in page]
+        )
+        result = []
+        for recipe_id, matched_count, missing_count in page:
+            recipe = recipes.get(recipe_id)
+            if recipe is not None:
+                recipe.matched_count = matched_count
+                recipe.missing_count = missing_count
+                result.append(recipe)
+        serializer = RecipeMatchSerializer(
+            result, many=True, context=self.get_serializer_context()
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    def recipe_list_response(self, request, recipe_ids):
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            limit = 10
+        recipe_ids = recipe_ids[:max(limit, 0)]
+        recipes = Recipe.objects.in_bulk(recipe_ids)
+        serializer = AdditionalForRecipeSerializer(
+            [recipes[pk] for pk in recipe_ids if pk in recipes],
+            many=True,
+            context={'request': request}
+        )
+        return Response(serializer.data)
+
+    @action(
+        detail=True,
+        methods=('get',),
+        permission_classes=(AllowAny,),
+        url_path='similar',
+        url_name='similar'
+    )
+    def similar(self, request, pk):
+        """Рецепты, которые добавляют в избранное вместе с этим."""
+
+        recipe_ids = RecipeSimilarity.objects.filter(
+            recipe_id=pk
+        ).values_list('recipe_ids', flat=True).first()
+        return self.recipe_list_response(request, recipe_ids or [])
+
+    @action(
+        detail=False,
+        methods=('get',),
+        permission_classes=(IsAuthenticated,),
+        url_path='for_you',
+        url_name='for_you'
+    )
+    def for_you(self, request):
+        """Рекомендации по избранному и списку покупок пользователя.
+
+        Пока рекомендаций нет, отдаются самые популярные рецепты.
+        """
+
+        recipe_ids = UserRecommendation.objects.filter(
+            user=request.user
+        ).values_list('recipe_ids', flat=True).first()
+        if not recipe_ids:
+            recipe_ids = list(Recipe.objects.exclude(
+                favorites__user=request.user
+            ).order_by('-favorites_count', '-id').values_list(
+                'id', flat=True
+            )[:100])
+        return self.recipe_list_response(request, recipe_ids)
@@ -0,0 +1,25 @@
+import os
+
+import django
+from django.core.handlers.asgi import ASGIHandler
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+
+
+class FoodgramASGIHandler(ASGIHandler):
+    """Отдаёт GET-запросы к частым адресам асинхронным представлениям.
+
+    Остальные запросы обрабатываются теми же представлениями, что и
+    под WSGI.
+    """
+
+    async_urlconf = 'foodgram.asgi_urls'
+
+    async def get_response_async(self, request):
+        if request.method == 'GET':
+            request.urlconf = self.async_urlconf
+        return await super().get_response_async(request)
+
+
+django.setup(set_prefix=False)
+application = FoodgramASGIHandler()
@@ -1,4 +1,6 @@
 import os
+import sys
+import tempfile
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -34,6 +36,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -41,6 +45,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.QueryCountMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram.urls'
@@ -77,6 +82,23 @@ DATABASES = {
     }
 }
 
+# Реплики для чтения: список host[:port] через запятую.
+for number, address in enumerate(
+    filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(','))
+):
+    host, _, port = address.strip().partition(':')
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'OPTIONS': {'options': '-c default_transaction_read_only=on'},
+        'TEST': {'MIRROR': 'default'},
+    }
+
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != 'default']
+
+DATABASE_ROUTERS = ['api.db_routers.ReplicaRouter']
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -144,3 +166,81 @@ DJOSER = {
 }
 
 CSV_FILES_DIR = os.path.join(BASE_DIR, 'data')
+
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+# Кэш должен быть общим для всех процессов, которые меняют данные,
+# включая run_worker. Файловый кэш подходит, только если они работают
+# на одной машине, в docker-compose используется Redis.
+CACHE_BACKEND = os.getenv(
+    'CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'
+)
+CACHE_LOCATION = os.getenv(
+    'CACHE_LOCATION', os.path.join(tempfile.gettempdir(), 'foodgram_cache')
+)
+# Эти бэкенды при переполнении удаляют произвольные записи.
+CULLING_CACHE_BACKENDS = (
+    'django.core.cache.backends.filebased.FileBasedCache',
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.db.DatabaseCache',
+)
+VERSION_CACHE_BACKEND = os.getenv('VERSION_CACHE_BACKEND', CACHE_BACKEND)
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': CACHE_LOCATION,
+    },
+    # Версии групп кэша (api/cache.py) хранятся без срока жизни и
+    # не должны вытесняться: потерянная версия сбрасывает целую группу.
+    # Для вытесняющих бэкендов им нужно отдельное хранилище без лимита.
+    'versions': {
+        'BACKEND': VERSION_CACHE_BACKEND,
+        'LOCATION': os.getenv(
+            'VERSION_CACHE_LOCATION',
+            f'{CACHE_LOCATION}_versions'
+            if VERSION_CACHE_BACKEND in CULLING_CACHE_BACKENDS
+            else CACHE_LOCATION
+        ),
+        'TIMEOUT': None,
+    },
+}
+if VERSION_CACHE_BACKEND in CULLING_CACHE_BACKENDS:
+    CACHES['versions']['OPTIONS'] = {'MAX_ENTRIES': sys.maxsize}
+
+INGREDIENT_SEARCH_LIMIT = int(os.getenv('INGREDIENT_SEARCH_LIMIT', 50))
+
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 60 * 60))
+
+COUNT_CACHE_TIMEOUT = int(os.getenv('COUNT_CACHE_TIMEOUT', 5 * 60))
+
+COUNT_ESTIMATE_THRESHOLD = int(os.getenv('COUNT_ESTIMATE_THRESHOLD', 100000))
+
+QUERY_COUNT_HEADER = os.getenv('QUERY_COUNT_HEADER', 'False') == 'True'
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+
+METRICS_ALLOWED_IPS = os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1 ::1').split()
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', 1))
+
+JOB_TIMEOUT = int(os.getenv('JOB_TIMEOUT', 300))
+
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+
+JOB_RETRY_DELAY = int(os.getenv('JOB_RETRY_DELAY', 10))
+
+RECIPE_INDEX_CHANGES_KEEP = int(os.getenv('RECIPE_INDEX_CHANGES_KEEP', 10000))
+
+RECOMMENDATIONS_SIMILAR_LIMIT = int(
+    os.getenv('RECOMMENDATIONS_SIMILAR_LIMIT', 20)
+)
+
+RECOMMENDATIONS_USER_LIMIT = int(os.getenv('RECOMMENDATIONS_USER_LIMIT', 50))
+
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 5))
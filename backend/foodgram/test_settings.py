@@ -0,0 +1,49 @@
+"""Настройки для запуска тестов.
+
+python manage.py test --settings=foodgram.test_settings
+
+По умолчанию тесты идут на SQLite. С TEST_DATABASE=postgresql
+используется база PostgreSQL из переменных окружения, как в settings.py,
+и выполняются тесты, которые без неё пропускаются.
+"""
+
+import os
+import sys
+import tempfile
+
+os.environ.setdefault('CSRF_TRUSTED_ORIGINS', 'http://localhost')
+
+from .settings import *  # noqa: E402,F401,F403
+from .settings import BASE_DIR, DATABASES  # noqa: E402
+
+if os.getenv('TEST_DATABASE', 'sqlite') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        }
+    }
+
+# Реплика — зеркало основной базы. Чтение из неё включают тесты
+# маршрутизации через REPLICA_DATABASES.
+DATABASES['replica0'] = {
+    **DATABASES['default'],
+    'TEST': {'MIRROR': 'default'},
+}
+REPLICA_DATABASES = []
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'versions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'versions',
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': sys.maxsize},
+    },
+}
+
+PASSWORD_HASHERS = ('django.contrib.auth.hashers.MD5PasswordHasher',)
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix='foodgram_test_media_')
@@ -0,0 +1,30 @@
+import os
+import shutil
+import tempfile
+
+# Каталог должен быть задан до запуска воркеров: prometheus_client
+# читает его при импорте и пишет метрики каждого процесса в свои файлы.
+os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR',
+    os.path.join(tempfile.gettempdir(), 'foodgram_metrics')
+)
+
+# С GUNICORN_ASGI=True воркеры uvicorn принимают медленных клиентов,
+# не занимая процесс, а частые GET-запросы обрабатываются асинхронно.
+if os.getenv('GUNICORN_ASGI', 'False') == 'True':
+    wsgi_app = 'foodgram.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'foodgram.wsgi'
+
+
+def on_starting(server):
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
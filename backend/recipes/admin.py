@@ -1,65 +1,123 @@
-from django.contrib.admin import ModelAdmin, register
+from django.contrib.admin import ModelAdmin, SimpleListFilter, register
 
+from api.pagination import CachedCountPaginator
 from .models import (
     Ingredient, IngredientInRecipe, Recipe,
-    Tag, ShoppingCart, Subscribe, Favorite, TagInRecipe
+    Tag, ShoppingCart, Subscribe, Favorite
 )
 
 
+class InputFilter(SimpleListFilter):
+    """Фильтр по точному значению, введённому в поле поиска.
+
+    В отличие от фильтра по внешнему ключу не выводит список всех
+    связанных объектов.
+    """
+
+    template = 'admin/input_filter.html'
+    lookup = None
+
+    def lookups(self, request, model_admin):
+        return ((None, None),)
+
+    def choices(self, changelist):
+        yield {
+            'params': [
+                (name, value) for name, value in changelist.params.items()
+                if name != self.parameter_name
+            ]
+        }
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.lookup: self.value()})
+        return queryset
+
+
+class AuthorFilter(InputFilter):
+    title = 'автору (username)'
+    parameter_name = 'author'
+    lookup = 'author__username'
+
+
+class UserFilter(InputFilter):
+    title = 'пользователю (username)'
+    parameter_name = 'user'
+    lookup = 'user__username'
+
+
+class FastChangeListAdmin(ModelAdmin):
+    """Список объектов без полного подсчёта строк таблицы."""
+
+    paginator = CachedCountPaginator
+    show_full_result_count = False
+
+
 @register(Ingredient)
-class IngredientAdmin(ModelAdmin):
+class IngredientAdmin(FastChangeListAdmin):
     list_display = ('pk', 'name', 'measurement_unit')
     search_fields = ('name',)
 
 
 @register(Recipe)
-class RecipeAdmin(ModelAdmin):
+class RecipeAdmin(FastChangeListAdmin):
     list_display = (
         'pk', 'name', 'author', 'get_favorites', 'get_tags', 'created'
     )
-    list_filter = ('author', 'name', 'tags')
+    list_filter = (AuthorFilter, 'tags')
+    list_select_related = ('author',)
     search_fields = ('name',)
+    autocomplete_fields = ('author', 'tags')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('tags')
 
     def get_favorites(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
 
     get_favorites.short_description = (
         'Количество добавлений рецепта в избранное'
     )
 
     def get_tags(self, obj):
-        return '\n'.join(obj.tags.values_list('name', flat=True))
+        return '\n'.join(tag.name for tag in obj.tags.all())
 
     get_tags.short_description = 'Тег или список тегов'
 
 
 @register(Tag)
 class TagAdmin(ModelAdmin):
-    list_display = ('pk', 'name', 'color', 'slug')
+    list_display = ('pk', 'name', 'color', 'slug', 'recipes_count')
+    search_fields = ('name', 'slug')
 
 
 @register(IngredientInRecipe)
-class IngredientInRecipe(ModelAdmin):
+class IngredientInRecipe(FastChangeListAdmin):
     list_display = ('pk', 'recipe', 'ingredient', 'amount')
+    list_select_related = ('recipe', 'ingredient')
+    autocomplete_fields = ('recipe', 'ingredient')
 
 
 @register(ShoppingCart)
-class ShoppingCartAdmin(ModelAdmin):
+class ShoppingCartAdmin(FastChangeListAdmin):
     list_display = ('pk', 'user', 'recipe')
+    list_filter = (UserFilter,)
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
 
 
 @register(Subscribe)
-class FollowAdmin(ModelAdmin):
+class FollowAdmin(FastChangeListAdmin):
     list_display = ('pk', 'user', 'author')
-    search_fields = ('user', 'author')
-    list_filter = ('user', 'author')
+    search_fields = ('user__username', 'author__username')
+    list_filter = (UserFilter, AuthorFilter)
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
 
 
 @register(Favorite)
-class FavoriteAdmin(ModelAdmin):
+class FavoriteAdmin(FastChangeListAdmin):
     list_display = ('pk', 'user', 'recipe')
-
-
-@register(TagInRecipe)
-class TagInRecipeAdmin(ModelAdmin):
-    list_display = ('pk', 'tag', 'recipe')
+    list_filter = (UserFilter,)
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
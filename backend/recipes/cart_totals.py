@@ -0,0 +1,124 @@
+from collections import defaultdict
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import F, Sum
+
+BATCH_SIZE = 5000
+
+
+def refresh_cart_totals(apps=global_apps):
+    """Полностью пересчитывает суммы ингредиентов в списках покупок.
+
+    Нужен только для восстановления сумм (rebuild_cart_totals) и после
+    массовой загрузки данных, обычные изменения применяет
+    change_cart_totals.
+    """
+
+    IngredientInRecipe = apps.get_model('recipes', 'IngredientInRecipe')
+    ShoppingListItem = apps.get_model('recipes', 'ShoppingListItem')
+    with transaction.atomic():
+        totals = IngredientInRecipe.objects.values(
+            'recipe__shopping_recipe__user_id', 'ingredient_id'
+        ).annotate(total=Sum('amount')).order_by()
+        ShoppingListItem.objects.all().delete()
+        batch = []
+        for row in totals.iterator(chunk_size=BATCH_SIZE):
+            if row['recipe__shopping_recipe__user_id'] is None:
+                continue
+            batch.append(ShoppingListItem(
+                user_id=row['recipe__shopping_recipe__user_id'],
+                ingredient_id=row['ingredient_id'],
+                amount=row['total']
+            ))
+            if len(batch) >= BATCH_SIZE:
+                ShoppingListItem.objects.bulk_create(batch)
+                batch = []
+        ShoppingListItem.objects.bulk_create(batch)
+
+
+def recipe_amounts(recipe_id, sign=1):
+    """Количества ингредиентов рецепта: {id ингредиента: количество}."""
+
+    IngredientInRecipe = global_apps.get_model(
+        'recipes', 'IngredientInRecipe'
+    )
+    amounts = defaultdict(int)
+    for ingredient_id, amount in IngredientInRecipe.objects.filter(
+        recipe_id=recipe_id
+    ).values_list('ingredient_id', 'amount'):
+        amounts[ingredient_id] += sign * amount
+    return amounts
+
+
+def change_cart_totals(user_ids, amounts):
+    """Прибавляет к суммам пользователей user_ids изменения amounts.
+
+    amounts — словарь {id ингредиента: изменение количества},
+    изменение может быть отрицательным. Вызывается в транзакции,
+    которая меняет список покупок или состав рецепта. Суммы меняются
+    выражениями F(), поэтому параллельные изменения одного списка
+    складываются. Недостающие строки вставляются с нулём, строки
+    блокируются в порядке (пользователь, ингредиент), чтобы
+    параллельные транзакции не ждали друг друга по кругу. Строки
+    с нулевой суммой удаляются.
+    """
+
+    ShoppingListItem = global_apps.get_model('recipes', 'ShoppingListItem')
+    amounts = {
+        ingredient_id: delta
+        for ingredient_id, delta in amounts.items() if delta
+    }
+    user_ids = sorted(set(user_ids))
+    if not amounts or not user_ids:
+        return
+    ingredient_ids = sorted(amounts)
+    items = ShoppingListItem.objects.filter(
+        user_id__in=user_ids, ingredient_id__in=ingredient_ids
+    )
+    by_delta = defaultdict(list)
+    for ingredient_id in ingredient_ids:
+        by_delta[amounts[ingredient_id]].append(ingredient_id)
+    with transaction.atomic(savepoint=False):
+        added = [
+            ingredient_id for ingredient_id in ingredient_ids
+            if amounts[ingredient_id] > 0
+        ]
+        required = {
+            (user_id, ingredient_id)
+            for user_id in user_ids for ingredient_id in added
+        }
+        while True:
+            # Параллельная транзакция может удалить обнулённую строку
+            # между вставкой и блокировкой, тогда строка вставляется
+            # заново.
+            if required:
+                ShoppingListItem.objects.bulk_create([
+                    ShoppingListItem(
+                        user_id=user_id, ingredient_id=ingredient_id,
+                        amount=0
+                    )
+                    for user_id, ingredient_id in sorted(required)
+                ], ignore_conflicts=True)
+            required -= set(items.select_for_update().order_by(
+                'user_id', 'ingredient_id'
+            ).values_list('user_id', 'ingredient_id'))
+            if not required:
+                break
+        for delta, delta_ingredient_ids in by_delta.items():
+            items.filter(ingredient_id__in=delta_ingredient_ids).update(
+                amount=F('amount') + delta
+            )
+        if len(added) < len(ingredient_ids):
+            items.filter(amount=0).delete()
+
+
+def change_recipe_totals(recipe_id, amounts):
+    """Применяет изменения состава рецепта к спискам покупок
+    всех пользователей, у которых он в списке."""
+
+    ShoppingCart = global_apps.get_model('recipes', 'ShoppingCart')
+    if any(amounts.values()):
+        change_cart_totals(ShoppingCart.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('user_id', flat=True), amounts)
@@ -0,0 +1,62 @@
+from django.apps import apps as global_apps
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+# (модель-источник, поле связи, модель со счётчиком, поле счётчика)
+COUNTERS = (
+    ('recipes.Favorite', 'recipe', 'recipes.Recipe', 'favorites_count'),
+    ('recipes.ShoppingCart', 'recipe', 'recipes.Recipe',
+     'shopping_cart_count'),
+    ('recipes.Recipe', 'author', 'users.User', 'recipes_count'),
+    ('recipes.Subscribe', 'author', 'users.User', 'followers_count'),
+)
+
+
+class CounterFieldsMixin:
+    """Не перезаписывает счётчики при сохранении существующего объекта.
+
+    Счётчики меняются только запросами UPDATE из сигналов, значения
+    в загруженном ранее объекте могут быть устаревшими. Отложенные
+    поля тоже не сохраняются, как и в обычном save().
+    """
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+
+def change_counter(model, pk, field, delta):
+    """Атомарно изменяет счётчик одной строки на delta."""
+
+    model.objects.filter(pk=pk).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+
+
+def rebuild_counters(apps=global_apps):
+    """Пересчитывает все счётчики по исходным таблицам.
+
+    Принимает реестр моделей, чтобы функцию можно было вызвать
+    из миграции.
+    """
+
+    for source, relation, target, field in COUNTERS:
+        source_model = apps.get_model(source)
+        target_model = apps.get_model(target)
+        count = source_model.objects.filter(
+            **{relation: OuterRef('pk')}
+        ).order_by().values(relation).annotate(
+            count=Count('pk')
+        ).values('count')
+        target_model.objects.update(
+            **{field: Coalesce(Subquery(count), 0)}
+        )
@@ -0,0 +1,139 @@
+import base64
+import binascii
+import io
+import os
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Q
+from PIL import Image, ImageOps
+
+VARIANTS_DIR = 'recipes/variants/'
+VARIANT_FORMAT = 'webp'
+VARIANT_QUALITY = 80
+
+# (название, максимальный размер, обрезать ли до точного размера)
+IMAGE_VARIANTS = (
+    ('thumbnail', (160, 160), True),
+    ('card', (480, 480), False),
+    ('full', (1280, 1280), False),
+)
+VARIANT_NAMES = tuple(name for name, _, _ in IMAGE_VARIANTS)
+
+
+def decode_image(data):
+    """Декодирует картинку из строки data:image/<формат>;base64,...
+
+    Вызывает ValueError, если строка не является корректной картинкой.
+    """
+
+    try:
+        header, encoded = data.split(';base64,', 1)
+        content = base64.b64decode(encoded, validate=True)
+        Image.open(io.BytesIO(content)).verify()
+    except (ValueError, binascii.Error, OSError,
+            Image.DecompressionBombError) as error:
+        raise ValueError('Загруженный файл не является картинкой') from error
+    extension = header.split('/')[-1]
+    return ContentFile(content, name=f'photo.{extension}')
+
+
+def make_variant(image, size, crop):
+    """Уменьшенная копия изображения в формате WebP."""
+
+    if crop:
+        image = ImageOps.fit(image, size, Image.LANCZOS)
+    else:
+        image = image.copy()
+        image.thumbnail(size, Image.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(
+        buffer, VARIANT_FORMAT, quality=VARIANT_QUALITY, method=4
+    )
+    return buffer.getvalue()
+
+
+def generate_variants(image_file):
+    """Сохраняет все варианты изображения и возвращает их имена.
+
+    Под ключом source хранится имя исходного файла, по нему видно,
+    для какой картинки варианты уже созданы.
+    """
+
+    storage = image_file.storage
+    stem = os.path.splitext(os.path.basename(image_file.name))[0]
+    with storage.open(image_file.name, 'rb') as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert(
+                'RGBA' if 'transparency' in image.info else 'RGB'
+            )
+        variants = {'source': image_file.name}
+        for name, size, crop in IMAGE_VARIANTS:
+            variants[name] = storage.save(
+                f'{VARIANTS_DIR}{stem}_{name}.{VARIANT_FORMAT}',
+                ContentFile(make_variant(image, size, crop))
+            )
+    return variants
+
+
+def delete_variants(storage, variants, keep=()):
+    for name in VARIANT_NAMES:
+        path = variants.get(name)
+        if path and path not in keep:
+            storage.delete(path)
+
+
+def release_variants(recipe, variants, keep=()):
+    """Удаляет файлы вариантов, которыми не пользуются другие рецепты.
+
+    Одинаковые картинки хранятся в одном файле, поэтому варианты
+    могут быть общими для нескольких рецептов.
+    """
+
+    paths = [variants[name] for name in VARIANT_NAMES if name in variants]
+    if not paths:
+        return
+    query = Q()
+    for name in VARIANT_NAMES:
+        query |= Q(**{f'image_variants__{name}__in': paths})
+    used = {
+        path
+        for other in type(recipe).objects.filter(query).exclude(
+            pk=recipe.pk
+        ).values_list('image_variants', flat=True)
+        for path in other.values()
+    }
+    delete_variants(recipe.image.storage, variants, keep=used | set(keep))
+
+
+def update_image_variants(recipe):
+    """Создаёт варианты картинки рецепта, если она изменилась.
+
+    Если у другого рецепта уже есть варианты той же картинки, они
+    используются повторно. Поле image_variants обновляется запросом
+    UPDATE, чтобы не вызывать повторное сохранение рецепта.
+    """
+
+    old_variants = recipe.image_variants or {}
+    source = recipe.image.name if recipe.image else None
+    if old_variants.get('source') == source:
+        return
+    variants = {}
+    if source:
+        variants = type(recipe).objects.filter(
+            image_variants__source=source
+        ).exclude(pk=recipe.pk).values_list(
+            'image_variants', flat=True
+        ).first()
+        if not variants:
+            try:
+                variants = generate_variants(recipe.image)
+            except (OSError, Image.DecompressionBombError):
+                variants = {'source': source}
+    type(recipe).objects.filter(pk=recipe.pk).update(image_variants=variants)
+    recipe.image_variants = variants
+    keep = set(variants.values())
+    transaction.on_commit(
+        lambda: release_variants(recipe, old_variants, keep)
+    )
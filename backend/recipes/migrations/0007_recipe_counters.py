@@ -0,0 +1,51 @@
+# Generated by Django 4.2.11 on 2026-10-18 19:09
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+# Копия recipes.counters на момент миграции: код приложения может
+# измениться, а миграция должна работать с историческими моделями.
+COUNTERS = (
+    ('recipes.Favorite', 'recipe', 'recipes.Recipe', 'favorites_count'),
+    ('recipes.ShoppingCart', 'recipe', 'recipes.Recipe',
+     'shopping_cart_count'),
+    ('recipes.Recipe', 'author', 'users.User', 'recipes_count'),
+    ('recipes.Subscribe', 'author', 'users.User', 'followers_count'),
+)
+
+
+def fill_counters(apps, schema_editor):
+    for source, relation, target, field in COUNTERS:
+        source_model = apps.get_model(source)
+        target_model = apps.get_model(target)
+        count = source_model.objects.filter(
+            **{relation: OuterRef('pk')}
+        ).order_by().values(relation).annotate(
+            count=Count('pk')
+        ).values('count')
+        target_model.objects.update(
+            **{field: Coalesce(Subquery(count), 0)}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_created_id_idx'),
+        ('users', '0006_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество добавлений в избранное'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='shopping_cart_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество добавлений в список покупок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.11 on 2026-10-18 19:11
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    IngredientInRecipe = apps.get_model('recipes', 'IngredientInRecipe')
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(keep_id=Min('id'), total=Count('id')).filter(total__gt=1)
+    for group in duplicates:
+        extra_ids = list(Ingredient.objects.filter(
+            name=group['name'], measurement_unit=group['measurement_unit']
+        ).exclude(id=group['keep_id']).values_list('id', flat=True))
+        recipe_ids = set(IngredientInRecipe.objects.filter(
+            ingredient_id=group['keep_id']
+        ).values_list('recipe_id', flat=True))
+        for row in IngredientInRecipe.objects.filter(
+            ingredient_id__in=extra_ids
+        ).order_by('id'):
+            if row.recipe_id in recipe_ids:
+                row.delete()
+            else:
+                row.ingredient_id = group['keep_id']
+                row.save(update_fields=('ingredient',))
+                recipe_ids.add(row.recipe_id)
+        Ingredient.objects.filter(id__in=extra_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.11 on 2026-10-18 19:21
+
+from django.db import migrations, models
+import recipes.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(blank=True, storage=recipes.storage.ContentHashStorage(), upload_to='recipes/', verbose_name='Картинка, закодированная в Base64'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-18 19:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_recipe_image_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_status',
+            field=models.CharField(choices=[('ready', 'Готова'), ('processing', 'Обрабатывается'), ('failed', 'Ошибка обработки')], default='ready', max_length=10, verbose_name='Статус обработки картинки'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.11 on 2026-10-18 19:24
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+from recipes.search import create_search_index, drop_search_index
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_recipe_image_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
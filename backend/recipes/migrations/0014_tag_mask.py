@@ -0,0 +1,123 @@
+# Generated by Django 4.2.11 on 2026-10-18 19:33
+
+from django.core.exceptions import ValidationError
+from django.db import migrations, models
+from django.db.models import (
+    BigIntegerField, Count, F, OuterRef, Subquery, Sum, Value,
+)
+from django.db.models.functions import Cast, Coalesce
+
+# Копии recipes.search и recipes.tag_masks на момент миграции: код
+# приложения может измениться, а миграция должна работать со схемой
+# и историческими моделями своего времени.
+FTS_TABLE = 'recipes_recipe_fts'
+SQLITE_TRIGGERS = (
+    f'''
+    CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON recipes_recipe BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, name, text)
+        VALUES (new.id, new.name, new.text);
+    END;
+    ''',
+    f'''
+    CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON recipes_recipe BEGIN
+        INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, name, text)
+        VALUES ('delete', old.id, old.name, old.text);
+    END;
+    ''',
+    f'''
+    CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE OF name, text
+    ON recipes_recipe BEGIN
+        INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, name, text)
+        VALUES ('delete', old.id, old.name, old.text);
+        INSERT INTO {FTS_TABLE} (rowid, name, text)
+        VALUES (new.id, new.name, new.text);
+    END;
+    ''',
+)
+SQLITE_DROP_TRIGGERS = (
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_insert;',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_delete;',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_update;',
+)
+SQLITE_REBUILD = (
+    f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild');",
+)
+MAX_TAGS = 63
+
+
+def restore_search_triggers(apps, schema_editor):
+    """Пересоздаёт триггеры FTS5, которые SQLite удаляет вместе
+    с пересоздаваемой таблицей recipes_recipe."""
+
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in (
+            SQLITE_DROP_TRIGGERS + SQLITE_TRIGGERS + SQLITE_REBUILD
+        ):
+            schema_editor.execute(statement, params=None)
+
+
+def fill_tag_masks(apps, schema_editor):
+    Tag = apps.get_model('recipes', 'Tag')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeTag = Recipe.tags.through
+
+    free = iter(range(MAX_TAGS))
+    for tag in Tag.objects.order_by('pk'):
+        tag.bit = next(free, None)
+        if tag.bit is None:
+            raise ValidationError(f'Тегов не может быть больше {MAX_TAGS}')
+        tag.save(update_fields=('bit',))
+
+    mask = RecipeTag.objects.filter(
+        recipe_id=OuterRef('pk'), tag__bit__isnull=False
+    ).order_by().values('recipe_id').annotate(
+        mask=Sum(Cast(Value(1), BigIntegerField()).bitleftshift(
+            F('tag__bit')
+        ))
+    ).values('mask')
+    Recipe.objects.update(tag_mask=Cast(
+        Coalesce(Subquery(mask), 0), BigIntegerField()
+    ))
+
+    count = RecipeTag.objects.filter(
+        tag_id=OuterRef('pk')
+    ).order_by().values('tag_id').annotate(
+        count=Count('pk')
+    ).values('count')
+    Tag.objects.update(recipes_count=Coalesce(Subquery(count), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_shopping_list_item'),
+    ]
+
+    operations = [
+        # При откате RemoveField тоже пересоздаёт таблицу на SQLite.
+        migrations.RunPython(
+            migrations.RunPython.noop, restore_search_triggers
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='tag_mask',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Маска тегов'),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='bit',
+            field=models.PositiveSmallIntegerField(editable=False, null=True, unique=True, verbose_name='Бит в маске тегов'),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество рецептов'),
+        ),
+        migrations.DeleteModel(
+            name='TagInRecipe',
+        ),
+        migrations.RunPython(
+            restore_search_triggers, migrations.RunPython.noop
+        ),
+        migrations.RunPython(fill_tag_masks, migrations.RunPython.noop),
+    ]
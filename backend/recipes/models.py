@@ -1,14 +1,19 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import RegexValidator, MinValueValidator
 from django.db import models
 
+from .counters import CounterFieldsMixin
+from .storage import image_storage
+from .tag_masks import next_tag_bit
+
 User = get_user_model()
 
 MAX_LENGTH = 200
 MAX_LENGTH_FOR_COLOR = 7
 
 
-class Tag(models.Model):
+class Tag(CounterFieldsMixin, models.Model):
 
     name = models.CharField(
         'Название тэга',
@@ -35,6 +40,20 @@ class Tag(models.Model):
         max_length=200,
         unique=True
     )
+    # Номер бита тега в Recipe.tag_mask, см. recipes/tag_masks.py.
+    bit = models.PositiveSmallIntegerField(
+        verbose_name='Бит в маске тегов',
+        unique=True,
+        null=True,
+        editable=False
+    )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Количество рецептов',
+        default=0,
+        editable=False
+    )
+
+    counter_fields = ('recipes_count',)
 
     class Meta:
         verbose_name = 'Тег'
@@ -49,6 +68,17 @@ class Tag(models.Model):
     def __str__(self):
         return self.name
 
+    def clean(self):
+        # Новому тегу нужен свободный бит в маске, иначе сохранение
+        # в админке упадёт уже в save().
+        if self.bit is None:
+            next_tag_bit(type(self))
+
+    def save(self, *args, **kwargs):
+        if self.bit is None:
+            self.bit = next_tag_bit(type(self))
+        super().save(*args, **kwargs)
+
 
 class Ingredient(models.Model):
 
@@ -66,12 +96,34 @@ class Ingredient(models.Model):
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
         ordering = ('name',)
+        constraints = (
+            models.UniqueConstraint(
+                fields=('name', 'measurement_unit'),
+                name='unique_ingredient',
+            ),
+        )
 
     def __str__(self):
         return self.name
 
 
-class Recipe(models.Model):
+class RecipeManager(models.Manager):
+    """Не загружает поисковый вектор, он нужен только в SQL."""
+
+    def get_queryset(self):
+        return super().get_queryset().defer('search_vector')
+
+
+class Recipe(CounterFieldsMixin, models.Model):
+
+    IMAGE_READY = 'ready'
+    IMAGE_PROCESSING = 'processing'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUS_CHOICES = (
+        (IMAGE_READY, 'Готова'),
+        (IMAGE_PROCESSING, 'Обрабатывается'),
+        (IMAGE_FAILED, 'Ошибка обработки'),
+    )
 
     author = models.ForeignKey(
         User,
@@ -86,6 +138,7 @@ class Recipe(models.Model):
     image = models.ImageField(
         verbose_name='Картинка, закодированная в Base64',
         upload_to='recipes/',
+        storage=image_storage,
         blank=True
     )
     text = models.TextField(verbose_name='Описание рецепта')
@@ -109,11 +162,51 @@ class Recipe(models.Model):
         auto_now_add=True,
         db_index=True
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Количество добавлений в избранное',
+        default=0,
+        editable=False
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        verbose_name='Количество добавлений в список покупок',
+        default=0,
+        editable=False
+    )
+    image_status = models.CharField(
+        verbose_name='Статус обработки картинки',
+        max_length=10,
+        choices=IMAGE_STATUS_CHOICES,
+        default=IMAGE_READY
+    )
+    image_variants = models.JSONField(
+        verbose_name='Уменьшенные копии картинки',
+        default=dict,
+        blank=True,
+        editable=False
+    )
+    # Теги рецепта в виде битовой маски, обновляется сигналами.
+    tag_mask = models.BigIntegerField(
+        verbose_name='Маска тегов',
+        default=0,
+        editable=False
+    )
+    # Заполняется триггером PostgreSQL, см. recipes/search.py.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    counter_fields = ('favorites_count', 'shopping_cart_count', 'tag_mask')
+
+    objects = RecipeManager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
-        ordering = ('-created',)
+        ordering = ('-created', '-id')
+        indexes = (
+            models.Index(
+                fields=('-created', '-id'),
+                name='recipe_created_id_idx',
+            ),
+        )
 
     def __str__(self):
         return self.name
@@ -210,59 +303,67 @@ class IngredientInRecipe(models.Model):
         return f'{self.ingredient} {self.recipe}'
 
 
-class TagInRecipe(models.Model):
+class ShoppingCart(models.Model):
 
-    tag = models.ForeignKey(
-        Tag,
+    user = models.ForeignKey(
+        User,
         on_delete=models.CASCADE,
-        verbose_name='Теги',
-        help_text='Выберите теги рецепта'
+        related_name='shopping_user',
+        verbose_name='Пользователь'
     )
     recipe = models.ForeignKey(
         Recipe,
         on_delete=models.CASCADE,
-        verbose_name='Рецепт',
-        help_text='Выберите рецепт')
+        related_name='shopping_recipe',
+        verbose_name='Рецепт'
+    )
 
     class Meta:
 
-        verbose_name = 'Тег рецепта'
-        verbose_name_plural = 'Теги рецепта'
+        verbose_name = 'Список покупок'
+        verbose_name_plural = 'Списки покупок'
         constraints = [
-            models.UniqueConstraint(fields=['tag', 'recipe'],
-                                    name='unique_tagrecipe')
+            models.UniqueConstraint(
+                fields=['user', 'recipe'], name='unique_shoppingcart'
+            )
         ]
 
     def __str__(self):
 
-        return f'{self.tag} {self.recipe}'
+        return f'{self.user} {self.recipe}'
 
 
-class ShoppingCart(models.Model):
+class ShoppingListItem(models.Model):
+    """Сумма ингредиента по всем рецептам из списка покупок.
+
+    Меняется в той же транзакции, что и список покупок или состав
+    рецепта, см. recipes/cart_totals.py.
+    """
 
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
-        related_name='shopping_user',
+        related_name='shopping_list_items',
         verbose_name='Пользователь'
     )
-    recipe = models.ForeignKey(
-        Recipe,
+    ingredient = models.ForeignKey(
+        Ingredient,
         on_delete=models.CASCADE,
-        related_name='shopping_recipe',
-        verbose_name='Рецепт'
+        related_name='shopping_list_items',
+        verbose_name='Ингредиент'
     )
+    amount = models.PositiveIntegerField(verbose_name='Количество')
 
     class Meta:
 
-        verbose_name = 'Список покупок'
-        verbose_name_plural = 'Списки покупок'
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Ингредиенты в списках покупок'
         constraints = [
             models.UniqueConstraint(
-                fields=['user', 'recipe'], name='unique_shoppingcart'
+                fields=['user', 'ingredient'], name='unique_shoppinglistitem'
             )
         ]
 
     def __str__(self):
 
-        return f'{self.user} {self.recipe}'
+        return f'{self.user} {self.ingredient} {self.amount}'
@@ -0,0 +1,113 @@
+SEARCH_CONFIG = 'russian'
+SEARCH_INDEX_NAME = 'recipe_search_vector_idx'
+FTS_TABLE = 'recipes_recipe_fts'
+
+POSTGRESQL_FORWARD = (
+    f'''
+    CREATE FUNCTION recipes_recipe_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(NEW.name, '')), 'A')
+            || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(NEW.text, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql;
+    ''',
+    '''
+    CREATE TRIGGER recipes_recipe_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, text ON recipes_recipe
+    FOR EACH ROW EXECUTE PROCEDURE recipes_recipe_search_vector_update();
+    ''',
+    'UPDATE recipes_recipe SET name = name;',
+    f'CREATE INDEX {SEARCH_INDEX_NAME} ON recipes_recipe '
+    f'USING gin (search_vector);',
+)
+POSTGRESQL_BACKWARD = (
+    f'DROP INDEX IF EXISTS {SEARCH_INDEX_NAME};',
+    'DROP TRIGGER IF EXISTS recipes_recipe_search_vector_trigger '
+    'ON recipes_recipe;',
+    'DROP FUNCTION IF EXISTS recipes_recipe_search_vector_update();',
+)
+
+# Внешняя таблица FTS5 хранит только индекс, текст берётся из recipes_recipe.
+SQLITE_TABLE = (
+    f'''
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        name, text, content='recipes_recipe', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    );
+    ''',
+)
+SQLITE_TRIGGERS = (
+    f'''
+    CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON recipes_recipe BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, name, text)
+        VALUES (new.id, new.name, new.text);
+    END;
+    ''',
+    f'''
+    CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON recipes_recipe BEGIN
+        INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, name, text)
+        VALUES ('delete', old.id, old.name, old.text);
+    END;
+    ''',
+    f'''
+    CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE OF name, text
+    ON recipes_recipe BEGIN
+        INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, name, text)
+        VALUES ('delete', old.id, old.name, old.text);
+        INSERT INTO {FTS_TABLE} (rowid, name, text)
+        VALUES (new.id, new.name, new.text);
+    END;
+    ''',
+)
+SQLITE_DROP_TRIGGERS = (
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_insert;',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_delete;',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_update;',
+)
+SQLITE_REBUILD = (
+    f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild');",
+)
+SQLITE_FORWARD = SQLITE_TABLE + SQLITE_TRIGGERS + SQLITE_REBUILD
+SQLITE_BACKWARD = SQLITE_DROP_TRIGGERS + (
+    f'DROP TABLE IF EXISTS {FTS_TABLE};',
+)
+
+
+def run_statements(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement, params=None)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        run_statements(schema_editor, POSTGRESQL_FORWARD)
+    elif vendor == 'sqlite':
+        run_statements(schema_editor, SQLITE_FORWARD)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        run_statements(schema_editor, POSTGRESQL_BACKWARD)
+    elif vendor == 'sqlite':
+        run_statements(schema_editor, SQLITE_BACKWARD)
+
+
+def restore_search_triggers(apps, schema_editor):
+    """Пересоздаёт триггеры FTS5 после изменения схемы recipes_recipe.
+
+    SQLite выполняет AddField, AlterField и RemoveField пересозданием
+    таблицы, и её триггеры при этом удаляются. Миграции, которые меняют
+    recipes_recipe, должны пересоздавать триггеры после изменения
+    схемы копией этих операторов, как 0014_tag_mask, а не импортом
+    функции.
+    """
+
+    if schema_editor.connection.vendor == 'sqlite':
+        run_statements(
+            schema_editor,
+            SQLITE_DROP_TRIGGERS + SQLITE_TRIGGERS + SQLITE_REBUILD
+        )
@@ -0,0 +1,184 @@
+from collections import defaultdict
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete, pre_save,
+)
+from django.dispatch import receiver
+
+from api.cache import invalidate
+from .cart_totals import (
+    change_cart_totals, change_recipe_totals, recipe_amounts,
+)
+from .counters import COUNTERS, change_counter
+from .images import release_variants
+from .models import IngredientInRecipe, Recipe, ShoppingCart, Tag
+from .tag_masks import (
+    filter_by_mask, refresh_tag_counts, refresh_tag_masks, tag_bit,
+)
+
+
+def connect_counter(source, relation, target, field):
+    source_model = apps.get_model(source)
+    target_model = apps.get_model(target)
+    attname = source_model._meta.get_field(relation).attname
+
+    def created(instance, created, **kwargs):
+        if created:
+            change_counter(
+                target_model, getattr(instance, attname), field, 1
+            )
+
+    def deleted(instance, **kwargs):
+        change_counter(target_model, getattr(instance, attname), field, -1)
+
+    post_save.connect(created, sender=source_model, weak=False)
+    post_delete.connect(deleted, sender=source_model, weak=False)
+
+
+for counter in COUNTERS:
+    connect_counter(*counter)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_image_deleted(instance, **kwargs):
+    if instance.image_variants:
+        transaction.on_commit(lambda: release_variants(
+            instance, instance.image_variants
+        ))
+
+
+def origin_model(origin):
+    return origin.model if isinstance(origin, QuerySet) else type(origin)
+
+
+def deleted_with_recipe(origin):
+    """Строка удаляется вместе с рецептом: суммы в списках покупок
+    уже уменьшены в recipe_cart_totals_deleting."""
+
+    return issubclass(origin_model(origin), Recipe)
+
+
+def deleted_in_bulk(origin):
+    """Строки состава удаляются набором: суммы уже уменьшены
+    в recipe_ingredients_deleting или вызывающим кодом."""
+
+    return (
+        isinstance(origin, QuerySet) and origin.model is IngredientInRecipe
+    )
+
+
+@receiver(post_save, sender=ShoppingCart)
+def shopping_cart_added(instance, created, **kwargs):
+    if created:
+        change_cart_totals(
+            [instance.user_id], recipe_amounts(instance.recipe_id)
+        )
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def shopping_cart_removed(instance, origin=None, **kwargs):
+    if not deleted_with_recipe(origin):
+        change_cart_totals(
+            [instance.user_id], recipe_amounts(instance.recipe_id, -1)
+        )
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_cart_totals_deleting(instance, origin=None, **kwargs):
+    # Одно изменение на рецепт вместо отдельного на каждую строку
+    # состава и каждый список покупок.
+    if deleted_with_recipe(origin):
+        change_recipe_totals(instance.pk, recipe_amounts(instance.pk, -1))
+
+
+@receiver(pre_save, sender=IngredientInRecipe)
+def recipe_ingredient_saving(instance, **kwargs):
+    # Для правок в админке: старое количество вычитается из списков.
+    instance.saved_row = None
+    if instance.pk is not None:
+        instance.saved_row = IngredientInRecipe.objects.filter(
+            pk=instance.pk
+        ).values_list('recipe_id', 'ingredient_id', 'amount').first()
+
+
+@receiver(post_save, sender=IngredientInRecipe)
+def recipe_ingredient_saved(instance, **kwargs):
+    changes = defaultdict(lambda: defaultdict(int))
+    changes[instance.recipe_id][instance.ingredient_id] += instance.amount
+    if instance.saved_row is not None:
+        recipe_id, ingredient_id, amount = instance.saved_row
+        changes[recipe_id][ingredient_id] -= amount
+    for recipe_id, amounts in changes.items():
+        change_recipe_totals(recipe_id, amounts)
+
+
+@receiver(pre_delete, sender=IngredientInRecipe)
+def recipe_ingredients_deleting(origin=None, **kwargs):
+    # Сигнал приходит на каждую строку, набор обрабатывается один раз.
+    # Код, который сам переносит удаление в списки, ставит cart_totals.
+    if not deleted_in_bulk(origin) or getattr(origin, 'cart_totals', False):
+        return
+    origin.cart_totals = True
+    changes = defaultdict(lambda: defaultdict(int))
+    for recipe_id, ingredient_id, amount in origin.values_list(
+        'recipe_id', 'ingredient_id', 'amount'
+    ):
+        changes[recipe_id][ingredient_id] -= amount
+    for recipe_id, amounts in changes.items():
+        change_recipe_totals(recipe_id, amounts)
+
+
+@receiver(post_delete, sender=IngredientInRecipe)
+def recipe_ingredient_deleted(instance, origin=None, **kwargs):
+    if not deleted_with_recipe(origin) and not deleted_in_bulk(origin):
+        change_recipe_totals(
+            instance.recipe_id, {instance.ingredient_id: -instance.amount}
+        )
+
+
+def tag_counts_changed():
+    transaction.on_commit(lambda: invalidate('tags'))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        refresh_tag_masks([instance.pk])
+        refresh_tag_counts(pk_set)
+    else:
+        if pk_set is None:
+            pk_set = filter_by_mask(
+                Recipe.objects.all(), tag_bit(instance.bit)
+            ).values('pk')
+        refresh_tag_masks(pk_set)
+        refresh_tag_counts([instance.pk])
+    tag_counts_changed()
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_tags_deleting(instance, **kwargs):
+    # Маска в загруженном объекте может быть устаревшей.
+    instance.deleted_tag_ids = list(Recipe.tags.through.objects.filter(
+        recipe_id=instance.pk
+    ).values_list('tag_id', flat=True))
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_tags_deleted(instance, **kwargs):
+    if instance.deleted_tag_ids:
+        refresh_tag_counts(instance.deleted_tag_ids)
+        tag_counts_changed()
+
+
+@receiver(post_delete, sender=Tag)
+def tag_deleted(instance, **kwargs):
+    # Бит удалённого тега может достаться новому тегу.
+    if instance.bit is not None:
+        refresh_tag_masks(filter_by_mask(
+            Recipe.objects.all(), tag_bit(instance.bit)
+        ).values('pk'))
@@ -0,0 +1,58 @@
+import hashlib
+import os
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentHashStorage(FileSystemStorage):
+    """Хранилище, в котором имя файла — хэш SHA-256 его содержимого.
+
+    Одинаковые файлы хранятся один раз: при повторной загрузке
+    возвращается имя уже сохранённого файла. Содержимое файла с таким
+    именем никогда не меняется, поэтому его можно кэшировать навсегда.
+    """
+
+    def get_hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        checksum = digest.hexdigest()
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(directory, checksum[:2], checksum + extension)
+
+    def _save(self, name, content):
+        """Пишет файл под временным именем и создаёт на него жёсткую
+        ссылку с именем-хэшем.
+
+        os.link не перезаписывает существующий файл: если такой же файл
+        параллельно сохранил другой процесс, остаётся его копия.
+        Под итоговым именем файл появляется уже записанным целиком.
+        """
+
+        name = self.get_hashed_name(name, content)
+        if self.exists(name):
+            return name
+        temporary = super()._save(f'{name}.{uuid.uuid4().hex}.tmp', content)
+        try:
+            os.link(self.path(temporary), self.path(name))
+        except FileExistsError:
+            pass
+        finally:
+            self.delete(temporary)
+        return name
+
+    def is_hashed(self, name):
+        directory, filename = os.path.split(name)
+        checksum = os.path.splitext(filename)[0]
+        return (
+            len(checksum) == 64
+            and os.path.basename(directory) == checksum[:2]
+        )
+
+
+image_storage = ContentHashStorage()
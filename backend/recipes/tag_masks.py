@@ -0,0 +1,110 @@
+from django.apps import apps as global_apps
+from django.core.exceptions import ValidationError
+from django.db.models import (
+    BigIntegerField, Count, F, OuterRef, Subquery, Sum, Value,
+)
+from django.db.models.functions import Cast, Coalesce
+
+# Старший бит не используется, чтобы маска оставалась положительной.
+MAX_TAGS = 63
+TOO_MANY_TAGS = f'Тегов не может быть больше {MAX_TAGS}'
+
+
+def tag_bit(bit):
+    return 1 << bit
+
+
+def filter_by_mask(queryset, mask):
+    """Рецепты, у которых есть хотя бы один тег из маски."""
+
+    return queryset.alias(
+        tag_match=F('tag_mask').bitand(mask)
+    ).filter(tag_match__gt=0)
+
+
+def free_bits(used):
+    return (bit for bit in range(MAX_TAGS) if bit not in used)
+
+
+def next_tag_bit(tag_model):
+    """Первый свободный бит для нового тега."""
+
+    used = set(tag_model.objects.filter(
+        bit__isnull=False
+    ).values_list('bit', flat=True))
+    bit = next(free_bits(used), None)
+    if bit is None:
+        raise ValidationError(TOO_MANY_TAGS)
+    return bit
+
+
+def assign_tag_bits(apps=global_apps):
+    """Выдаёт свободные биты тегам, у которых их ещё нет.
+
+    Теги загружаются и через COPY в обход save(), поэтому функцию
+    нужно вызывать после массовой загрузки.
+    """
+
+    Tag = apps.get_model('recipes', 'Tag')
+    used = set(Tag.objects.filter(
+        bit__isnull=False
+    ).values_list('bit', flat=True))
+    free = free_bits(used)
+    for tag in Tag.objects.filter(bit__isnull=True).order_by('pk'):
+        tag.bit = next(free, None)
+        if tag.bit is None:
+            raise ValidationError(TOO_MANY_TAGS)
+        tag.save(update_fields=('bit',))
+
+
+def refresh_tag_masks(recipes=None, apps=global_apps):
+    """Пересчитывает маски тегов рецептов по таблице связи.
+
+    recipes — queryset, список или подзапрос с id рецептов, без него
+    пересчитываются все рецепты. Каждый тег встречается у рецепта
+    один раз, поэтому сумма битов равна их побитовому ИЛИ.
+    """
+
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeTag = Recipe.tags.through
+    queryset = Recipe.objects.all()
+    if recipes is not None:
+        queryset = queryset.filter(pk__in=recipes)
+    mask = RecipeTag.objects.filter(
+        recipe_id=OuterRef('pk'), tag__bit__isnull=False
+    ).order_by().values('recipe_id').annotate(
+        mask=Sum(Cast(Value(1), BigIntegerField()).bitleftshift(
+            F('tag__bit')
+        ))
+    ).values('mask')
+    queryset.update(tag_mask=Cast(
+        Coalesce(Subquery(mask), 0), BigIntegerField()
+    ))
+
+
+def refresh_tag_counts(tags=None, apps=global_apps):
+    """Пересчитывает количество рецептов у тегов.
+
+    tags — queryset, список или подзапрос с id тегов, без него
+    пересчитываются все теги.
+    """
+
+    Tag = apps.get_model('recipes', 'Tag')
+    RecipeTag = apps.get_model('recipes', 'Recipe').tags.through
+    queryset = Tag.objects.all()
+    if tags is not None:
+        queryset = queryset.filter(pk__in=tags)
+    count = RecipeTag.objects.filter(
+        tag_id=OuterRef('pk')
+    ).order_by().values('tag_id').annotate(
+        count=Count('pk')
+    ).values('count')
+    queryset.update(recipes_count=Coalesce(Subquery(count), 0))
+
+
+def rebuild_tags(apps=global_apps):
+    """Назначает биты новым тегам и пересчитывает маски и счётчики."""
+
+    assign_tag_bits(apps)
+    refresh_tag_masks(apps=apps)
+    refresh_tag_counts(apps=apps)
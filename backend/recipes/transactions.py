@@ -0,0 +1,46 @@
+from collections import defaultdict
+
+from django.db import transaction
+
+
+class CommitBatch:
+    """Значения, накопленные за транзакцию для одного обработчика."""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.items = defaultdict(set)
+        self.done = False
+
+    def add(self, items):
+        for name, values in items.items():
+            self.items[name].update(values)
+
+    def __call__(self):
+        self.done = True
+        self.handler(**self.items)
+
+
+def on_commit_once(handler, using=None, **items):
+    """Вызывает handler один раз после коммита текущей транзакции.
+
+    items — именованные списки значений. Значения из всех вызовов
+    в транзакции объединяются в множества и передаются handler
+    одноимёнными аргументами. При откате транзакции или точки
+    сохранения, в которой вызов был запланирован, он отменяется
+    вместе с накопленными значениями. Вне транзакции handler
+    вызывается сразу.
+    """
+
+    connection = transaction.get_connection(using)
+    if connection.in_atomic_block:
+        for _, callback, _ in connection.run_on_commit:
+            if (
+                isinstance(callback, CommitBatch)
+                and callback.handler is handler
+                and not callback.done
+            ):
+                callback.add(items)
+                return
+    batch = CommitBatch(handler)
+    batch.add(items)
+    transaction.on_commit(batch, using=using)
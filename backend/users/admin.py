@@ -1,6 +1,7 @@
 from django.contrib.admin import register
 from django.contrib.auth.admin import UserAdmin
 
+from api.pagination import CachedCountPaginator
 from .models import User
 
 
@@ -8,5 +9,7 @@ from .models import User
 class UserAdmin(UserAdmin):
     list_display = ('pk', 'username', 'email', 'first_name', 'last_name',
                     'password')
-    list_filter = ('username', 'email')
+    list_filter = ('is_staff', 'is_active')
     search_fields = ('username', 'email')
+    paginator = CachedCountPaginator
+    show_full_result_count = False
@@ -2,11 +2,13 @@ from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from recipes.counters import CounterFieldsMixin
+
 MAX_LENGTH = 150
 MAX_LENGTH_FOR_EMAIL = 254
 
 
-class User(AbstractUser):
+class User(CounterFieldsMixin, AbstractUser):
     username = models.CharField(
         'Уникальный юзернейм',
         max_length=MAX_LENGTH,
@@ -31,6 +33,18 @@ class User(AbstractUser):
         'Пароль',
         max_length=MAX_LENGTH,
     )
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов',
+        default=0,
+        editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0,
+        editable=False
+    )
+
+    counter_fields = ('recipes_count', 'followers_count')
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']